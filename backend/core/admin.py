@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import mark_safe
 
+from .busqueda import filtrar_productos
 from .models import (
     Producto,
     ImagenProducto,
@@ -15,9 +16,18 @@ from .models import (
     Cliente,
     Pedido,
     ItemPedido,
+    PedidoEstadoEvento,
     Pago,
+    EventoStripe,
     AuditoriaCambio,
     ValoracionProducto,
+    ReservaStock,
+    ExportacionReporte,
+    VentaDiaria,
+    InventarioSnapshot,
+    Notificacion,
+    Tarea,
+    Promocion,
 )
 
 # --- Rol ---
@@ -89,6 +99,12 @@ class ProductoAdmin(admin.ModelAdmin):
     readonly_fields = ("disponible", "nro_referencia", "imagen_principal_preview")
     search_fields = ("nombre", "marca__nombre", "nro_referencia")
 
+    def get_search_results(self, request, queryset, search_term):
+        # Usa el índice FTS en vez de icontains sobre search_fields
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return filtrar_productos(queryset, search_term), False
+
     def imagen_principal_preview(self, obj):
         if obj.imagen_principal:
             return mark_safe(f'<img src="{obj.imagen_principal.url}" width="60" />')
@@ -135,6 +151,15 @@ class ItemPedidoInline(admin.TabularInline):
     model = ItemPedido
     extra = 0
 
+class PedidoEstadoEventoInline(admin.TabularInline):
+    model = PedidoEstadoEvento
+    extra = 0
+    can_delete = False
+    readonly_fields = ("estado_anterior", "estado", "fecha", "usuario")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
     list_display = (
@@ -150,7 +175,7 @@ class PedidoAdmin(admin.ModelAdmin):
     )
     list_filter = ("estado", "metodo_retiro", "fecha_creacion")
     search_fields = ("cliente__user__username", "bodeguero_asignado__username")
-    inlines = [ItemPedidoInline]
+    inlines = [ItemPedidoInline, PedidoEstadoEventoInline]
 
 # --- ItemPedido ---
 @admin.register(ItemPedido)
@@ -168,9 +193,69 @@ class PagoAdmin(admin.ModelAdmin):
     list_filter = ("estado", "metodo", "fecha_pago")
     search_fields = ("stripe_id", "pedido__id")
 
+# --- Eventos del webhook de Stripe ---
+@admin.register(EventoStripe)
+class EventoStripeAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "intentos", "recibido_en", "procesado_en")
+    list_filter = ("estado", "tipo")
+    search_fields = ("id",)
+    readonly_fields = ("id", "tipo", "payload", "intentos", "error", "recibido_en", "procesado_en")
+
 # --- AuditoriaCambio ---
 @admin.register(AuditoriaCambio)
 class AuditoriaCambioAdmin(admin.ModelAdmin):
     list_display = ("id", "usuario", "content_type", "objeto_id", "campo", "valor_anterior", "valor_nuevo", "fecha")
     list_filter = ("content_type", "campo", "fecha")
     search_fields = ("usuario__username", "campo", "valor_anterior", "valor_nuevo")
+
+# --- ReservaStock ---
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ("id", "carrito", "producto", "cantidad", "estado", "creada_en", "expira_en")
+    list_filter = ("estado",)
+    search_fields = ("carrito__user__username", "producto__nombre")
+
+# --- Exportaciones de reportes ---
+@admin.register(ExportacionReporte)
+class ExportacionReporteAdmin(admin.ModelAdmin):
+    list_display = ("id", "formato", "desde", "hasta", "estado", "filas", "solicitado_por", "creada_en", "terminada_en")
+    list_filter = ("estado", "formato")
+    readonly_fields = ("creada_en", "terminada_en")
+
+# --- VentaDiaria ---
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "sucursal", "total_ordenes", "ordenes_entregado", "ordenes_cancelado", "total_ingresos", "unidades")
+    list_filter = ("sucursal",)
+    date_hierarchy = "fecha"
+
+# --- InventarioSnapshot ---
+@admin.register(InventarioSnapshot)
+class InventarioSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "valor_total", "unidades", "productos", "creado_en")
+    date_hierarchy = "fecha"
+
+
+# --- Notificaciones (outbox de emails) ---
+@admin.register(Notificacion)
+class NotificacionAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "destinatario", "estado", "intentos", "proximo_intento", "creada_en", "enviada_en")
+    list_filter = ("estado", "tipo")
+    search_fields = ("destinatario", "clave")
+    readonly_fields = ("clave", "lote", "ultimo_error", "creada_en", "enviada_en")
+
+# --- Tareas en segundo plano ---
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "progreso", "intentos", "creada_por", "creada_en", "terminada_en")
+    list_filter = ("estado", "tipo")
+    readonly_fields = ("resultado", "error", "reservada_hasta", "creada_en", "iniciada_en", "terminada_en")
+
+# --- Promociones ---
+@admin.register(Promocion)
+class PromocionAdmin(admin.ModelAdmin):
+    list_display = ("id", "nombre", "descuento", "alcance", "estado", "inicio", "fin", "productos_afectados")
+    list_filter = ("estado", "alcance")
+    search_fields = ("nombre",)
+    autocomplete_fields = ("productos",)
+    readonly_fields = ("estado", "productos_afectados", "activada_en", "finalizada_en", "creada_en")
@@ -0,0 +1,158 @@
+"""
+Asignación de pedidos a bodegueros según su carga.
+
+La carga de un bodeguero es la cantidad de unidades en sus pedidos abiertos
+(SOLICITADO o PREPARACION); a igual carga se prefiere el que tiene menos
+pedidos abiertos. Se calcula para todos los bodegueros en turno con una sola
+consulta anotada (subconsultas correlacionadas, sin N+1).
+
+Un pedido se asigna de preferencia a un bodeguero de la sucursal de la que
+salen la mayoría de sus unidades; si no hay ninguno en turno ahí, al menos
+cargado de cualquier sucursal.
+
+Concurrencia: cada asignación bloquea primero las filas de los bodegueros en
+turno (en orden de id) y luego los pedidos, que solo se asignan si siguen sin
+bodeguero; así dos asignaciones simultáneas no leen la misma carga ni asignan
+dos veces. En SQLite el bloqueo lo da la transacción IMMEDIATE.
+"""
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ItemPedido, Pedido, UserProfile
+
+ESTADOS_ABIERTOS = ("SOLICITADO", "PREPARACION")
+
+def bodegueros_en_turno():
+    return UserProfile.objects.filter(rol__nombre="EMPLEADO", tipo_empleado="BODEGUERO", en_turno=True)
+
+def bodegueros_con_carga(bodegueros=None):
+    """
+    Anota a los bodegueros con `carga_unidades` y `carga_pedidos` de sus pedidos abiertos.
+    """
+    bodegueros = bodegueros if bodegueros is not None else bodegueros_en_turno()
+    unidades = (
+        ItemPedido.objects.filter(pedido__bodeguero_asignado=OuterRef("user_id"), pedido__estado__in=ESTADOS_ABIERTOS)
+        .order_by().values("pedido__bodeguero_asignado").annotate(total=Sum("cantidad")).values("total")
+    )
+    pedidos = (
+        Pedido.objects.filter(bodeguero_asignado=OuterRef("user_id"), estado__in=ESTADOS_ABIERTOS)
+        .order_by().values("bodeguero_asignado").annotate(total=Count("id")).values("total")
+    )
+    return bodegueros.annotate(
+        carga_unidades=Coalesce(Subquery(unidades, output_field=IntegerField()), 0),
+        carga_pedidos=Coalesce(Subquery(pedidos, output_field=IntegerField()), 0),
+    )
+
+def sucursales_y_unidades(pedidos):
+    """
+    Para cada pedido del queryset: (sucursal de la que sale la mayoría de sus
+    unidades, unidades totales), en una consulta. Los pedidos sin items no aparecen.
+    """
+    por_pedido = defaultdict(dict)
+    filas = (
+        ItemPedido.objects.filter(pedido__in=pedidos.values("id"))
+        .values("pedido_id", "producto__sucursal_id")
+        .annotate(unidades=Sum("cantidad"))
+    )
+    for fila in filas:
+        por_pedido[fila["pedido_id"]][fila["producto__sucursal_id"]] = fila["unidades"]
+    resultado = {}
+    for pedido_id, unidades in por_pedido.items():
+        sucursales = {s: u for s, u in unidades.items() if s is not None}
+        sucursal = max(sucursales, key=lambda s: (sucursales[s], -s)) if sucursales else None
+        resultado[pedido_id] = (sucursal, sum(unidades.values()))
+    return resultado
+
+class _Planificador:
+    """
+    Montículos de bodegueros por carga (global y por sucursal) para repartir
+    muchos pedidos sin volver a consultar la base de datos.
+    """
+    def __init__(self, bodegueros):
+        self.carga = {b.user_id: [b.carga_unidades, b.carga_pedidos] for b in bodegueros}
+        self.sucursal = {b.user_id: b.sucursal_id for b in bodegueros}
+        self.montones = defaultdict(list)
+        for user_id, (unidades, pedidos) in self.carga.items():
+            self.montones[None].append((unidades, pedidos, user_id))
+            if self.sucursal[user_id] is not None:
+                self.montones[self.sucursal[user_id]].append((unidades, pedidos, user_id))
+        for monton in self.montones.values():
+            heapq.heapify(monton)
+
+    def _menos_cargado(self, clave):
+        monton = self.montones.get(clave)
+        while monton:
+            unidades, pedidos, user_id = monton[0]
+            # Entradas con una carga vieja: se reinsertan con la actual
+            if [unidades, pedidos] == self.carga[user_id]:
+                return user_id
+            heapq.heapreplace(monton, (*self.carga[user_id], user_id))
+        return None
+
+    def elegir(self, sucursal_id, unidades):
+        user_id = self._menos_cargado(sucursal_id) if sucursal_id is not None else None
+        if user_id is None:
+            user_id = self._menos_cargado(None)
+        if user_id is None:
+            return None
+        self.carga[user_id][0] += unidades
+        self.carga[user_id][1] += 1
+        carga = (*self.carga[user_id], user_id)
+        heapq.heappush(self.montones[None], carga)
+        if self.sucursal[user_id] is not None:
+            heapq.heappush(self.montones[self.sucursal[user_id]], carga)
+        return user_id
+
+def _bloquear_candidatos():
+    # Bloquea las filas de los bodegueros en turno (orden fijo para no generar deadlocks)
+    list(bodegueros_en_turno().select_for_update().order_by("id").values_list("id", flat=True))
+    return list(bodegueros_con_carga().order_by("id"))
+
+def asignar(pedido):
+    """
+    Asigna el pedido al bodeguero en turno menos cargado (de su sucursal si hay).
+    Si ya tenía bodeguero no lo cambia. Devuelve el User asignado o None.
+    """
+    with transaction.atomic():
+        # Mismo orden de bloqueo que asignar_pendientes: bodegueros y luego pedidos
+        planificador = _Planificador(_bloquear_candidatos())
+        actual = Pedido.objects.select_for_update().filter(pk=pedido.pk).values_list("bodeguero_asignado_id", flat=True).first()
+        if actual is not None:
+            pedido.bodeguero_asignado = User.objects.get(pk=actual)
+            return pedido.bodeguero_asignado
+        datos = sucursales_y_unidades(Pedido.objects.filter(pk=pedido.pk))
+        user_id = planificador.elegir(*datos.get(pedido.pk, (None, 0)))
+        if user_id is None:
+            return None
+        Pedido.objects.filter(pk=pedido.pk, bodeguero_asignado__isnull=True).update(bodeguero_asignado_id=user_id)
+    pedido.bodeguero_asignado = User.objects.get(pk=user_id)
+    return pedido.bodeguero_asignado
+
+def asignar_pendientes(estado="SOLICITADO", batch_size=500):
+    """
+    Reparte todos los pedidos en `estado` sin bodeguero entre los bodegueros en
+    turno, del más antiguo al más nuevo. Devuelve {user_id: cantidad asignada}.
+    Consultas: las cargas, los pedidos pendientes y sus sucursales (una cada
+    una) y las escrituras en lotes de `batch_size`.
+    """
+    with transaction.atomic():
+        planificador = _Planificador(_bloquear_candidatos())
+        if not planificador.carga:
+            return {}
+        pendientes = Pedido.objects.filter(estado=estado, bodeguero_asignado__isnull=True)
+        pedido_ids = list(pendientes.select_for_update().order_by("fecha_creacion", "id").values_list("id", flat=True))
+        datos = sucursales_y_unidades(pendientes)
+        asignados = defaultdict(list)
+        for pedido_id in pedido_ids:
+            asignados[planificador.elegir(*datos.get(pedido_id, (None, 0)))].append(pedido_id)
+        pedidos = [
+            Pedido(pk=pedido_id, bodeguero_asignado_id=user_id)
+            for user_id, ids in asignados.items() for pedido_id in ids
+        ]
+        Pedido.objects.bulk_update(pedidos, ["bodeguero_asignado"], batch_size=batch_size)
+    return {user_id: len(ids) for user_id, ids in asignados.items()}
@@ -0,0 +1,1100 @@
+"""
+Escenarios para `python manage.py benchmark <escenario>`.
+
+Cada escenario recibe el stdout del comando y sus parámetros enteros (con los
+valores por defecto de `escenario.defaults`), trabaja sobre una base temporal y
+devuelve False si detecta un resultado inválido.
+"""
+import csv
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .asignacion import asignar, asignar_pendientes, bodegueros_con_carga
+from .busqueda import PESOS, TABLA as TABLA_BUSQUEDA, filtrar_productos, indice_disponible, reconstruir_indice
+from . import cache_catalogo as cache_catalogo_mod
+from .cache_catalogo import version_catalogo
+from .carrito import agregar_item
+from .catalogo import calcular_precio_con_descuento, sincronizar_productos
+from .checkout import convertir_carrito
+from .importacion import importar_catalogo
+from .notificaciones import Despachador, encolar
+from .pagos import firmar, procesar_evento
+from .pasarela import Interruptor, PasarelaFalsa, usar_pasarela
+from .permissions import IsEmpleadoSubrol
+from .promociones import crear_promocion, procesar_promociones
+from .models import (
+    Cart, Categoria, Cliente, EventoStripe, ItemCarrito, ItemPedido, Marca, Notificacion, Pago, Pedido, Producto, ProductoCatalogo,
+    ReservaStock, Rol, Sucursal, Tarea, UserProfile, VentaDiaria, reservar_nros_referencia,
+)
+from .reportes import resumen_ventas
+from .reservas import StockInsuficiente, asociar_sesion, reservar, reservar_carrito
+from .tareas import Worker
+from .ventas_diarias import reconstruir as reconstruir_ventas_diarias
+
+ESCENARIOS = {}
+
+def escenario(nombre, **defaults):
+    def registrar(funcion):
+        funcion.defaults = defaults
+        ESCENARIOS[nombre] = funcion
+        return funcion
+    return registrar
+
+def _producto_demo(stock=100, **kwargs):
+    marca, _ = Marca.objects.get_or_create(nombre="Marca Benchmark")
+    categoria, _ = Categoria.objects.get_or_create(nombre="Categoría Benchmark")
+    return Producto.objects.create(
+        nombre=kwargs.pop("nombre", "Producto Benchmark"), marca=marca, categoria=categoria,
+        valor=kwargs.pop("valor", 1000), stock=stock, **kwargs
+    )
+
+@escenario("reservas", hilos=16, stock=200, intentos=25)
+def reservas_concurrentes(stdout, hilos, stock, intentos):
+    """
+    Muchos hilos reservan 1 unidad del mismo producto a la vez, cada uno con su
+    carrito. Verifica que lo reservado nunca supere el stock inicial.
+    """
+    producto = _producto_demo(stock=stock)
+    carritos = [
+        Cart.objects.create(user=User.objects.create_user(f"bench_reserva_{i}"))
+        for i in range(hilos)
+    ]
+    exitos, rechazos, errores = [0] * hilos, [0] * hilos, [0] * hilos
+    barrera = threading.Barrier(hilos)
+
+    def trabajador(i):
+        try:
+            barrera.wait()
+            for _ in range(intentos):
+                try:
+                    reservar(carritos[i], [(producto.id, 1)])
+                    exitos[i] += 1
+                except StockInsuficiente:
+                    rechazos[i] += 1
+                except OperationalError:
+                    errores[i] += 1
+        finally:
+            connection.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracion = time.perf_counter() - inicio
+
+    producto.refresh_from_db()
+    reservado = ReservaStock.objects.filter(producto=producto).aggregate(total=Sum("cantidad"))["total"] or 0
+    sobreventa = max(0, reservado - stock)
+    consistente = producto.stock + reservado == stock and producto.stock >= 0
+    stdout.write(
+        f"hilos={hilos} intentos={hilos * intentos} stock_inicial={stock}\n"
+        f"reservas_ok={sum(exitos)} rechazadas={sum(rechazos)} errores_bd={sum(errores)}\n"
+        f"stock_final={producto.stock} unidades_reservadas={reservado} sobreventa={sobreventa}\n"
+        f"consistente={consistente} duracion={duracion:.2f}s "
+        f"({hilos * intentos / duracion:.0f} intentos/s)"
+    )
+    return sobreventa == 0 and consistente
+
+def _pedidos_demo(dias, pedidos_por_dia):
+    """
+    Crea pedidos con dos items cada uno repartidos en los últimos `dias` días
+    (con bulk_create, sin pasar por señales). Devuelve la cantidad creada.
+    """
+    productos = [_producto_demo(nombre=f"Producto Reporte {i}", valor=1000 * (i + 1)) for i in range(10)]
+    user = User.objects.create_user("bench_reportes", email="bench_reportes@example.com")
+    cliente, _ = Cliente.objects.get_or_create(user=user, defaults={"email": user.email})
+    estados = [estado for estado, _ in Pedido.ESTADO_CHOICES]
+    ahora = timezone.now()
+    rng = random.Random(0)
+
+    pedidos = Pedido.objects.bulk_create([
+        Pedido(
+            cliente=cliente, estado=rng.choice(estados), total=rng.randint(1, 50) * 1000,
+            fecha_creacion=ahora - timedelta(days=dia, minutes=rng.randint(0, 600)),
+        )
+        for dia in range(dias) for _ in range(pedidos_por_dia)
+    ], batch_size=1000)
+    ItemPedido.objects.bulk_create([
+        ItemPedido(pedido=pedido, producto=producto, cantidad=rng.randint(1, 5), precio_unitario=producto.valor)
+        for pedido in pedidos for producto in rng.sample(productos, 2)
+    ], batch_size=1000)
+    return len(pedidos)
+
+@escenario("reportes", dias=730, pedidos_por_dia=20)
+def reportes_agregados(stdout, dias, pedidos_por_dia):
+    """
+    Genera pedidos repartidos en `dias` días y mide el reporte de ventas para
+    rangos de distinto largo. La cantidad de consultas debe ser la misma en todos.
+    """
+    total = _pedidos_demo(dias, pedidos_por_dia)
+    stdout.write(f"pedidos={total} dias={dias}")
+
+    hoy = timezone.localdate()
+    consultas = set()
+    for largo in (7, 30, 365, dias):
+        for granularidad, agrupar_por in (("dia", None), ("mes", None), ("semana", "categoria")):
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                filas = resumen_ventas(hoy - timedelta(days=largo - 1), hoy, granularidad, agrupar_por)
+                duracion = time.perf_counter() - inicio
+            consultas.add(len(ctx.captured_queries))
+            stdout.write(
+                f"rango={largo:>4}d granularidad={granularidad:<6} agrupar_por={agrupar_por or '-':<9} "
+                f"filas={len(filas):>4} consultas={len(ctx.captured_queries)} duracion={duracion * 1000:.1f}ms"
+            )
+    stdout.write(f"consultas_constantes={consultas == {1}}")
+    return consultas == {1}
+
+@escenario("ventas_diarias", dias=730, pedidos_por_dia=100)
+def ventas_diarias(stdout, dias, pedidos_por_dia):
+    """
+    Compara los agregados del dashboard leídos de VentaDiaria contra recorrer
+    la tabla Pedido, y verifica que ambos coincidan. También guarda items de un
+    pedido en una transacción: cada item es solo su INSERT y el día se recalcula
+    una vez al confirmar, con las mismas consultas para 1 o 50 items.
+    """
+    total = _pedidos_demo(dias, pedidos_por_dia)
+    inicio = time.perf_counter()
+    filas = reconstruir_ventas_diarias()
+    stdout.write(f"pedidos={total} filas_ventas_diarias={filas} reconstruccion={time.perf_counter() - inicio:.2f}s")
+
+    pedido = Pedido.objects.filter(estado="ENTREGADO").order_by("id").first()
+    producto = Producto.objects.order_by("id").first()
+    dia = timezone.localdate(pedido.fecha_creacion)
+    # Una transacción revertida no impide programar el recálculo de las siguientes
+    with transaction.atomic():
+        ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=producto.valor)
+        transaction.set_rollback(True)
+    por_items = {}
+    for n in (1, 50):
+        consultas = []
+        def registrar(execute, sql, params, many, context):
+            consultas.append(sql)
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(registrar):
+            with transaction.atomic():
+                for _ in range(n):
+                    ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=producto.valor)
+                en_transaccion = [sql for sql in consultas if not sql.startswith("BEGIN")]
+        por_items[n] = (len(en_transaccion), len(consultas) - len(en_transaccion))
+    esperado = resumen_ventas(dia, dia, "dia", rellenar=False)[0]
+    fila = VentaDiaria.objects.get(fecha=dia, sucursal__isnull=True)
+    items_ok = (
+        all(en_tx == n for n, (en_tx, _r) in por_items.items()) and len({r for _e, r in por_items.values()}) == 1
+        and all(getattr(fila, campo) == esperado[campo] for campo in ("unidades", "total_ordenes", "ingresos_entregados"))
+    )
+    stdout.write(f"items en transacción: consultas (guardado, recálculo) por cantidad={por_items} resumen_al_dia={items_ok}")
+
+    campos = ("ingresos", "entregados", "cancelados")
+    inicio = time.perf_counter()
+    desde_pedidos = Pedido.objects.aggregate(
+        ingresos=Sum("total", filter=Q(estado="ENTREGADO")),
+        entregados=Count("id", filter=Q(estado="ENTREGADO")),
+        cancelados=Count("id", filter=Q(estado="CANCELADO")),
+    )
+    t_pedidos = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    desde_resumen = VentaDiaria.objects.filter(sucursal__isnull=True).aggregate(
+        ingresos=Sum("ingresos_entregados"),
+        entregados=Sum("ordenes_entregado"),
+        cancelados=Sum("ordenes_cancelado"),
+    )
+    t_resumen = time.perf_counter() - inicio
+    iguales = all(int(desde_pedidos[c] or 0) == int(desde_resumen[c] or 0) for c in campos)
+    stdout.write(
+        f"dashboard desde Pedido={t_pedidos * 1000:.1f}ms desde VentaDiaria={t_resumen * 1000:.1f}ms "
+        f"iguales={iguales}"
+    )
+    return iguales and items_ok
+
+@escenario("asignacion", bodegueros=300, pedidos=5000, sucursales=5, hilos=8)
+def asignacion_bodegueros(stdout, bodegueros, pedidos, sucursales, hilos):
+    """
+    Reparte `pedidos` pendientes entre `bodegueros` en turno y mide consultas,
+    tiempo y equilibrio de carga. Luego varios hilos asignan pedidos nuevos a
+    la vez y se verifica que ninguno quede asignado dos veces.
+    """
+    rol, _ = Rol.objects.get_or_create(nombre="EMPLEADO")
+    sedes = [Sucursal.objects.create(nombre=f"Sucursal {i}", direccion="-") for i in range(sucursales)]
+    users = User.objects.bulk_create([User(username=f"bench_bodeguero_{i}") for i in range(bodegueros)])
+    # bulk_create no dispara la señal que crea el perfil
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, rol=rol, tipo_empleado="BODEGUERO", en_turno=True, sucursal=sedes[i % sucursales])
+        for i, user in enumerate(users)
+    ])
+    productos = [_producto_demo(nombre=f"Producto Sucursal {i}", sucursal=sede) for i, sede in enumerate(sedes)]
+    user = User.objects.create_user("bench_asignacion")
+    cliente, _ = Cliente.objects.get_or_create(user=user, defaults={"email": "bench_asignacion@example.com"})
+    rng = random.Random(0)
+
+    def crear_pedidos(cantidad):
+        nuevos = Pedido.objects.bulk_create(
+            [Pedido(cliente=cliente, estado="SOLICITADO", total=1000) for _ in range(cantidad)], batch_size=1000
+        )
+        ItemPedido.objects.bulk_create([
+            ItemPedido(pedido=pedido, producto=rng.choice(productos), cantidad=rng.randint(1, 10), precio_unitario=1000)
+            for pedido in nuevos
+        ], batch_size=1000)
+        return nuevos
+
+    crear_pedidos(pedidos)
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        asignados = asignar_pendientes()
+        duracion = time.perf_counter() - inicio
+    cargas = [b.carga_unidades for b in bodegueros_con_carga()]
+    sin_asignar = Pedido.objects.filter(bodeguero_asignado__isnull=True).count()
+    stdout.write(
+        f"bodegueros={bodegueros} pedidos={pedidos} asignados={sum(asignados.values())} sin_asignar={sin_asignar}\n"
+        f"consultas={len(ctx.captured_queries)} duracion={duracion:.2f}s "
+        f"carga_unidades min={min(cargas)} max={max(cargas)}"
+    )
+
+    # Asignaciones individuales concurrentes sobre pedidos nuevos
+    nuevos = crear_pedidos(hilos * 10)
+    errores = [0] * hilos
+    barrera = threading.Barrier(hilos)
+
+    def trabajador(i):
+        try:
+            barrera.wait()
+            for pedido in nuevos[i::hilos] + nuevos[(i + 1) % hilos::hilos]:
+                try:
+                    asignar(Pedido(pk=pedido.pk))
+                except OperationalError:
+                    errores[i] += 1
+        finally:
+            connection.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracion = time.perf_counter() - inicio
+    pendientes = Pedido.objects.filter(pk__in=[p.pk for p in nuevos], bodeguero_asignado__isnull=True).count()
+    stdout.write(
+        f"concurrentes: hilos={hilos} pedidos={len(nuevos)} sin_asignar={pendientes} "
+        f"errores_bd={sum(errores)} duracion={duracion:.2f}s"
+    )
+    return sin_asignar == 0 and pendientes == 0 and sum(asignados.values()) == pedidos
+
+class BackendEmailSimulado(BaseEmailBackend):
+    """
+    Backend de email para benchmarks: simula la latencia de un servidor SMTP y
+    una tasa de fallos, y registra cuántas veces se entregó cada asunto.
+    """
+    latencia = 0.0
+    probabilidad_fallo = 0.0
+    entregas = {}
+    conexiones = 0
+    lock = threading.Lock()
+
+    def open(self):
+        with self.lock:
+            BackendEmailSimulado.conexiones += 1
+
+    def send_messages(self, mensajes):
+        for mensaje in mensajes:
+            time.sleep(self.latencia)
+            if random.random() < self.probabilidad_fallo:
+                raise ConnectionError("SMTP simulado no disponible")
+            with self.lock:
+                self.entregas[mensaje.subject] = self.entregas.get(mensaje.subject, 0) + 1
+        return len(mensajes)
+
+@escenario("notificaciones", emails=1000, hilos=8, latencia_ms=20, fallos_pct=10, por_segundo=0)
+def notificaciones_outbox(stdout, emails, hilos, latencia_ms, fallos_pct, por_segundo):
+    """
+    Encola `emails` notificaciones (más duplicados por clave) y las envía con el
+    worker contra un servidor simulado lento y con fallos. Verifica que cada
+    notificación se entregue exactamente una vez y que no queden pendientes.
+    """
+    BackendEmailSimulado.latencia = latencia_ms / 1000
+    BackendEmailSimulado.probabilidad_fallo = fallos_pct / 100
+    BackendEmailSimulado.entregas = {}
+    BackendEmailSimulado.conexiones = 0
+    for i in range(emails):
+        encolar("BENCHMARK", f"benchmark:{i}", f"cliente{i}@example.com", f"Notificación {i}", "Cuerpo")
+    for i in range(0, emails, 10):
+        encolar("BENCHMARK", f"benchmark:{i}", f"cliente{i}@example.com", f"Notificación {i}", "Cuerpo")
+    encoladas = Notificacion.objects.count()
+
+    backend = f"{__name__}.BackendEmailSimulado"
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        with Despachador(hilos=hilos, por_segundo=por_segundo, max_intentos=20, reintento_segundos=0, backend=backend) as d:
+            totales = d.drenar(tamano=100)
+        duracion = time.perf_counter() - inicio
+    entregas = BackendEmailSimulado.entregas
+    duplicadas = sum(1 for veces in entregas.values() if veces > 1)
+    pendientes = Notificacion.objects.exclude(estado="ENVIADA").count()
+    secuencial = emails * latencia_ms / 1000 / max(1 - fallos_pct / 100, 0.01)
+    stdout.write(
+        f"encoladas={encoladas} (de {emails + len(range(0, emails, 10))} intentos) hilos={hilos} "
+        f"latencia={latencia_ms}ms fallos={fallos_pct}% por_segundo={por_segundo or '-'}\n"
+        f"enviadas={totales['enviadas']} reintentos={totales['reintentos']} fallidas={totales['fallidas']} "
+        f"entregas_unicas={len(entregas)} duplicadas={duplicadas} no_enviadas={pendientes}\n"
+        f"consultas={len(ctx.captured_queries)} conexiones_email={BackendEmailSimulado.conexiones} "
+        f"duracion={duracion:.2f}s ({emails / duracion:.0f} emails/s; secuencial ~{secuencial:.1f}s)"
+    )
+    return encoladas == emails and len(entregas) == emails and duplicadas == 0 and pendientes == 0
+
+@escenario("promociones", productos=20000, muestra=200)
+def promociones_masivas(stdout, productos, muestra):
+    """
+    Aplica y finaliza una promoción por marca sobre `productos` productos y lo
+    compara con guardar `muestra` productos uno a uno (como el endpoint antiguo).
+    Verifica una sola escritura en Producto y los precios del catálogo.
+    """
+    marca, _ = Marca.objects.get_or_create(nombre="Marca Promoción")
+    categoria, _ = Categoria.objects.get_or_create(nombre="Categoría Promoción")
+    rng = random.Random(0)
+    Producto.objects.bulk_create([
+        Producto(nombre=f"Producto Promo {i}", marca=marca, categoria=categoria, valor=rng.randint(1, 500) * 990,
+                 stock=10, nro_referencia=f"P{i:05d}")
+        for i in range(productos)
+    ], batch_size=1000)
+    sincronizar_productos(Producto.objects.all())
+
+    def escrituras_producto(ctx):
+        return sum(1 for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_producto" '))
+
+    # La versión es un token: las invalidaciones se cuentan envolviendo la función que la renueva
+    renovaciones = []
+    renovar = cache_catalogo_mod._renovar_version
+    cache_catalogo_mod._renovar_version = lambda: (renovaciones.append(1), renovar())
+    try:
+        version = version_catalogo()
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            promocion = crear_promocion({"alcance": "MARCA", "marca": marca.id, "descuento": 15, "fin": None})
+            duracion = time.perf_counter() - inicio
+    finally:
+        cache_catalogo_mod._renovar_version = renovar
+    invalidaciones = len(renovaciones)
+    invalidaciones_ok = invalidaciones == 1 and version_catalogo() != version
+    catalogo = dict(ProductoCatalogo.objects.values_list("producto_id", "precio_con_descuento"))
+    precios_ok = all(
+        catalogo[pk] == calcular_precio_con_descuento(valor, 15)
+        for pk, valor in Producto.objects.values_list("id", "valor")
+    )
+    stdout.write(
+        f"activar: productos={promocion.productos_afectados} consultas={len(ctx.captured_queries)} "
+        f"updates_producto={escrituras_producto(ctx)} invalidaciones_cache={invalidaciones} "
+        f"duracion={duracion * 1000:.0f}ms precios_catalogo_ok={precios_ok}"
+    )
+
+    Promocion = type(promocion)
+    Promocion.objects.filter(pk=promocion.pk).update(fin=timezone.now())
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        resultado = procesar_promociones()
+        duracion = time.perf_counter() - inicio
+    restaurados = not Producto.objects.filter(descuento__gt=0).exists() and not ProductoCatalogo.objects.exclude(
+        precio_con_descuento=F("producto__valor")
+    ).exists()
+    stdout.write(
+        f"finalizar: {resultado} consultas={len(ctx.captured_queries)} updates_producto={escrituras_producto(ctx)} "
+        f"duracion={duracion * 1000:.0f}ms restaurados={restaurados}"
+    )
+
+    inicio = time.perf_counter()
+    for producto in Producto.objects.select_related("marca", "categoria")[:muestra]:
+        producto.descuento = 15
+        producto.save()
+    por_producto = (time.perf_counter() - inicio) / muestra
+    stdout.write(
+        f"save() por producto: {por_producto * 1000:.2f}ms -> ~{por_producto * productos:.1f}s para {productos} productos"
+    )
+    return promocion.productos_afectados == productos and precios_ok and restaurados and invalidaciones_ok
+
+@escenario("catalogo", productos=100000, paginas=40)
+def catalogo_busqueda(stdout, productos, paginas):
+    """
+    Latencia de GET /api/productos/?search= sobre un catálogo de `productos`
+    productos (primera página, sin caché) y orden por relevancia igual al de
+    una consulta bm25() directa al índice. Luego recorre `paginas` páginas con
+    cada orden: sin OFFSET, sin repetidos ni saltos, y la última página tarda
+    lo mismo que la primera aunque el orden tenga muchos empates (descuento).
+    """
+    tipos = ["Martillo", "Taladro", "Llave", "Sierra", "Tornillo", "Clavo", "Pintura", "Brocha", "Cable", "Tubo",
+             "Alicate", "Destornillador", "Lija", "Candado", "Manguera", "Escalera"]
+    detalles = ["acero", "inalámbrico", "carpintero", "profesional", "galvanizado", "eléctrico", "de goma", "reforzado"]
+    marcas = [Marca.objects.create(nombre=f"Marca Catálogo {i}") for i in range(40)]
+    categorias = [Categoria.objects.create(nombre=f"Categoría Catálogo {i}") for i in range(20)]
+    rng = random.Random(0)
+    inicio = time.perf_counter()
+    for desde in range(0, productos, 5000):
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f"{rng.choice(tipos)} {rng.choice(detalles)} {rng.randint(1, 60)}mm", valor=rng.randint(1, 500) * 990,
+                descripcion=f"Ideal para {rng.choice(tipos).lower()} y {rng.choice(detalles)}.", stock=10,
+                marca=rng.choice(marcas), categoria=rng.choice(categorias), nro_referencia=f"C{i:07d}",
+                descuento=rng.choice([0] * 8 + [10, 20]),
+            )
+            for i in range(desde, min(desde + 5000, productos))
+        ], batch_size=1000)
+    sincronizar_productos(Producto.objects.all())
+    indexados = reconstruir_indice()
+    stdout.write(f"{productos} productos creados e indexados ({indexados}) en {time.perf_counter() - inicio:.1f}s")
+
+    cliente = Client(SERVER_NAME="localhost")
+    pesos = ", ".join(str(p) for p in PESOS)
+    ok = True
+    for termino in ["martillo", "taladro inalambrico", "tornillo acero", "brocha", "C00012"]:
+        respuesta, consultas = _contar_consultas(cliente.get, "/api/productos/", {"search": termino})
+        inicio = time.perf_counter()
+        cliente.get("/api/productos/", {"search": termino, "page_size": 23})
+        duracion = time.perf_counter() - inicio
+        ids = [p["id"] for p in respuesta.json()["results"]]
+        match = " ".join(f'"{t}"*' for t in termino.lower().split())
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH %s", [match])
+            coincidencias = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT rowid FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH %s "
+                f"ORDER BY bm25({TABLA_BUSQUEDA}, {pesos}), rowid LIMIT %s", [match, len(ids)],
+            )
+            esperados = [fila[0] for fila in cursor.fetchall()]
+        stdout.write(
+            f"search={termino!r}: coincidencias={coincidencias} consultas={consultas} "
+            f"{duracion * 1000:.0f}ms orden_bm25={ids == esperados}"
+        )
+        ok = ok and respuesta.status_code == 200 and bool(ids) and ids == esperados and duracion < 1
+
+    offsets = []
+    def contar_offsets(execute, sql, params, many, context):
+        if "OFFSET" in sql:
+            offsets.append(sql)
+        return execute(sql, params, many, context)
+    ordenes = {
+        "descuento": ("-descuento", "-id"), "precio_asc": ("valor", "id"), "nuevos": ("-fecha_creacion", "-id"),
+        "nombre": ("nombre", "id"),
+    }
+    for orden, campos in ordenes.items():
+        url, vistos, tiempos = f"/api/productos/?orden={orden}&page_size=100", [], []
+        with connection.execute_wrapper(contar_offsets):
+            for _ in range(paginas):
+                inicio = time.perf_counter()
+                datos = cliente.get(url).json()
+                tiempos.append(time.perf_counter() - inicio)
+                vistos.append([p["id"] for p in datos["results"]])
+                url = datos["next"]
+            anterior = [p["id"] for p in cliente.get(datos["previous"]).json()["results"]]
+        ids = [pk for pagina in vistos for pk in pagina]
+        esperados = list(Producto.objects.order_by(*campos).values_list("id", flat=True)[:len(ids)])
+        stdout.write(
+            f"orden={orden}: {paginas} páginas primera={tiempos[0] * 1000:.0f}ms última={tiempos[-1] * 1000:.0f}ms "
+            f"orden_ok={ids == esperados} anterior_ok={anterior == vistos[-2]}"
+        )
+        ok = ok and ids == esperados and anterior == vistos[-2]
+    # Relevancia: la posición del cursor incluye el valor de bm25()
+    url, ids = "/api/productos/?search=martillo&page_size=100", []
+    with connection.execute_wrapper(contar_offsets):
+        while url and len(ids) < paginas * 100:
+            datos = cliente.get(url).json()
+            ids += [p["id"] for p in datos["results"]]
+            url = datos["next"]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH %s "
+            f"ORDER BY bm25({TABLA_BUSQUEDA}, {pesos}), rowid LIMIT %s", ['"martillo"*', len(ids)],
+        )
+        esperados = [fila[0] for fila in cursor.fetchall()]
+    stdout.write(f"orden=relevancia: {len(ids)} productos orden_ok={ids == esperados}")
+    ok = ok and ids == esperados
+    stdout.write(f"consultas con OFFSET: {len(offsets)}")
+    return ok and not offsets
+
+@escenario("producto_save", guardados=300, ocupados=20000, referencias=20000, hilos=8)
+def producto_save(stdout, guardados, ocupados, referencias, hilos):
+    """
+    Consultas de Producto.save() según qué cambie (stock, categoría) y asignación
+    de N° de referencia desde la secuencia: sin repetidos aunque haya `ocupados`
+    números antiguos al azar y varios hilos reservando a la vez.
+    """
+    def consultas_marca_categoria(ctx):
+        return sum(1 for q in ctx.captured_queries if "core_marca_categorias" in q["sql"])
+
+    # Números antiguos asignados al azar, como antes de la secuencia
+    rng = random.Random(0)
+    marca, _ = Marca.objects.get_or_create(nombre="Marca Benchmark")
+    categoria, _ = Categoria.objects.get_or_create(nombre="Categoría Benchmark")
+    antiguos = rng.sample(range(100000, 100000 + ocupados + referencias * 2), ocupados)
+    Producto.objects.bulk_create([
+        Producto(nombre=f"Producto Antiguo {i}", marca=marca, categoria=categoria, valor=1000, nro_referencia=str(n))
+        for i, n in enumerate(antiguos)
+    ], batch_size=1000)
+
+    otra_categoria, _ = Categoria.objects.get_or_create(nombre="Categoría Benchmark 2")
+    productos = [_producto_demo(nombre=f"Producto Save {i}") for i in range(guardados)]
+    productos = list(Producto.objects.filter(pk__in=[p.pk for p in productos]))
+
+    connection.queries_log.clear()  # el registro de consultas guarda solo las últimas 9000
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        for producto in productos:
+            producto.stock -= 1
+            producto.save()
+        duracion = time.perf_counter() - inicio
+    vinculo_stock = consultas_marca_categoria(ctx)
+    stdout.write(
+        f"cambio de stock: {len(ctx.captured_queries) / guardados:.1f} consultas/save, "
+        f"marca-categoría={vinculo_stock} {duracion / guardados * 1000:.2f}ms/save"
+    )
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        for producto in productos:
+            producto.categoria = otra_categoria
+            producto.save()
+    vinculo_categoria = consultas_marca_categoria(ctx)
+    vinculado = productos[0].marca.categorias.filter(pk=otra_categoria.pk).exists()
+    stdout.write(f"cambio de categoría: marca-categoría={vinculo_categoria} (vinculada={vinculado})")
+
+    reservados = []
+    lock = threading.Lock()
+    def reservar_bloques():
+        for _ in range(10):
+            nros = reservar_nros_referencia(referencias // (hilos * 10))
+            with lock:
+                reservados.extend(nros)
+        connection.close()
+
+    inicio = time.perf_counter()
+    workers = [threading.Thread(target=reservar_bloques) for _ in range(hilos)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    duracion = time.perf_counter() - inicio
+    asignados = reservados + [p.nro_referencia for p in productos]
+    sin_colisiones = len(set(asignados)) == len(asignados) and not set(asignados) & {str(n) for n in antiguos}
+    stdout.write(
+        f"referencias: {len(reservados)} en {duracion * 1000:.0f}ms sin_colisiones={sin_colisiones}"
+    )
+    return vinculo_stock == 0 and vinculo_categoria <= 2 * guardados and vinculado and sin_colisiones
+
+@escenario("importacion", filas=100000, marcas=200, categorias=50, errores_pct=1)
+def importacion_catalogo(stdout, filas, marcas, categorias, errores_pct):
+    """
+    Importa un CSV de `filas` productos (con un `errores_pct`% de filas inválidas)
+    y lo vuelve a importar completo (todo actualizaciones). Verifica conteos,
+    catálogo e índice de búsqueda.
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryFile() as archivo:
+        texto = io.TextIOWrapper(archivo, encoding="utf-8", newline="", write_through=True)
+        escritor = csv.writer(texto)
+        escritor.writerow(["nro_referencia", "nombre", "marca", "categoria", "valor", "stock", "descripcion"])
+        invalidas = 0
+        for i in range(filas):
+            valor = rng.randint(1, 500) * 990
+            if rng.random() * 100 < errores_pct:
+                valor = "sin precio"
+                invalidas += 1
+            escritor.writerow([
+                f"I{i:05d}", f"Producto importado {i}", f"Marca Importada {i % marcas}",
+                f"Categoría Importada {i % categorias}", valor, rng.randint(0, 50), f"Descripción del producto {i}",
+            ])
+        texto.detach()
+
+        resultados = []
+        for pasada in ("inicial", "actualización"):
+            archivo.seek(0)
+            inicio = time.perf_counter()
+            resultado = importar_catalogo(archivo, "csv")
+            duracion = time.perf_counter() - inicio
+            resultados.append(resultado)
+            stdout.write(
+                f"{pasada}: filas={resultado['filas']} creados={resultado['creados']} "
+                f"actualizados={resultado['actualizados']} con_error={resultado['filas_con_error']} "
+                f"duracion={duracion:.1f}s ({resultado['filas'] / duracion:.0f} filas/s)"
+            )
+
+    validas = filas - invalidas
+    importados = Producto.objects.filter(nro_referencia__startswith="I")
+    en_catalogo = ProductoCatalogo.objects.filter(producto__in=importados).count()
+    en_indice = filtrar_productos(importados, "importado").count() if indice_disponible() else validas
+    stdout.write(f"productos={importados.count()} catalogo={en_catalogo} indice={en_indice} esperadas={validas}")
+    inicial, actualizacion = resultados
+    return (
+        inicial["creados"] == validas and actualizacion["actualizados"] == validas
+        and inicial["filas_con_error"] == invalidas and importados.count() == en_catalogo == validas
+        and en_indice == validas
+    )
+
+def _evento_checkout(tipo, carrito, pagado=True):
+    sesion = {
+        "id": f"cs_test_{carrito.id}", "object": "checkout.session", "amount_total": int(carrito.total_para_stripe()),
+        "payment_status": "paid" if pagado else "unpaid", "metadata": {"cart_id": str(carrito.id)},
+        "customer_details": {"email": f"{carrito.user.username}@example.com"},
+    }
+    evento = {"id": f"evt_{tipo.rsplit('.', 1)[-1]}_{carrito.id}", "type": tipo, "data": {"object": sesion}}
+    return json.dumps(evento).encode()
+
+@escenario("stripe_webhook", carritos=200, entregas=3, hilos=8, expirados_pct=10)
+def stripe_webhook(stdout, carritos, entregas, hilos, expirados_pct):
+    """
+    Stub local de Stripe: envía eventos firmados de checkout (completados y
+    vencidos) al webhook, cada uno `entregas` veces y desde varios hilos. Luego
+    el worker los procesa. Verifica un Pedido y un Pago por carrito pagado,
+    reservas confirmadas o liberadas y una sola consulta por entrega repetida.
+    """
+    producto = _producto_demo(stock=carritos * 2)
+    rng = random.Random(0)
+    pagados, vencidos = [], []
+    for i in range(carritos):
+        carrito = Cart.objects.create(user=User.objects.create_user(f"bench_stripe_{i}"))
+        agregar_item(carrito, producto, rng.randint(1, 2))
+        carrito.refresh_from_db()
+        asociar_sesion(reservar_carrito(carrito), f"cs_test_{carrito.id}")
+        (vencidos if rng.random() * 100 < expirados_pct else pagados).append(carrito)
+    eventos = [_evento_checkout("checkout.session.completed", c) for c in pagados]
+    eventos += [_evento_checkout("checkout.session.expired", c, pagado=False) for c in vencidos]
+    envios = [e for e in eventos for _ in range(entregas)]
+    rng.shuffle(envios)
+
+    respuestas = []
+    lock = threading.Lock()
+    def entregar(parte):
+        cliente = Client(SERVER_NAME="localhost")
+        try:
+            for payload in parte:
+                respuesta = cliente.post(
+                    "/api/pago/stripe/webhook/", data=payload, content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=firmar(payload),
+                )
+                with lock:
+                    respuestas.append(respuesta.status_code)
+        finally:
+            connection.close()
+
+    inicio = time.perf_counter()
+    workers = [threading.Thread(target=entregar, args=(envios[i::hilos],)) for i in range(hilos)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    duracion = time.perf_counter() - inicio
+    tareas = Tarea.objects.filter(tipo="procesar_evento_stripe").count()
+    stdout.write(
+        f"entregas={len(envios)} eventos={len(eventos)} respuestas_200={respuestas.count(200)} "
+        f"tareas_encoladas={tareas} duracion={duracion * 1000:.0f}ms ({len(envios) / duracion:.0f} entregas/s)"
+    )
+
+    cliente = Client(SERVER_NAME="localhost")
+    # El Client vacía connection.queries al iniciar cada request: se cuentan con un execute_wrapper
+    consultas = []
+    def contar(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+    with connection.execute_wrapper(contar):
+        duplicado = cliente.post(
+            "/api/pago/stripe/webhook/", data=eventos[0], content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=firmar(eventos[0]),
+        )
+    firma_mala = cliente.post(
+        "/api/pago/stripe/webhook/", data=eventos[0], content_type="application/json",
+        HTTP_STRIPE_SIGNATURE=firmar(eventos[0], secreto="whsec_otro"),
+    ).status_code
+    stdout.write(
+        f"entrega repetida: consultas={len(consultas)} duplicado={duplicado.json()['duplicado']} "
+        f"firma_invalida={firma_mala}"
+    )
+
+    inicio = time.perf_counter()
+    Worker(hilos=4).ejecutar()
+    duracion = time.perf_counter() - inicio
+    reprocesados = [procesar_evento(f"evt_completed_{c.id}") for c in pagados[:10]]
+    ids_pagados = [c.id for c in pagados]
+    pedidos = Pedido.objects.filter(carrito_id__in=ids_pagados)
+    pagos = Pago.objects.filter(pedido__in=pedidos, estado="COMPLETADO").count()
+    en_preparacion = pedidos.filter(estado="PREPARACION").count()
+    confirmadas = not ReservaStock.objects.filter(carrito_id__in=ids_pagados).exclude(estado="CONFIRMADA").exists()
+    liberadas = not ReservaStock.objects.filter(carrito__in=vencidos).exclude(estado="LIBERADA").exists()
+    reservado = ReservaStock.objects.filter(carrito_id__in=ids_pagados).aggregate(total=Sum("cantidad"))["total"] or 0
+    producto.refresh_from_db()
+    stock_ok = producto.stock == carritos * 2 - reservado
+    procesados = EventoStripe.objects.filter(estado="PROCESADO").count()
+    stdout.write(
+        f"worker: {duracion * 1000:.0f}ms pedidos={pedidos.count()} pagos={pagos} en_preparacion={en_preparacion} "
+        f"eventos_procesados={procesados} reservas_confirmadas={confirmadas} reservas_liberadas={liberadas} "
+        f"stock_ok={stock_ok} reproceso={set(reprocesados)}"
+    )
+    return (
+        respuestas.count(200) == len(envios) and tareas == len(eventos) and len(consultas) == 1
+        and firma_mala == 400 and pedidos.count() == pagos == en_preparacion == len(pagados)
+        and procesados == len(eventos) and confirmadas and liberadas and stock_ok and reprocesados == [None] * 10
+    )
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0
+
+@escenario("pasarela", carritos=100, hilos=8, latencia_ms=80, fallos_pct=20, timeout_ms=300, umbral=5)
+def pasarela_checkout(stdout, carritos, hilos, latencia_ms, fallos_pct, timeout_ms, umbral):
+    """
+    Checkout (POST /api/pago/stripe/) contra la pasarela falsa, en tres fases:
+    con errores 5xx al azar (se reintentan con la misma clave de idempotencia),
+    con Stripe caído (timeouts hasta que el interruptor se abre; luego 503
+    inmediatos) y recuperado (la llamada de prueba cierra el interruptor).
+    Verifica una sesión por carrito, que un doble envío reciba la misma sesión
+    y que los checkouts fallidos liberen sus reservas. Las fases usan quintos de
+    `carritos`: dobles envíos (1/5), resto con errores (4/5), caída (2/5) y
+    recuperado (1/5).
+    """
+    falsa = PasarelaFalsa(
+        latencia=latencia_ms / 1000, fallos=fallos_pct / 100, timeout_lectura=timeout_ms / 1000, semilla=0,
+        espera_base=0.02, presupuesto=timeout_ms * 4 / 1000, interruptor=Interruptor(umbral, enfriamiento=1.0),
+    )
+    quinto = carritos // 5
+    hilos_caida = 4
+    # Llamadas hasta que el interruptor se abre: `umbral` checkouts fallidos más los que ya estaban
+    # en curso, cada uno con sus reintentos. La fase de caída debe tener más checkouts que eso.
+    llamadas_apertura = (falsa.reintentos + 1) * (umbral + hilos_caida - 1)
+    if 2 * quinto <= llamadas_apertura:
+        raise CommandError(
+            f"pasarela necesita carritos >= {5 * (llamadas_apertura // 2 + 1)} con umbral={umbral}."
+        )
+    producto = _producto_demo(stock=carritos * 10)
+    usuarios = []
+    for i in range(carritos):
+        usuario = User.objects.create_user(f"bench_pasarela_{i}", email=f"bench_pasarela_{i}@example.com")
+        agregar_item(Cart.objects.create(user=usuario), producto, 1 + i % 3)
+        usuarios.append(usuario)
+
+    def checkout(parte, envios, resultados, lock):
+        cliente = Client(SERVER_NAME="localhost")
+        try:
+            for usuario in parte:
+                cliente.force_login(usuario)
+                for _ in range(envios):
+                    inicio = time.time()
+                    respuesta = cliente.post("/api/pago/stripe/")
+                    with lock:
+                        resultados.append((usuario.id, respuesta.status_code, respuesta.json(), inicio, time.time()))
+        finally:
+            connection.close()
+
+    def fase(nombre, usuarios_fase, concurrencia, envios=1):
+        resultados, lock = [], threading.Lock()
+        llamadas = falsa.llamadas
+        inicio = time.perf_counter()
+        workers = [
+            threading.Thread(target=checkout, args=(usuarios_fase[i::concurrencia], envios, resultados, lock))
+            for i in range(concurrencia)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        duracion = time.perf_counter() - inicio
+        codigos = {}
+        for _u, codigo, _d, _i, _f in resultados:
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+        latencias = [fin - ini for _u, _c, _d, ini, fin in resultados]
+        stdout.write(
+            f"{nombre}: checkouts={len(resultados)} codigos={codigos} llamadas_pasarela={falsa.llamadas - llamadas} "
+            f"p50={_percentil(latencias, 0.5) * 1000:.0f}ms p95={_percentil(latencias, 0.95) * 1000:.0f}ms "
+            f"max={max(latencias) * 1000:.0f}ms duracion={duracion * 1000:.0f}ms interruptor={falsa.interruptor.estado}"
+        )
+        return resultados, falsa.llamadas - llamadas
+
+    anterior = usar_pasarela(falsa)
+    try:
+        # El primer quinto de los carritos se envía dos veces seguidas (doble clic en "Pagar")
+        dobles, _llamadas = fase("con errores (doble envío)", usuarios[:quinto], hilos, envios=2)
+        normal, _llamadas = fase("con errores", usuarios[quinto:], hilos)
+        creadas = len(falsa.sesiones)
+        falsa.caida = True
+        caida, llamadas_caida = fase("caída", usuarios[:2 * quinto], hilos_caida)
+        falsa.caida = False
+        time.sleep(1.0)
+        recuperado, _llamadas = fase("recuperado", usuarios[2 * quinto:3 * quinto], 1)
+    finally:
+        usar_pasarela(anterior)
+
+    # El doble envío reutiliza la reserva: misma clave, mismos parámetros, misma sesión
+    por_usuario = {}
+    for u, c, d, _i, _f in dobles:
+        if c == 200:
+            por_usuario.setdefault(u, set()).add(d["sessionId"])
+    dobles_ok = all(len(sesiones) == 1 for sesiones in por_usuario.values())
+    exitosas = {d["sessionId"] for _u, c, d, _i, _f in dobles + normal if c == 200}
+    # Los reintentos repiten la clave: ninguna sesión de más en la pasarela
+    sesiones_ok = len(exitosas) == creadas
+    rapidos = [fin - ini for _u, c, _d, ini, fin in caida if c == 503 and fin - ini < timeout_ms / 1000]
+    # Un checkout fallido no deja stock retenido: cuenta el último intento de cada usuario
+    ultimo = {u: c for u, c, _d, _i, _f in dobles + normal + caida + recuperado}
+    fallidos = [u for u, c in ultimo.items() if c != 200]
+    reservas_ok = not ReservaStock.objects.filter(carrito__user_id__in=fallidos, estado="ACTIVA").exists()
+    stdout.write(
+        f"dobles_envios_misma_sesion={dobles_ok} sesiones_creadas={creadas} "
+        f"caída: 503 sin esperar timeout={len(rapidos)}/{len(caida)} llamadas={llamadas_caida} "
+        f"reservas_liberadas_en_fallos={reservas_ok}"
+    )
+    return (
+        dobles_ok and sesiones_ok and reservas_ok and rapidos and llamadas_caida < len(caida)
+        and all(c == 503 for _u, c, _d, _i, _f in caida) and all(c == 200 for _u, c, _d, _i, _f in recuperado)
+        and falsa.interruptor.estado == "CERRADO"
+    )
+
+def _contar_consultas(funcion, *args, **kwargs):
+    consultas = []
+    def contar(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+    with connection.execute_wrapper(contar):
+        resultado = funcion(*args, **kwargs)
+    return resultado, len(consultas)
+
+@escenario("checkout", lineas=200, hilos=8)
+def checkout_carrito(stdout, lineas, hilos):
+    """
+    Conversión de carritos en pedidos (core/checkout.py): consultas según la
+    cantidad de líneas, precios con descuento en el pedido, doble envío
+    concurrente (un solo pedido y un solo descuento de stock), carrito con las
+    reservas del pago en curso y un producto sin stock (no cambia nada).
+    """
+    productos = [
+        _producto_demo(stock=1000, nombre=f"Producto checkout {i}", valor=1000 + i, descuento=10 if i % 2 else 0)
+        for i in range(lineas)
+    ]
+    precios = {p.id: calcular_precio_con_descuento(p.valor, p.descuento) for p in productos}
+
+    def carrito_con(cantidad_lineas, nombre):
+        carrito = Cart.objects.create(user=User.objects.create_user(nombre, email=f"{nombre}@example.com"))
+        ItemCarrito.objects.bulk_create([
+            ItemCarrito(carrito=carrito, producto=p, cantidad=1 + i % 3, precio_unitario=p.valor)
+            for i, p in enumerate(productos[:cantidad_lineas])
+        ])
+        return carrito
+
+    def stock():
+        return dict(Producto.objects.filter(pk__in=precios).values_list("id", "stock"))
+
+    tamanos = sorted({1, 10, 50, lineas})
+    consultas = {}
+    correctos = True
+    for n in tamanos:
+        carrito = carrito_con(n, f"bench_checkout_{n}")
+        inicio = time.perf_counter()
+        (pedido, creado), consultas[n] = _contar_consultas(convertir_carrito, carrito)
+        duracion = time.perf_counter() - inicio
+        items = list(pedido.items.values_list("producto_id", "cantidad", "precio_unitario"))
+        esperado = sum(precios[p] * c for p, c, _precio in items)
+        correctos &= (
+            creado and len(items) == n and all(precio == precios[p] for p, _c, precio in items)
+            and pedido.total == esperado
+        )
+        stdout.write(f"{n} líneas: consultas={consultas[n]} duracion={duracion * 1000:.0f}ms total={pedido.total}")
+
+    # Doble envío: varios hilos convierten el mismo carrito a la vez
+    carrito = carrito_con(lineas, "bench_checkout_doble")
+    antes = stock()
+    resultados, lock = [], threading.Lock()
+    def convertir():
+        try:
+            resultado = convertir_carrito(carrito)
+            with lock:
+                resultados.append(resultado)
+        finally:
+            connection.close()
+    workers = [threading.Thread(target=convertir) for _ in range(hilos)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    despues = stock()
+    cantidades = dict(carrito.items.values_list("producto_id", "cantidad"))
+    doble_ok = (
+        len(resultados) == hilos and sum(creado for _p, creado in resultados) == 1
+        and len({p.pk for p, _c in resultados}) == 1 and Pedido.objects.filter(carrito=carrito).count() == 1
+        and ItemPedido.objects.filter(pedido__carrito=carrito).count() == lineas
+        and all(antes[p] - despues[p] == cantidades.get(p, 0) for p in antes)
+    )
+    _pedido, repetido = _contar_consultas(convertir_carrito, carrito)
+    stdout.write(f"doble envío: hilos={hilos} pedidos_creados={sum(c for _p, c in resultados)} correcto={doble_ok} "
+                 f"consultas_repetido={repetido}")
+
+    # Pago con Stripe: las reservas activas del carrito se confirman, no se descuenta otra vez
+    carrito = carrito_con(lineas, "bench_checkout_reservado")
+    reservar_carrito(carrito)
+    antes = stock()
+    _pedido, con_reservas = _contar_consultas(convertir_carrito, carrito, estado="PAGADO", fijar=False)
+    confirmadas = carrito.reservas.filter(estado="CONFIRMADA").count()
+    reservas_ok = stock() == antes and confirmadas == lineas and not carrito.reservas.filter(estado="ACTIVA").exists()
+    stdout.write(f"con reservas: consultas={con_reservas} confirmadas={confirmadas} stock_sin_cambios={reservas_ok}")
+
+    # Sin stock: no se crea el pedido ni se descuenta nada
+    carrito = carrito_con(lineas, "bench_checkout_sin_stock")
+    Producto.objects.filter(pk=productos[-1].pk).update(stock=0)
+    antes = stock()
+    try:
+        convertir_carrito(carrito)
+        sin_stock_ok = False
+    except StockInsuficiente as e:
+        carrito.refresh_from_db()
+        sin_stock_ok = (
+            e.producto_id == productos[-1].pk and stock() == antes and carrito.estado == "ACTIVO"
+            and not Pedido.objects.filter(carrito=carrito).exists()
+        )
+    stdout.write(f"sin stock: sin cambios={sin_stock_ok}")
+
+    # Las consultas no dependen de las líneas; solo crecen los bloques que impone el límite de
+    # 999 parámetros de SQLite (un UPDATE de stock y un INSERT de reservas cada ~150 productos)
+    constante = consultas[lineas] - consultas[10] <= 2 * (lineas // 150)
+    stdout.write(f"consultas por tamaño={consultas} constante={constante}")
+    return correctos and doble_ok and reservas_ok and sin_stock_ok and constante
+
+@escenario("permisos", peticiones=200)
+def permisos_en_sesion(stdout, peticiones):
+    """
+    Permisos por rol con los datos guardados en la sesión: consultas a perfiles
+    y roles por petición a un endpoint de bodeguero, antes y después de cambiar
+    el subrol, el rol o borrar la sucursal del empleado. Las versiones de roles
+    van en una caché compartida entre procesos (de archivos); con la LocMem por
+    defecto cada petición lee los roles de la base y una revocación vale de inmediato.
+    """
+    rol_empleado, _ = Rol.objects.get_or_create(nombre="EMPLEADO")
+    sucursal = Sucursal.objects.create(nombre="Sucursal permisos", direccion="-")
+    usuario = User.objects.create_user("bench_permisos_bodeguero")
+    cliente = Client(SERVER_NAME="localhost")
+    cliente.force_login(usuario)
+    UserProfile.objects.filter(user=usuario).update(rol=rol_empleado, tipo_empleado="BODEGUERO", sucursal=sucursal)
+
+    def pedir(ruta, veces=1):
+        consultas, codigos = [], set()
+        def contar(execute, sql, params, many, context):
+            if "core_userprofile" in sql or "core_rol" in sql:
+                consultas.append(sql)
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contar):
+            for _ in range(veces):
+                codigos.add(cliente.get(ruta).status_code)
+        return len(consultas), codigos, (time.perf_counter() - inicio) / veces
+
+    resultados = {}
+    # Sin caché compartida: una consulta por petición y el cambio (sin señales) se ve en la siguiente
+    resultados["local"] = pedir("/api/bodeguero/ordenes/", 10)
+    UserProfile.objects.filter(user=usuario).update(tipo_empleado="CONTADOR")
+    resultados["local_tras_revocar"] = pedir("/api/bodeguero/ordenes/")
+    UserProfile.objects.filter(user=usuario).update(tipo_empleado="BODEGUERO")
+
+    directorio = tempfile.mkdtemp(prefix="ferremas_roles_")
+    compartida = {
+        **settings.CACHES,
+        settings.ROLES_CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directorio},
+    }
+    try:
+        with override_settings(CACHES=compartida):
+            resultados["primera"] = pedir("/api/bodeguero/ordenes/")
+            resultados["siguientes"] = pedir("/api/bodeguero/ordenes/", peticiones)
+            # La vista lee el perfil para filtrar los turnos: esa es la única consulta esperada
+            resultados["cualquier_empleado"] = pedir("/api/empleados/historial_turnos/")
+
+            perfil = UserProfile.objects.get(user=usuario)
+            perfil.en_turno = True
+            perfil.save()
+            resultados["tras_marcar_turno"] = pedir("/api/bodeguero/ordenes/")
+            perfil.tipo_empleado = "CONTADOR"
+            perfil.save()
+            resultados["tras_cambio_subrol"] = pedir("/api/bodeguero/ordenes/", 2)
+            resultados["contador"] = pedir("/api/contador/reportes/")
+            sucursal.delete()
+            resultados["tras_borrar_sucursal"] = pedir("/api/contador/reportes/", 2)
+            # La base temporal no tiene otros roles: el rol del empleado pasa a ser CLIENTE
+            rol_empleado.nombre = "CLIENTE"
+            rol_empleado.save()
+            resultados["tras_cambio_rol"] = pedir("/api/contador/reportes/", 2)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    for nombre, (consultas, codigos, duracion) in resultados.items():
+        stdout.write(f"{nombre}: consultas_perfil_rol={consultas} codigos={sorted(codigos)} {duracion * 1000:.1f}ms/petición")
+    misma_clase = IsEmpleadoSubrol.with_subrol("BODEGUERO") is IsEmpleadoSubrol.with_subrol("BODEGUERO")
+    stdout.write(f"with_subrol reutiliza la clase={misma_clase}")
+    esperado = {
+        "local": (10, {200}), "local_tras_revocar": (1, {403}),
+        "primera": (1, {200}), "siguientes": (0, {200}), "cualquier_empleado": (1, {200}),
+        "tras_marcar_turno": (0, {200}), "tras_cambio_subrol": (1, {403}), "contador": (0, {200}),
+        "tras_borrar_sucursal": (1, {200}), "tras_cambio_rol": (1, {403}),
+    }
+    return misma_clase and all(resultados[k][:2] == v for k, v in esperado.items())
+
+def _escrituras(funcion, *args, **kwargs):
+    # Escrituras ejecutadas por tabla: {("UPDATE", "auth_user"): 1, ...}
+    escrituras = {}
+    def contar(execute, sql, params, many, context):
+        partes = sql.split(None, 3)
+        if partes[0] in ("INSERT", "UPDATE", "DELETE"):
+            tabla = partes[1] if partes[0] == "UPDATE" else partes[2]
+            clave = (partes[0], tabla.strip('"'))
+            escrituras[clave] = escrituras.get(clave, 0) + 1
+        return execute(sql, params, many, context)
+    with connection.execute_wrapper(contar):
+        resultado = funcion(*args, **kwargs)
+    return resultado, escrituras
+
+@escenario("login", logins=10)
+def login_escrituras(stdout, logins):
+    """
+    Escrituras de un login (last_login y la sesión, sin guardar el perfil) y
+    emails de turno: uno por entrada y uno por salida, aunque el perfil o el
+    usuario se guarden otras veces durante el turno.
+    """
+    rol_empleado, _ = Rol.objects.get_or_create(nombre="EMPLEADO")
+    usuario = User.objects.create_user("bench_login", email="bench_login@ferremas.cl", password="clave-benchmark-1")
+    perfil = UserProfile.objects.get(user=usuario)
+    perfil.rol = rol_empleado
+    perfil.tipo_empleado = "BODEGUERO"
+    perfil.save()
+    perfil.marcar_entrada()
+
+    # Django crea la sesión nueva (INSERT) y al responder guarda sus datos (UPDATE)
+    esperado = {("UPDATE", "auth_user"): 1, ("INSERT", "django_session"): 1, ("UPDATE", "django_session"): 1}
+    datos = {"username": "bench_login", "password": "clave-benchmark-1"}
+    ok = True
+    duraciones = []
+    for i in range(logins):
+        inicio = time.perf_counter()
+        respuesta, escrituras = _escrituras(Client(SERVER_NAME="localhost").post, "/api/auth/login/", datos)
+        duraciones.append(time.perf_counter() - inicio)
+        if i == 0:
+            stdout.write("escrituras del login: " + ", ".join(f"{op} {tabla}={n}" for (op, tabla), n in sorted(escrituras.items())))
+        ok = ok and respuesta.status_code == 200 and escrituras == esperado
+    stdout.write(f"{logins} logins: {sum(duraciones) / logins * 1000:.1f}ms/login, solo last_login y sesión={ok}")
+
+    # Otros saves durante el turno no reenvían el email de entrada
+    perfil = UserProfile.objects.get(pk=perfil.pk)
+    perfil.recibe_ofertas = False
+    perfil.save()
+    usuario.first_name = "Bench"
+    usuario.save()
+    perfil.marcar_salida()
+    perfil.save()
+    emails = dict(Notificacion.objects.values_list("tipo").annotate(n=Count("id")))
+    stdout.write(f"emails de turno: {emails}")
+    return ok and emails == {"TURNO_ENTRADA": 1, "TURNO_SALIDA": 1}
@@ -0,0 +1,167 @@
+"""
+Índice de búsqueda de productos basado en SQLite FTS5.
+
+La tabla virtual `core_producto_busqueda` guarda, por producto (rowid = id del
+producto), el nombre, la descripción, la marca, la categoría y el N° de referencia.
+El tokenizador unicode61 con remove_diacritics pliega los acentos, de modo que
+"martillo" encuentra "Martíllo" y viceversa. Los resultados se ordenan con BM25.
+
+En motores distintos de SQLite el índice no existe y la búsqueda cae a
+filtros icontains sobre los mismos campos.
+"""
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+
+TABLA = "core_producto_busqueda"
+COLUMNAS = ("nombre", "descripcion", "marca", "categoria", "nro_referencia")
+# Pesos BM25 por columna, en el mismo orden que COLUMNAS
+PESOS = (10.0, 1.0, 5.0, 3.0, 8.0)
+
+SQL_CREAR_INDICE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+    f"{', '.join(COLUMNAS)}, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+)
+
+def indice_disponible():
+    return connection.vendor == "sqlite"
+
+def normalizar_texto(texto):
+    """
+    Pasa a minúsculas y quita tildes/diéresis ("Eléctrico" -> "electrico").
+    """
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+def construir_consulta_fts(consulta):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5: cada término
+    se busca como prefijo (para type-ahead) y todos deben aparecer.
+    Devuelve None si no hay términos utilizables.
+    """
+    terminos = re.findall(r"\w+", normalizar_texto(consulta))
+    if not terminos:
+        return None
+    return " ".join(f'"{t}"*' for t in terminos)
+
+def _filas(productos):
+    # Lee solo las columnas necesarias, sin instanciar modelos
+    return productos.values_list(
+        "id", "nombre", "descripcion", "marca__nombre", "categoria__nombre", "nro_referencia"
+    ).iterator(chunk_size=2000)
+
+def _insertar(cursor, filas):
+    cursor.executemany(
+        f"INSERT INTO {TABLA} (rowid, {', '.join(COLUMNAS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+        [(pk, nombre, descripcion or "", marca or "", categoria or "", ref) for pk, nombre, descripcion, marca, categoria, ref in filas],
+    )
+
+def indexar_productos(productos, batch_size=1000):
+    """
+    (Re)indexa los productos del queryset dado, en lotes.
+    """
+    if not indice_disponible():
+        return 0
+    total = 0
+    lote = []
+    # Una transacción para todos los lotes: en autocommit cada fila del índice sería un commit
+    with transaction.atomic(), connection.cursor() as cursor:
+        for fila in _filas(productos):
+            lote.append(fila)
+            if len(lote) >= batch_size:
+                total += _reemplazar_lote(cursor, lote)
+                lote = []
+        if lote:
+            total += _reemplazar_lote(cursor, lote)
+    return total
+
+def _reemplazar_lote(cursor, lote):
+    ids = [fila[0] for fila in lote]
+    cursor.execute(
+        f"DELETE FROM {TABLA} WHERE rowid IN ({', '.join(['%s'] * len(ids))})", ids
+    )
+    _insertar(cursor, lote)
+    return len(lote)
+
+def indexar_producto(producto):
+    from .models import Producto
+    return indexar_productos(Producto.objects.filter(pk=producto.pk))
+
+def eliminar_producto(producto_id):
+    if not indice_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA} WHERE rowid = %s", [producto_id])
+
+def reconstruir_indice(batch_size=1000):
+    """
+    Vacía y vuelve a poblar el índice completo. Devuelve la cantidad indexada.
+    """
+    from .models import Producto
+    if not indice_disponible():
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_CREAR_INDICE)
+        cursor.execute(f"DELETE FROM {TABLA}")
+        total = 0
+        lote = []
+        for fila in _filas(Producto.objects.order_by("id")):
+            lote.append(fila)
+            if len(lote) >= batch_size:
+                _insertar(cursor, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            _insertar(cursor, lote)
+            total += len(lote)
+        # Compacta los segmentos del índice tras la carga masiva
+        cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+    return total
+
+class Coincide(Lookup):
+    """
+    `<columna oculta> MATCH <consulta>` de FTS5, usable directamente en filter().
+    """
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+class BM25(Func):
+    function = "bm25"
+    output_field = FloatField()
+
+def filtrar_productos(productos, consulta):
+    """
+    Filtra un queryset de Producto por el texto de búsqueda y lo anota con
+    `relevancia` (menor es mejor, como bm25()), para ordenar por ella.
+
+    El índice se une a Producto por rowid (ProductoBusqueda) y el MATCH se
+    evalúa una sola vez: SQLite recorre los resultados de FTS5 y busca cada
+    producto por su clave primaria.
+    """
+    if not indice_disponible():
+        for termino in (consulta or "").split():
+            productos = productos.filter(
+                Q(nombre__icontains=termino)
+                | Q(descripcion__icontains=termino)
+                | Q(marca__nombre__icontains=termino)
+                | Q(categoria__nombre__icontains=termino)
+                | Q(nro_referencia__startswith=termino)
+            )
+        return productos.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    match = construir_consulta_fts(consulta)
+    if match is None:
+        return productos.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    # busqueda__isnull=False en el mismo filter() fuerza un INNER JOIN: con LEFT JOIN
+    # SQLite recorrería los productos y evaluaría el MATCH por cada uno
+    return productos.filter(
+        Coincide(F("busqueda__indice"), match), busqueda__isnull=False
+    ).annotate(
+        relevancia=BM25(F("busqueda__indice"), *(Value(p) for p in PESOS))
+    )
@@ -0,0 +1,106 @@
+"""
+Caché de respuestas para los endpoints de catálogo (productos y categorías).
+
+Las entradas se guardan bajo una clave que incluye la versión del catálogo, un
+token aleatorio (uuid4). Cualquier cambio en Producto, Marca, Categoria o
+ImagenProducto lo reemplaza por uno nuevo (ver señales en models.py), con lo
+que las entradas anteriores dejan de consultarse y expiran solas por TTL. A
+diferencia de un contador, un token no se repite: si la clave de versión se
+pierde (la caché descarta entradas o se reinicia) no vuelven a quedar
+accesibles respuestas de una versión anterior.
+
+Cada entrada guarda también su ETag y Last-Modified, de modo que un acierto de
+caché y un GET condicional (304) no tocan la base de datos.
+
+El backend es el alias "catalogo" de CACHES: LocMem por defecto, o uno
+compartido (p. ej. Redis) para que todos los workers vean la misma versión.
+"""
+import functools
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+CLAVE_VERSION = "catalogo:version"
+
+def _cache():
+    return caches[getattr(settings, "CATALOGO_CACHE_ALIAS", "catalogo")]
+
+def version_catalogo():
+    cache = _cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(CLAVE_VERSION, version, timeout=None):
+            version = cache.get(CLAVE_VERSION, version)  # Otro proceso la creó primero
+    return version
+
+def _renovar_version():
+    _cache().set(CLAVE_VERSION, uuid.uuid4().hex, timeout=None)
+
+def invalidar_catalogo():
+    """
+    Invalida todas las respuestas cacheadas del catálogo. Si hay una transacción
+    abierta, espera al commit para no cachear datos que aún no son visibles.
+    """
+    transaction.on_commit(_renovar_version)
+
+def _clave(request, version):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    return f"catalogo:v{version}:{hashlib.md5(url.encode()).hexdigest()}"
+
+def _es_no_modificado(request, etag, ultima_modificacion):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        etags = [e.strip() for e in if_none_match.split(",")]
+        return etag in etags or "*" in etags
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    if if_modified_since and ultima_modificacion:
+        return int(ultima_modificacion) <= if_modified_since
+    return False
+
+def _con_cabeceras(response, etag, ultima_modificacion):
+    response["ETag"] = etag
+    if ultima_modificacion:
+        response["Last-Modified"] = http_date(ultima_modificacion)
+    response["Cache-Control"] = "no-cache"
+    return response
+
+def cache_catalogo(ultima_modificacion):
+    """
+    Decorador para métodos get de APIView del catálogo.
+    `ultima_modificacion(request, *args, **kwargs)` devuelve el datetime de la
+    última modificación del recurso (o None); solo se evalúa al llenar la caché.
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            cache = _cache()
+            version = version_catalogo()
+            clave = _clave(request, version)
+            entrada = cache.get(clave)
+            if entrada is None:
+                response = metodo(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                fecha = ultima_modificacion(request, *args, **kwargs)
+                entrada = {
+                    "data": response.data,
+                    "etag": f'W/"{version[:12]}-{clave[-12:]}"',
+                    "ultima_modificacion": fecha.timestamp() if fecha else None,
+                }
+                cache.set(clave, entrada, getattr(settings, "CATALOGO_CACHE_TTL", 900))
+            if _es_no_modificado(request, entrada["etag"], entrada["ultima_modificacion"]):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(entrada["data"])
+            return _con_cabeceras(response, entrada["etag"], entrada["ultima_modificacion"])
+        return envoltura
+    return decorador
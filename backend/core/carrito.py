@@ -0,0 +1,204 @@
+"""
+Operaciones sobre items del carrito con totales incrementales.
+
+Cart guarda subtotal, iva y total ya calculados. Cada alta, cambio o baja de un
+item ajusta esos montos en la base de datos con un único UPDATE con expresiones
+F(), de modo que leer el carrito no requiere recorrer sus items.
+
+Como subtotal = total_items - iva, la suma de los items es siempre subtotal + iva;
+el nuevo IVA se calcula a partir de ese valor más el delta, igual que en
+Cart.calcular_totales (redondeo half-up; nunca hay empates exactos con 19/119).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .models import Cart, ItemCarrito
+
+_CLP = DecimalField(max_digits=12, decimal_places=0)
+
+def _clp(expresion):
+    return ExpressionWrapper(expresion, output_field=_CLP)
+
+def ajustar_totales(carrito_id, delta):
+    """
+    Suma `delta` (CLP, puede ser negativo) al total de items del carrito y
+    recalcula iva, subtotal y total en la misma sentencia.
+    """
+    delta = Decimal(delta)
+    if not delta:
+        return
+    total_items = _clp(F("subtotal") + F("iva") + delta)
+    iva = Round(_clp(total_items * Value(19, output_field=_CLP) / Value(119.0)))
+    despacho = Case(
+        When(metodo_despacho="DESPACHO_DOMICILIO", then=F("costo_despacho")),
+        default=Value(0),
+        output_field=_CLP,
+    )
+    Cart.objects.filter(pk=carrito_id).update(
+        iva=iva,
+        subtotal=_clp(total_items - iva),
+        total=_clp(total_items + despacho),
+        updated_at=timezone.now(),
+    )
+
+def agregar_item(carrito, producto, cantidad):
+    """
+    Agrega `cantidad` unidades del producto al carrito (crea el item o suma a la cantidad existente).
+    Devuelve el item actualizado.
+    """
+    cantidad = int(cantidad)
+    with transaction.atomic():
+        item, created = ItemCarrito.objects.get_or_create(
+            carrito=carrito,
+            producto=producto,
+            defaults={"cantidad": cantidad, "precio_unitario": producto.valor},
+        )
+        if not created:
+            ItemCarrito.objects.filter(pk=item.pk).update(cantidad=F("cantidad") + cantidad)
+            item.cantidad += cantidad
+        ajustar_totales(carrito.pk, cantidad * item.precio_unitario)
+    return item
+
+def _bloquear(item):
+    # Cantidad y precio actuales del item, releídos con la fila bloqueada: dos cambios
+    # concurrentes no calculan su delta desde el mismo valor ya leído por la vista.
+    # Lanza ItemCarrito.DoesNotExist si otra petición ya lo eliminó.
+    return ItemCarrito.objects.select_for_update().values_list("cantidad", "precio_unitario").get(pk=item.pk)
+
+def cambiar_cantidad(item, cantidad):
+    """
+    Fija la cantidad de un item y ajusta los totales por la diferencia.
+    """
+    cantidad = int(cantidad)
+    with transaction.atomic():
+        anterior, item.precio_unitario = _bloquear(item)
+        ItemCarrito.objects.filter(pk=item.pk).update(cantidad=cantidad)
+        item.cantidad = cantidad
+        ajustar_totales(item.carrito_id, (cantidad - anterior) * item.precio_unitario)
+    return item
+
+def eliminar_item(item):
+    with transaction.atomic():
+        item.cantidad, item.precio_unitario = _bloquear(item)
+        ItemCarrito.objects.filter(pk=item.pk).delete()
+        ajustar_totales(item.carrito_id, -item.subtotal())
+
+def totales_disponibles(carrito, items):
+    """
+    Subtotal, IVA y total del carrito sin los items cuyo producto dejó de estar
+    disponible (no se muestran ni se cobran). `items` son los del carrito, con
+    su producto cargado; si todos están disponibles son los montos guardados.
+    """
+    no_disponible = sum(item.subtotal() for item in items if not item.producto.disponible)
+    if not no_disponible:
+        return {"subtotal": carrito.subtotal, "iva": carrito.iva, "total": carrito.total}
+    copia = Cart(metodo_despacho=carrito.metodo_despacho, costo_despacho=carrito.costo_despacho)
+    copia.calcular_totales(carrito.subtotal + carrito.iva - no_disponible)
+    return {"subtotal": copia.subtotal, "iva": copia.iva, "total": copia.total}
+
+def recalcular_totales(carrito):
+    """
+    Recalcula desde cero los totales guardados del carrito (una agregación y un UPDATE).
+    Útil si cambia el método o costo de despacho, o para reparar datos.
+    """
+    carrito.calcular_totales()
+    carrito.save(update_fields=["subtotal", "iva", "total", "updated_at"])
+    return carrito
+
+class OperacionesInvalidas(Exception):
+    """
+    Una o más operaciones de un lote no son válidas; no se aplicó ninguna.
+    `errores` es una lista de {"indice", "mensaje"}.
+    """
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(f"{len(errores)} operación(es) inválida(s).")
+
+ACCIONES = ("agregar", "fijar", "eliminar")
+MAX_OPERACIONES = 500
+
+def aplicar_operaciones(carrito, operaciones):
+    """
+    Aplica en una sola transacción una lista de operaciones sobre el carrito:
+      {"accion": "agregar", "producto_id": 1, "cantidad": 2}  suma unidades
+      {"accion": "fijar", "producto_id": 1, "cantidad": 5}    fija la cantidad
+      {"accion": "eliminar", "producto_id": 1}                quita la línea
+    Valida todos los productos con una consulta y escribe con bulk_create,
+    bulk_update y un DELETE; los totales se ajustan una sola vez.
+    Lanza OperacionesInvalidas sin modificar nada si alguna operación falla.
+    """
+    from .models import Producto
+
+    if not isinstance(operaciones, list) or not operaciones:
+        raise OperacionesInvalidas([{"indice": None, "mensaje": "Debes enviar una lista de operaciones."}])
+    if len(operaciones) > MAX_OPERACIONES:
+        raise OperacionesInvalidas([{"indice": None, "mensaje": f"Máximo {MAX_OPERACIONES} operaciones por lote."}])
+
+    errores = []
+    normalizadas = []
+    for i, op in enumerate(operaciones):
+        accion = op.get("accion") if isinstance(op, dict) else None
+        if accion not in ACCIONES:
+            errores.append({"indice": i, "mensaje": f"Acción inválida; usa una de: {', '.join(ACCIONES)}."})
+            continue
+        try:
+            producto_id = int(op.get("producto_id"))
+            cantidad = int(op.get("cantidad", 1)) if accion != "eliminar" else 0
+        except (TypeError, ValueError):
+            errores.append({"indice": i, "mensaje": "producto_id y cantidad deben ser enteros."})
+            continue
+        if accion != "eliminar" and cantidad < 1:
+            errores.append({"indice": i, "mensaje": "La cantidad debe ser mayor a 0."})
+            continue
+        normalizadas.append((i, accion, producto_id, cantidad))
+
+    ids = {producto_id for _, accion, producto_id, _ in normalizadas if accion != "eliminar"}
+    precios = dict(Producto.objects.filter(id__in=ids, disponible=True).values_list("id", "valor"))
+    for i, accion, producto_id, _ in normalizadas:
+        if accion != "eliminar" and producto_id not in precios:
+            errores.append({"indice": i, "mensaje": f"Producto #{producto_id} no encontrado o no disponible."})
+    if errores:
+        raise OperacionesInvalidas(sorted(errores, key=lambda e: (e["indice"] is not None, e["indice"])))
+
+    with transaction.atomic():
+        # Bloquea el carrito para que dos lotes concurrentes no se intercalen
+        Cart.objects.select_for_update().filter(pk=carrito.pk).exists()
+        existentes = {item.producto_id: item for item in ItemCarrito.objects.filter(carrito=carrito)}
+        cantidades = {producto_id: item.cantidad for producto_id, item in existentes.items()}
+        for _, accion, producto_id, cantidad in normalizadas:
+            if accion == "agregar":
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+            elif accion == "fijar":
+                cantidades[producto_id] = cantidad
+            else:
+                cantidades.pop(producto_id, None)
+
+        nuevos, modificados, eliminados = [], [], []
+        delta = Decimal(0)
+        for producto_id, item in existentes.items():
+            if producto_id not in cantidades:
+                eliminados.append(item.pk)
+                delta -= item.subtotal()
+            elif cantidades[producto_id] != item.cantidad:
+                delta += (cantidades[producto_id] - item.cantidad) * item.precio_unitario
+                item.cantidad = cantidades[producto_id]
+                modificados.append(item)
+        for producto_id, cantidad in cantidades.items():
+            if producto_id not in existentes:
+                nuevos.append(ItemCarrito(
+                    carrito=carrito, producto_id=producto_id, cantidad=cantidad, precio_unitario=precios[producto_id]
+                ))
+                delta += cantidad * precios[producto_id]
+
+        if eliminados:
+            ItemCarrito.objects.filter(pk__in=eliminados).delete()
+        if modificados:
+            ItemCarrito.objects.bulk_update(modificados, ["cantidad"])
+        if nuevos:
+            ItemCarrito.objects.bulk_create(nuevos)
+        ajustar_totales(carrito.pk, delta)
+    return {"creados": len(nuevos), "actualizados": len(modificados), "eliminados": len(eliminados)}
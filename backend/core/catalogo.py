@@ -0,0 +1,69 @@
+"""
+Mantenimiento de la proyección de lectura ProductoCatalogo.
+
+Cada producto tiene una fila con el nombre de su marca y categoría, la URL de su
+imagen principal y el precio con descuento ya calculado. Los serializers leen
+desde ahí con select_related("catalogo"), en una sola consulta.
+
+Las escrituras por save() se sincronizan con señales (models.py). Las
+actualizaciones masivas (queryset.update, bulk_create) deben llamar a
+sincronizar_productos() con los productos afectados.
+"""
+from decimal import Decimal, ROUND_DOWN
+
+from .models import Producto, ProductoCatalogo
+
+CAMPOS_ACTUALIZABLES = ["marca_nombre", "categoria_nombre", "imagen_url", "precio_con_descuento"]
+
+def calcular_precio_con_descuento(valor, descuento):
+    """
+    Precio final en CLP (entero, truncado) tras aplicar el descuento porcentual.
+    """
+    valor = Decimal(valor)
+    descuento = Decimal(str(descuento or 0))
+    if descuento > 0:
+        valor = valor * (Decimal('1') - descuento / Decimal('100'))
+    return valor.to_integral_value(rounding=ROUND_DOWN)
+
+def _fila(producto_id, valor, descuento, marca_nombre, categoria_nombre, imagen):
+    return ProductoCatalogo(
+        producto_id=producto_id,
+        marca_nombre=marca_nombre,
+        categoria_nombre=categoria_nombre,
+        imagen_url=Producto._meta.get_field("imagen_principal").storage.url(imagen) if imagen else "",
+        precio_con_descuento=calcular_precio_con_descuento(valor, descuento),
+    )
+
+def _guardar(filas):
+    ProductoCatalogo.objects.bulk_create(
+        filas, update_conflicts=True, unique_fields=["producto"], update_fields=CAMPOS_ACTUALIZABLES
+    )
+
+def sincronizar_producto(producto):
+    """
+    Inserta o actualiza la fila de un producto con un único upsert.
+    """
+    _guardar([_fila(
+        producto.pk, producto.valor, producto.descuento, producto.marca.nombre,
+        producto.categoria.nombre, producto.imagen_principal.name,
+    )])
+
+def sincronizar_productos(productos, batch_size=1000):
+    """
+    Recalcula en lotes las filas de los productos del queryset. Devuelve cuántas se escribieron.
+    """
+    filas = []
+    total = 0
+    valores = productos.order_by().values_list(
+        "id", "valor", "descuento", "marca__nombre", "categoria__nombre", "imagen_principal"
+    )
+    for valores_fila in valores.iterator(chunk_size=batch_size):
+        filas.append(_fila(*valores_fila))
+        if len(filas) >= batch_size:
+            _guardar(filas)
+            total += len(filas)
+            filas = []
+    if filas:
+        _guardar(filas)
+        total += len(filas)
+    return total
@@ -0,0 +1,167 @@
+"""
+Checkout: convierte un carrito en Pedido.
+
+`convertir_carrito` lo hace en una sola transacción y con un número fijo de
+consultas, tenga el carrito 2 o 200 líneas:
+
+1. Bloquea el carrito. Si ya tiene pedido lo devuelve: un doble envío o un
+   webhook repetido no crean otro pedido ni descuentan stock dos veces.
+2. Lee los items con el precio efectivo de su producto (ProductoCatalogo ya
+   aplica el descuento vigente) en una consulta y fija esos precios.
+3. Reserva el stock (core/reservas.py): confirma las reservas activas del
+   carrito si cubren exactamente sus items (las del pago en curso) o, si no,
+   las libera y descuenta todo de nuevo, con un UPDATE por bloque de productos.
+4. Calcula los totales una vez, crea el Pedido y todos sus ItemPedido con un
+   bulk_create y deja el carrito en el estado pedido (EN_PROCESO o PAGADO).
+
+El pago con Stripe calcula los precios sin escribirlos (`precios_vigentes`), y
+solo cuando la reserva y la sesión de pago se crearon los fija en el carrito
+(`guardar_precios`): un intento rechazado (sin stock, pasarela caída) no cambia
+el carrito. El webhook lo convierte con esos mismos precios (fijar=False): el
+pedido registra exactamente lo que se cobró.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .models import Cart, Cliente, ItemCarrito, ItemPedido, Pedido
+from .notificaciones import notificar_oferta_especial
+from .reservas import confirmar, liberar, reservar
+
+class CarritoNoDisponible(Exception):
+    """
+    El carrito está vacío o ya no está activo.
+    """
+
+def lineas_carrito(carrito):
+    """
+    Items del carrito con el nombre y el precio efectivo de su producto, en una
+    consulta: [{"id", "producto_id", "nombre", "cantidad", "precio_unitario", "precio"}].
+    """
+    return list(
+        carrito.items.order_by("id").values(
+            "id", "producto_id", "cantidad", "precio_unitario",
+            nombre=F("producto__nombre"),
+            precio=Coalesce("producto__catalogo__precio_con_descuento", "producto__valor"),
+        )
+    )
+
+def _fijar(carrito, lineas):
+    # Un UPDATE (por bloque) solo si algún precio cambió; los totales se calculan en memoria
+    cambios = [
+        ItemCarrito(pk=linea["id"], precio_unitario=linea["precio"])
+        for linea in lineas if linea["precio"] != linea["precio_unitario"]
+    ]
+    if cambios:
+        ItemCarrito.objects.bulk_update(cambios, ["precio_unitario"])
+        for linea in lineas:
+            linea["precio_unitario"] = linea["precio"]
+    carrito.calcular_totales(sum(linea["precio_unitario"] * linea["cantidad"] for linea in lineas))
+    return bool(cambios)
+
+def precios_vigentes(carrito):
+    """
+    Líneas del carrito (ver `lineas_carrito`) con los totales recalculados en
+    memoria al precio efectivo de cada producto, sin escribir nada: son los
+    montos que se cobrarían. `guardar_precios` los fija después.
+    """
+    lineas = lineas_carrito(carrito)
+    carrito.calcular_totales(sum(linea["precio"] * linea["cantidad"] for linea in lineas))
+    return lineas
+
+def guardar_precios(carrito, lineas):
+    """
+    Fija en los items y los totales del carrito los precios de `lineas`
+    (las de `precios_vigentes`).
+    """
+    with transaction.atomic():
+        if _fijar(carrito, lineas):
+            carrito.save(update_fields=["subtotal", "iva", "total", "updated_at"])
+    return lineas
+
+def fijar_precios(carrito):
+    """
+    Lleva cada item del carrito al precio efectivo de su producto y recalcula
+    los totales del carrito: son los montos que se cobran. Devuelve las líneas
+    (ver `lineas_carrito`).
+    """
+    with transaction.atomic():
+        return guardar_precios(carrito, lineas_carrito(carrito))
+
+def _reservar_stock(carrito, cantidades):
+    activas = carrito.reservas.select_for_update().filter(estado="ACTIVA").values_list("producto_id", "cantidad")
+    reservado = defaultdict(int)
+    for producto_id, cantidad in activas:
+        reservado[producto_id] += cantidad
+    if reservado == cantidades:
+        confirmar(carrito)
+        return
+    if reservado:
+        liberar(carrito.reservas.all())
+    reservar(carrito, cantidades.items(), estado="CONFIRMADA")
+
+def _cliente(user, email=None):
+    """
+    Cliente del usuario; se crea en su primera compra. El correo es único entre
+    clientes: si viene vacío o ya lo usa otro cliente se guarda nulo en vez de
+    fallar (en el webhook el pago ya se cobró). Sin correo no se notifica.
+    """
+    try:
+        return Cliente.objects.get(user=user)
+    except Cliente.DoesNotExist:
+        pass
+    email = email or user.email or None
+    if email and Cliente.objects.filter(email__iexact=email).exists():
+        email = None
+    cliente, _ = Cliente.objects.get_or_create(user=user, defaults={"email": email})
+    return cliente
+
+def convertir_carrito(carrito, estado="EN_PROCESO", email=None, fijar=True):
+    """
+    Convierte el carrito ACTIVO en un Pedido SOLICITADO y devuelve (pedido, creado).
+    Si el carrito ya tiene pedido lo devuelve sin cambios (creado=False).
+    Con fijar=False usa los precios ya guardados en el carrito (los cobrados).
+    Lanza CarritoNoDisponible o StockInsuficiente; en ese caso no cambia nada.
+    """
+    with transaction.atomic():
+        carrito = (
+            Cart.objects.select_for_update(of=("self",)).select_related("pedido", "user").get(pk=carrito.pk)
+        )
+        try:
+            return carrito.pedido, False
+        except Pedido.DoesNotExist:
+            pass
+        if carrito.estado != "ACTIVO":
+            raise CarritoNoDisponible("El carrito ya no está activo.")
+        lineas = lineas_carrito(carrito)
+        if not lineas:
+            raise CarritoNoDisponible("El carrito está vacío.")
+
+        cantidades = defaultdict(int)
+        for linea in lineas:
+            cantidades[linea["producto_id"]] += linea["cantidad"]
+        _reservar_stock(carrito, cantidades)
+        if fijar:
+            _fijar(carrito, lineas)
+        else:
+            carrito.calcular_totales(sum(linea["precio_unitario"] * linea["cantidad"] for linea in lineas))
+
+        cliente = _cliente(carrito.user, email)
+        pedido = Pedido.objects.create(
+            cliente=cliente, carrito=carrito, total=carrito.total,
+            metodo_retiro=carrito.metodo_despacho or "RETIRO_TIENDA", direccion_envio_id=carrito.direccion_envio_id,
+        )
+        # bulk_create no dispara post_save de ItemPedido: el resumen del día ya lo marca la señal del Pedido
+        ItemPedido.objects.bulk_create([
+            ItemPedido(pedido=pedido, producto_id=linea["producto_id"], cantidad=linea["cantidad"],
+                       precio_unitario=linea["precio_unitario"])
+            for linea in lineas
+        ])
+        carrito.estado = estado
+        carrito.save(update_fields=["estado", "subtotal", "iva", "total", "updated_at"])
+        # La señal de creación del Pedido corre antes de que existan sus items
+        if sum(cantidades.values()) > 4:
+            notificar_oferta_especial(cliente, pedido)
+    return pedido, True
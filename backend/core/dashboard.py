@@ -0,0 +1,101 @@
+"""
+Resumen general del dashboard de administrador.
+
+Cada tabla se recorre una sola vez con agregados condicionales: ventas desde
+VentaDiaria, clientes desde Cliente e inventario con Sum(stock * valor) en la
+base de datos. El resultado se cachea unos segundos (ADMIN_OVERVIEW_CACHE_TTL),
+así que recargas seguidas del dashboard no consultan la base de datos.
+
+La variación del inventario compara el valor actual con la foto
+(InventarioSnapshot) de hace DIAS_COMPARACION días o, si aún no hay historia
+suficiente, con la más antigua disponible. La foto del día se registra al
+calcular el resumen y con `python manage.py registrar_inventario` (cron diario).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import Cliente, InventarioSnapshot, Producto, VentaDiaria
+
+CLAVE_CACHE = "dashboard:resumen_general"
+DIAS_COMPARACION = 30
+
+def _ttl():
+    return getattr(settings, "ADMIN_OVERVIEW_CACHE_TTL", 60)
+
+def valor_inventario():
+    """
+    Valor total (stock * valor), unidades y cantidad de productos, en una consulta.
+    """
+    totales = Producto.objects.aggregate(
+        valor_total=Sum(ExpressionWrapper(F("stock") * F("valor"), output_field=DecimalField(max_digits=16, decimal_places=0))),
+        unidades=Sum("stock"),
+        productos=Count("id"),
+    )
+    return {clave: int(valor or 0) for clave, valor in totales.items()}
+
+def registrar_inventario(fecha=None, totales=None):
+    """
+    Guarda (o actualiza) la foto del inventario del día. Devuelve el snapshot.
+    """
+    fecha = fecha or timezone.localdate()
+    totales = totales or valor_inventario()
+    snapshot, _ = InventarioSnapshot.objects.update_or_create(fecha=fecha, defaults=totales)
+    return snapshot
+
+def _snapshot_referencia(hoy):
+    limite = hoy - timedelta(days=DIAS_COMPARACION)
+    anterior = InventarioSnapshot.objects.filter(fecha__lte=limite).order_by("-fecha").first()
+    return anterior or InventarioSnapshot.objects.filter(fecha__lt=hoy).order_by("fecha").first()
+
+def variacion_porcentual(actual, anterior):
+    if not anterior:
+        return 0.0
+    return float((actual - anterior) / anterior * 100)
+
+def calcular_resumen():
+    ahora = timezone.now()
+    hoy = timezone.localdate(ahora)
+    desde = hoy - timedelta(days=DIAS_COMPARACION)
+
+    ventas = VentaDiaria.objects.filter(sucursal__isnull=True).aggregate(
+        total_revenue=Sum("ingresos_entregados"),
+        revenue_last_month=Sum("ingresos_entregados", filter=Q(fecha__gte=desde)),
+        orders=Sum("ordenes_entregado"),
+        orders_last_month=Sum("ordenes_entregado", filter=Q(fecha__gte=desde)),
+    )
+    clientes = Cliente.objects.aggregate(
+        customers=Count("id"),
+        customers_last_month=Count("id", filter=Q(fecha_registro__gte=ahora - timedelta(days=DIAS_COMPARACION))),
+    )
+    inventario = valor_inventario()
+    referencia = _snapshot_referencia(hoy)
+    registrar_inventario(hoy, inventario)
+
+    total_revenue = int(ventas["total_revenue"] or 0)
+    orders = int(ventas["orders"] or 0)
+    return {
+        "total_revenue": total_revenue,
+        "revenue_change": variacion_porcentual(int(ventas["revenue_last_month"] or 0), total_revenue),
+        "orders": orders,
+        "orders_change": variacion_porcentual(int(ventas["orders_last_month"] or 0), orders),
+        "customers": clientes["customers"],
+        "customers_change": variacion_porcentual(clientes["customers_last_month"], clientes["customers"]),
+        "inventory_value": inventario["valor_total"],
+        "inventory_change": variacion_porcentual(
+            inventario["valor_total"], int(referencia.valor_total) if referencia else 0
+        ),
+    }
+
+def resumen_general():
+    """
+    Resumen del dashboard, desde caché si se calculó hace menos de ADMIN_OVERVIEW_CACHE_TTL segundos.
+    """
+    datos = cache.get(CLAVE_CACHE)
+    if datos is None:
+        datos = calcular_resumen()
+        cache.set(CLAVE_CACHE, datos, _ttl())
+    return datos
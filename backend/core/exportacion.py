@@ -0,0 +1,205 @@
+"""
+Exportación del reporte financiero a XLSX y CSV con memoria acotada.
+
+El detalle de pedidos se lee con values_list().iterator(chunk_size), sin
+instanciar modelos ni cargar todas las filas a la vez.
+
+- CSV: se genera fila a fila dentro de un StreamingHttpResponse.
+- XLSX: openpyxl en modo write-only escribe cada fila directamente al XML del
+  libro, y el libro se guarda en un archivo temporal que luego se envía por
+  partes con FileResponse (un .xlsx es un zip y no puede emitirse mientras se escribe).
+
+Para rangos grandes la exportación puede ejecutarse en segundo plano
+(ExportacionReporte): una Tarea del worker (core/tareas.py) genera el archivo
+en MEDIA_ROOT/reportes/ y el cliente consulta su estado y lo descarga al terminar.
+Como las tareas, la exportación en curso queda reservada por RESERVA_SEGUNDOS
+(renovados mientras avanza): si el worker muere, el reintento de la Tarea la
+retoma y reemplaza lo que haya quedado del intento anterior.
+"""
+import csv
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .models import ExportacionReporte, Pedido
+from .reportes import rango_datetime, resumen_ventas
+from .tareas import RESERVA_SEGUNDOS, encolar
+
+CHUNK_SIZE = 2000
+
+COLUMNAS_RESUMEN = ["Fecha", "Órdenes Totales", "Entregadas", "Canceladas", "En preparación", "Ingresos (CLP)"]
+COLUMNAS_DETALLE = ["ID", "Cliente", "Fecha", "Estado", "Total (CLP)"]
+
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def filas_resumen(desde, hasta):
+    for fila in reversed(resumen_ventas(desde, hasta)):
+        yield [
+            fila["periodo"].strftime("%Y-%m-%d"),
+            fila["total_ordenes"],
+            fila["ordenes_entregado"],
+            fila["ordenes_cancelado"],
+            fila["ordenes_preparacion"],
+            fila["ingresos_entregados"],
+        ]
+
+def filas_detalle(desde, hasta, chunk_size=CHUNK_SIZE, progreso=None):
+    """
+    Genera las filas del detalle de pedidos del rango, leídas por bloques.
+    Si se indica `progreso(hechos, total)`, se llama tras cada bloque.
+    """
+    inicio, fin = rango_datetime(desde, hasta)
+    pedidos = Pedido.objects.filter(fecha_creacion__gte=inicio, fecha_creacion__lt=fin)
+    total = pedidos.count() if progreso else None
+    pedidos = pedidos.order_by("fecha_creacion", "id").values_list(
+        "id", "cliente__user__username", "fecha_creacion", "estado", "total"
+    )
+    for i, (pk, username, fecha, estado, monto) in enumerate(pedidos.iterator(chunk_size=chunk_size), 1):
+        yield [pk, username or "", timezone.localtime(fecha).strftime("%Y-%m-%d %H:%M"), estado, int(monto)]
+        if progreso and i % chunk_size == 0:
+            progreso(i, total)
+
+def escribir_xlsx(destino, desde, hasta, progreso=None):
+    """
+    Escribe el libro (hoja de resumen y hoja de detalle) en `destino` (ruta o
+    archivo binario). Devuelve la cantidad de pedidos exportados.
+    """
+    wb = Workbook(write_only=True)
+    ws_resumen = wb.create_sheet(title="Resumen Diario")
+    ws_resumen.append(COLUMNAS_RESUMEN)
+    for fila in filas_resumen(desde, hasta):
+        ws_resumen.append(fila)
+
+    ws_detalle = wb.create_sheet(title="Órdenes Detalle")
+    ws_detalle.append(COLUMNAS_DETALLE)
+    total = 0
+    for fila in filas_detalle(desde, hasta, progreso=progreso):
+        ws_detalle.append(fila)
+        total += 1
+    wb.save(destino)
+    return total
+
+class _Eco:
+    """
+    Pseudo-archivo para csv.writer: devuelve cada línea en vez de guardarla.
+    """
+    def write(self, valor):
+        return valor
+
+def lineas_csv(desde, hasta, progreso=None):
+    """
+    Genera el CSV del detalle de pedidos línea a línea (con BOM para Excel).
+    """
+    writer = csv.writer(_Eco())
+    yield "\ufeff"
+    yield writer.writerow(COLUMNAS_DETALLE)
+    for fila in filas_detalle(desde, hasta, progreso=progreso):
+        yield writer.writerow(fila)
+
+def nombre_archivo(formato, desde, hasta):
+    return f"reporte_financiero_{desde:%Y%m%d}_{hasta:%Y%m%d}.{formato}"
+
+def respuesta_exportacion(formato, desde, hasta):
+    """
+    Respuesta HTTP con la exportación, sin cargar el reporte completo en memoria.
+    """
+    nombre = nombre_archivo(formato, desde, hasta)
+    if formato == "csv":
+        response = StreamingHttpResponse(lineas_csv(desde, hasta), content_type=CONTENT_TYPES["csv"])
+        response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+        return response
+    # El archivo temporal se borra al cerrarse, cuando FileResponse termina de enviarlo
+    temporal = tempfile.TemporaryFile()
+    escribir_xlsx(temporal, desde, hasta)
+    temporal.seek(0)
+    return FileResponse(temporal, as_attachment=True, filename=nombre, content_type=CONTENT_TYPES["xlsx"])
+
+def _reclamar(exportacion_id):
+    """
+    Marca la exportación PROCESANDO si está pendiente o si su reserva venció
+    (también las que quedaron PROCESANDO sin reserva). Devuelve True si la tomó.
+    """
+    ahora = timezone.now()
+    disponible = Q(estado="PENDIENTE") | Q(estado="PROCESANDO") & (
+        Q(reservada_hasta__lt=ahora) | Q(reservada_hasta__isnull=True)
+    )
+    return ExportacionReporte.objects.filter(disponible, pk=exportacion_id).update(
+        estado="PROCESANDO", reservada_hasta=ahora + timedelta(seconds=RESERVA_SEGUNDOS)
+    ) > 0
+
+class _Avance:
+    """
+    Callback de progreso de filas_detalle: informa a la Tarea y renueva la
+    reserva de la exportación cada RESERVA_SEGUNDOS / 4.
+    """
+    def __init__(self, exportacion_id, progreso=None):
+        self.exportacion_id = exportacion_id
+        self.progreso = progreso
+        self.renovada = time.monotonic()
+
+    def __call__(self, hechos, total=None):
+        if self.progreso:
+            self.progreso(hechos, total)
+        if time.monotonic() - self.renovada >= RESERVA_SEGUNDOS / 4:
+            self.renovada = time.monotonic()
+            ExportacionReporte.objects.filter(pk=self.exportacion_id, estado="PROCESANDO").update(
+                reservada_hasta=timezone.now() + timedelta(seconds=RESERVA_SEGUNDOS)
+            )
+
+def generar_exportacion(exportacion_id, progreso=None):
+    """
+    Genera el archivo de una ExportacionReporte pendiente (o abandonada por un
+    worker que murió) y actualiza su estado. Devuelve None si otro la procesa.
+    """
+    if not _reclamar(exportacion_id):
+        return None
+    exportacion = ExportacionReporte.objects.get(pk=exportacion_id)
+    archivo = exportacion.archivo
+    # Ruta fija por exportación: un reintento borra el archivo a medio guardar del intento anterior
+    ruta = archivo.field.generate_filename(
+        exportacion, f"{exportacion.pk}_{nombre_archivo(exportacion.formato, exportacion.desde, exportacion.hasta)}"
+    )
+    archivo.storage.delete(ruta)
+    avance = _Avance(exportacion_id, progreso)
+    try:
+        with tempfile.TemporaryFile() as temporal:
+            if exportacion.formato == "csv":
+                lineas = 0
+                for linea in lineas_csv(exportacion.desde, exportacion.hasta, avance):
+                    temporal.write(linea.encode("utf-8"))
+                    lineas += 1
+                filas = lineas - 2  # BOM y cabecera
+            else:
+                filas = escribir_xlsx(temporal, exportacion.desde, exportacion.hasta, avance)
+            temporal.seek(0)
+            exportacion.archivo.name = archivo.storage.save(ruta, File(temporal))
+        exportacion.filas = filas
+        exportacion.estado = "COMPLETADA"
+    except Exception as e:
+        archivo.storage.delete(ruta)
+        exportacion.archivo = None
+        exportacion.estado = "ERROR"
+        exportacion.error = str(e)
+    exportacion.terminada_en = timezone.now()
+    exportacion.reservada_hasta = None
+    exportacion.save(update_fields=["archivo", "filas", "estado", "error", "reservada_hasta", "terminada_en"])
+    return exportacion
+
+def encolar_exportacion(usuario, formato, desde, hasta):
+    """
+    Crea una ExportacionReporte y la Tarea que la genera en el worker
+    (`python manage.py runworker`). Devuelve (exportacion, tarea).
+    """
+    exportacion = ExportacionReporte.objects.create(
+        solicitado_por=usuario, formato=formato, desde=desde, hasta=hasta
+    )
+    return exportacion, encolar("generar_exportacion", usuario, exportacion_id=exportacion.pk)
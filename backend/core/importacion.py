@@ -0,0 +1,291 @@
+"""
+Importación masiva del catálogo de un proveedor desde CSV o XLSX.
+
+El archivo se lee fila a fila (csv.reader / openpyxl en modo read-only) y
+se escribe por lotes de `batch_size` filas válidas, cada lote en su transacción:
+
+- Marca y Categoria: las que no existen se crean con bulk_create(ignore_conflicts)
+  y se buscan sin distinguir mayúsculas ni tildes.
+- Producto: bulk_create(update_conflicts=True) sobre `nro_referencia`. Las filas
+  sin referencia son productos nuevos y reciben números de la secuencia.
+- Vínculos marca-categoría, ProductoCatalogo e índice de búsqueda: una escritura
+  por lote (bulk_create no dispara las señales de Producto).
+
+Las filas inválidas no detienen la importación: se informan con su número de
+fila y los errores. La caché del catálogo se invalida una vez al terminar.
+
+Stock: el archivo fija el stock de los productos nuevos, pero por defecto no
+toca el de los existentes. Ese stock es el que descuentan las ventas y las
+reservas de los checkouts en curso, y una lista de precios del proveedor no lo
+conoce. Con `actualizar_stock=True` (`--actualizar-stock` en el comando) el
+stock del archivo se toma como las unidades físicas. A los productos existentes
+se les restan sus reservas ACTIVAS: esas unidades siguen retenidas para los
+pagos en curso, y reponerlas sería vender dos veces.
+
+Columnas (la cabecera se compara sin mayúsculas ni tildes): nombre, marca,
+categoria, valor (o precio) obligatorias; nro_referencia (o referencia),
+descripcion, stock y sucursal (id o nombre) opcionales.
+"""
+import csv
+import io
+import itertools
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .busqueda import indexar_productos, normalizar_texto
+from .cache_catalogo import invalidar_catalogo
+from .catalogo import sincronizar_productos
+from .models import Categoria, Marca, Producto, ReservaStock, Sucursal, reservar_nros_referencia
+
+BATCH_SIZE = 1000
+MAX_ERRORES_INFORMADOS = 200
+
+FORMATOS = ("csv", "xlsx")
+COLUMNAS_OBLIGATORIAS = ("nombre", "marca", "categoria", "valor")
+ALIAS_COLUMNAS = {
+    "referencia": "nro_referencia",
+    "n° referencia": "nro_referencia",
+    "nro referencia": "nro_referencia",
+    "precio": "valor",
+}
+MILES = re.compile(r"\d{1,3}(\.\d{3})+")
+CAMPOS_ACTUALIZADOS = ["nombre", "descripcion", "marca", "categoria", "sucursal", "valor", "fecha_actualizacion"]
+CAMPOS_STOCK = ["stock", "disponible"]
+
+class ArchivoInvalido(Exception):
+    """
+    El archivo no se puede leer o le faltan columnas obligatorias.
+    """
+
+def formato_de(nombre_archivo):
+    formato = nombre_archivo.rsplit(".", 1)[-1].lower() if "." in nombre_archivo else ""
+    if formato not in FORMATOS:
+        raise ArchivoInvalido(f"Formato no soportado: usa {' o '.join(FORMATOS)}.")
+    return formato
+
+def _columna(cabecera):
+    nombre = normalizar_texto(str(cabecera or "")).strip()
+    return ALIAS_COLUMNAS.get(nombre, nombre)
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        primera = texto.readline()
+        # Excel en español guarda los CSV separados por punto y coma
+        delimitador = ";" if primera.count(";") > primera.count(",") else ","
+        yield from csv.reader(itertools.chain([primera], texto), delimiter=delimitador)
+    finally:
+        # Sin detach, el wrapper cerraría el archivo del llamador al descartarse
+        texto.detach()
+
+def _filas_xlsx(archivo):
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+def leer_filas(archivo, formato):
+    """
+    Genera (número de fila, {columna: valor}) del archivo binario dado.
+    La fila 1 es la cabecera; las filas vacías se omiten.
+    """
+    filas = _filas_csv(archivo) if formato == "csv" else _filas_xlsx(archivo)
+    try:
+        columnas = [_columna(c) for c in next(filas)]
+    except StopIteration:
+        raise ArchivoInvalido("El archivo está vacío.")
+    except (UnicodeDecodeError, csv.Error, OSError, ValueError) as e:
+        raise ArchivoInvalido(f"No se pudo leer el archivo: {e}")
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+    for numero, valores in enumerate(filas, 2):
+        if not any(v not in (None, "") for v in valores):
+            continue
+        yield numero, dict(zip(columnas, valores))
+
+def _texto(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # Excel entrega 123456 como 123456.0
+    return "" if valor is None else str(valor).strip()
+
+def _entero(valor, campo, minimo, errores):
+    texto = _texto(valor).replace("$", "").replace(" ", "")
+    # Precios con separador de miles: "12.990"
+    if MILES.fullmatch(texto):
+        texto = texto.replace(".", "")
+    if not texto:
+        errores.append(f"{campo}: es obligatorio.")
+        return None
+    try:
+        numero = Decimal(texto.replace(",", "."))
+    except InvalidOperation:
+        errores.append(f"{campo}: no es un número.")
+        return None
+    if numero != numero.to_integral_value():
+        errores.append(f"{campo}: debe ser un número entero.")
+        return None
+    if numero < minimo:
+        errores.append(f"{campo}: debe ser mayor o igual a {minimo}.")
+        return None
+    return int(numero)
+
+def validar_fila(fila, sucursales):
+    """
+    Devuelve (datos limpios, errores) de una fila del archivo.
+    """
+    errores = []
+    datos = {
+        "nro_referencia": _texto(fila.get("nro_referencia")),
+        "nombre": _texto(fila.get("nombre")),
+        "descripcion": _texto(fila.get("descripcion")),
+        "marca": _texto(fila.get("marca")),
+        "categoria": _texto(fila.get("categoria")),
+    }
+    for campo, largo in (("nombre", 200), ("marca", 100), ("categoria", 100), ("nro_referencia", 6)):
+        if campo != "nro_referencia" and not datos[campo]:
+            errores.append(f"{campo}: es obligatorio.")
+        elif len(datos[campo]) > largo:
+            errores.append(f"{campo}: máximo {largo} caracteres.")
+    datos["valor"] = _entero(fila.get("valor"), "valor", 1, errores)
+    stock = fila.get("stock")
+    datos["stock"] = _entero(stock, "stock", 0, errores) if _texto(stock) else 0
+    sucursal = _texto(fila.get("sucursal"))
+    datos["sucursal_id"] = None
+    if sucursal:
+        datos["sucursal_id"] = sucursales.get(normalizar_texto(sucursal))
+        if datos["sucursal_id"] is None:
+            errores.append(f"sucursal: no existe «{sucursal}».")
+    return datos, errores
+
+class ImportadorCatalogo:
+    """
+    Acumula filas válidas y las escribe por lotes. Usar con `agregar` y `terminar`,
+    o directamente con `importar(filas)`.
+    """
+    def __init__(self, batch_size=BATCH_SIZE, progreso=None, max_errores=MAX_ERRORES_INFORMADOS, actualizar_stock=False):
+        self.batch_size = batch_size
+        self.actualizar_stock = actualizar_stock
+        self.progreso = progreso
+        self.max_errores = max_errores
+        self.lote = {}
+        self.marcas = {normalizar_texto(n): pk for pk, n in Marca.objects.values_list("id", "nombre")}
+        self.categorias = {normalizar_texto(n): pk for pk, n in Categoria.objects.values_list("id", "nombre")}
+        self.sucursales = {}
+        for pk, nombre in Sucursal.objects.values_list("id", "nombre"):
+            self.sucursales.setdefault(normalizar_texto(nombre), pk)
+            self.sucursales[str(pk)] = pk
+        self.resultado = {
+            "filas": 0, "creados": 0, "actualizados": 0, "marcas_creadas": 0, "categorias_creadas": 0,
+            "filas_con_error": 0, "errores": [],
+        }
+
+    def agregar(self, numero, fila):
+        self.resultado["filas"] += 1
+        datos, errores = validar_fila(fila, self.sucursales)
+        if errores:
+            self.resultado["filas_con_error"] += 1
+            if len(self.resultado["errores"]) < self.max_errores:
+                self.resultado["errores"].append({"fila": numero, "errores": errores})
+        else:
+            # Una referencia repetida en el mismo lote: vale la última fila (el upsert no admite duplicados)
+            self.lote[datos["nro_referencia"] or ("fila", numero)] = datos
+            if len(self.lote) >= self.batch_size:
+                self._escribir_lote()
+        if self.progreso:
+            self.progreso(self.resultado["filas"], mensaje=f"{self.resultado['filas']} filas procesadas")
+
+    def terminar(self):
+        if self.lote:
+            self._escribir_lote()
+        if self.resultado["creados"] or self.resultado["actualizados"]:
+            invalidar_catalogo()
+        return self.resultado
+
+    def importar(self, filas):
+        for numero, fila in filas:
+            self.agregar(numero, fila)
+        return self.terminar()
+
+    def _ids(self, modelo, cache, nombres):
+        """
+        Id de cada nombre, creando en un solo INSERT los que no existen.
+        """
+        nuevos = {}
+        for nombre in nombres:
+            clave = normalizar_texto(nombre)
+            if clave not in cache:
+                nuevos.setdefault(clave, nombre)
+        if nuevos:
+            modelo.objects.bulk_create([modelo(nombre=n) for n in nuevos.values()], ignore_conflicts=True)
+            for pk, nombre in modelo.objects.filter(nombre__in=nuevos.values()).values_list("id", "nombre"):
+                cache[normalizar_texto(nombre)] = pk
+        return len(nuevos)
+
+    def _referencias_nuevas(self, cantidad, usadas_en_lote):
+        # La secuencia solo salta las referencias ya guardadas, no las del lote en curso
+        nuevas = []
+        while len(nuevas) < cantidad:
+            nuevas.extend(n for n in reservar_nros_referencia(cantidad - len(nuevas)) if n not in usadas_en_lote)
+        return iter(nuevas)
+
+    def _escribir_lote(self):
+        lote = list(self.lote.values())
+        self.lote = {}
+        ahora = timezone.now()
+        with transaction.atomic():
+            self.resultado["marcas_creadas"] += self._ids(Marca, self.marcas, {d["marca"] for d in lote})
+            self.resultado["categorias_creadas"] += self._ids(Categoria, self.categorias, {d["categoria"] for d in lote})
+
+            referencias = [d["nro_referencia"] for d in lote if d["nro_referencia"]]
+            existentes = set(
+                Producto.objects.filter(nro_referencia__in=referencias).values_list("nro_referencia", flat=True)
+            )
+            reservado = {}
+            if self.actualizar_stock and existentes:
+                reservado = dict(
+                    ReservaStock.objects.filter(estado="ACTIVA", producto__nro_referencia__in=existentes)
+                    .values_list("producto__nro_referencia").annotate(total=Sum("cantidad"))
+                )
+            nuevas = self._referencias_nuevas(sum(1 for d in lote if not d["nro_referencia"]), set(referencias))
+            productos = []
+            for d in lote:
+                stock = max(d["stock"] - reservado.get(d["nro_referencia"], 0), 0)
+                productos.append(Producto(
+                    nro_referencia=d["nro_referencia"] or next(nuevas),
+                    nombre=d["nombre"], descripcion=d["descripcion"],
+                    marca_id=self.marcas[normalizar_texto(d["marca"])],
+                    categoria_id=self.categorias[normalizar_texto(d["categoria"])],
+                    sucursal_id=d["sucursal_id"], valor=d["valor"], stock=stock, disponible=stock > 0,
+                    fecha_creacion=ahora,
+                ))
+            campos = CAMPOS_ACTUALIZADOS + CAMPOS_STOCK if self.actualizar_stock else CAMPOS_ACTUALIZADOS
+            Producto.objects.bulk_create(
+                productos, update_conflicts=True, unique_fields=["nro_referencia"], update_fields=campos,
+            )
+
+            vinculos = {(p.marca_id, p.categoria_id) for p in productos}
+            Marca.categorias.through.objects.bulk_create(
+                [Marca.categorias.through(marca_id=m, categoria_id=c) for m, c in vinculos], ignore_conflicts=True
+            )
+            escritos = Producto.objects.filter(nro_referencia__in=[p.nro_referencia for p in productos])
+            sincronizar_productos(escritos, batch_size=self.batch_size)
+            indexar_productos(escritos, batch_size=self.batch_size)
+        self.resultado["actualizados"] += len(existentes)
+        self.resultado["creados"] += len(productos) - len(existentes)
+
+def importar_catalogo(archivo, formato, batch_size=BATCH_SIZE, progreso=None, actualizar_stock=False):
+    """
+    Importa el archivo binario `archivo` ("csv" o "xlsx") y devuelve el resumen:
+    filas leídas, productos creados/actualizados, marcas y categorías creadas y
+    los errores por fila (los primeros MAX_ERRORES_INFORMADOS). El stock de los
+    productos existentes solo cambia con `actualizar_stock` (ver arriba).
+    """
+    importador = ImportadorCatalogo(batch_size=batch_size, progreso=progreso, actualizar_stock=actualizar_stock)
+    return importador.importar(leer_filas(archivo, formato))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.asignacion import asignar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Asigna los pedidos sin bodeguero a los bodegueros en turno según su carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--estado", default="SOLICITADO", help="Estado de los pedidos a asignar.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Pedidos actualizados por consulta.")
+
+    def handle(self, *args, **options):
+        asignados = asignar_pendientes(estado=options["estado"], batch_size=options["batch_size"])
+        total = sum(asignados.values())
+        self.stdout.write(self.style.SUCCESS(f"Pedidos asignados: {total} entre {len(asignados)} bodeguero(s)."))
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import ESCENARIOS
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta un escenario de benchmark o estrés sobre una base de datos temporal "
+        "(la base de desarrollo no se modifica)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("escenario", choices=sorted(ESCENARIOS), help="Escenario a ejecutar.")
+        parser.add_argument(
+            "-p", "--param", action="append", default=[], metavar="CLAVE=VALOR",
+            help="Parámetro entero del escenario (repetible), p. ej. -p hilos=32.",
+        )
+
+    def handle(self, *args, **options):
+        escenario = ESCENARIOS[options["escenario"]]
+        params = dict(escenario.defaults)
+        for par in options["param"]:
+            clave, _, valor = par.partition("=")
+            if clave not in params:
+                raise CommandError(f"Parámetro desconocido '{clave}'. Válidos: {', '.join(params)}.")
+            params[clave] = int(valor)
+
+        directorio = tempfile.mkdtemp(prefix="ferremas_benchmark_")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(directorio, "benchmark.sqlite3")
+        nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            ok = escenario(self.stdout, **params)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            shutil.rmtree(directorio, ignore_errors=True)
+        if ok is False:
+            raise CommandError("El escenario terminó con resultados inválidos.")
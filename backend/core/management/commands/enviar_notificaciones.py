@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notificaciones import Despachador
+
+
+class Command(BaseCommand):
+    help = "Envía los emails pendientes del outbox de notificaciones (con reintentos y límite de envíos por segundo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=100, help="Notificaciones reclamadas por lote.")
+        parser.add_argument("--hilos", type=int, default=4, help="Hilos de envío.")
+        parser.add_argument("--por-segundo", type=float, default=None, help="Máximo de envíos por segundo (0 = sin límite).")
+        parser.add_argument("--continuo", action="store_true", help="No terminar: revisar el outbox periódicamente.")
+        parser.add_argument("--intervalo", type=float, default=5, help="Segundos entre revisiones en modo continuo.")
+
+    def handle(self, *args, **options):
+        with Despachador(hilos=options["hilos"], por_segundo=options["por_segundo"]) as despachador:
+            while True:
+                totales = despachador.drenar(options["lote"])
+                if any(totales.values()):
+                    self.stdout.write(
+                        f"Enviadas: {totales['enviadas']}, a reintentar: {totales['reintentos']}, "
+                        f"fallidas: {totales['fallidas']}."
+                    )
+                if not options["continuo"]:
+                    break
+                time.sleep(options["intervalo"])
+        self.stdout.write(self.style.SUCCESS("Outbox de notificaciones procesado."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.exportacion import generar_exportacion
+from core.models import ExportacionReporte
+
+
+class Command(BaseCommand):
+    help = "Genera las exportaciones de reportes pendientes (p. ej. las que quedaron sin procesar tras un reinicio)."
+
+    def handle(self, *args, **options):
+        pendientes = ExportacionReporte.objects.filter(estado="PENDIENTE").values_list("id", flat=True)
+        for exportacion_id in list(pendientes):
+            exportacion = generar_exportacion(exportacion_id)
+            if exportacion is not None:
+                self.stdout.write(f"Exportación #{exportacion.id}: {exportacion.estado} ({exportacion.filas} filas).")
+        self.stdout.write(self.style.SUCCESS("Exportaciones pendientes procesadas."))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import BATCH_SIZE, ArchivoInvalido, formato_de, importar_catalogo
+
+
+class Command(BaseCommand):
+    help = "Importa (crea o actualiza por N° de referencia) productos desde un archivo CSV o XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo .csv o .xlsx.")
+        parser.add_argument("--formato", choices=["csv", "xlsx"], help="Por defecto, según la extensión del archivo.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Filas escritas por lote.")
+        parser.add_argument(
+            "--actualizar-stock", action="store_true",
+            help="Reemplaza el stock de los productos existentes por el del archivo (menos sus reservas activas).",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            formato = options["formato"] or formato_de(options["archivo"])
+            with open(options["archivo"], "rb") as archivo:
+                resultado = importar_catalogo(
+                    archivo, formato, batch_size=options["batch_size"], actualizar_stock=options["actualizar_stock"],
+                )
+        except (ArchivoInvalido, OSError) as e:
+            raise CommandError(str(e))
+        for error in resultado["errores"]:
+            self.stderr.write(f"Fila {error['fila']}: {' '.join(error['errores'])}")
+        if resultado["filas_con_error"] > len(resultado["errores"]):
+            self.stderr.write(f"... y {resultado['filas_con_error'] - len(resultado['errores'])} fila(s) más con errores.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas: {resultado['filas']}, creados: {resultado['creados']}, actualizados: {resultado['actualizados']}, "
+            f"con error: {resultado['filas_con_error']}, marcas nuevas: {resultado['marcas_creadas']}, "
+            f"categorías nuevas: {resultado['categorias_creadas']} ({time.perf_counter() - inicio:.1f}s)."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.reservas import liberar_expiradas
+
+
+class Command(BaseCommand):
+    help = "Repone el stock de las reservas de checkout vencidas. Pensado para ejecutarse periódicamente (cron)."
+
+    def handle(self, *args, **options):
+        total = liberar_expiradas()
+        self.stdout.write(self.style.SUCCESS(f"Reservas expiradas liberadas: {total}."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.pagos import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Procesa los eventos de Stripe pendientes o con error (si alguna tarea no se ejecutó)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=None, help="Máximo de eventos a procesar.")
+
+    def handle(self, *args, **options):
+        resumen = procesar_pendientes(limite=options["limite"])
+        detalle = ", ".join(f"{estado}: {cantidad}" for estado, cantidad in sorted(resumen.items())) or "ninguno"
+        self.stdout.write(self.style.SUCCESS(f"Eventos procesados ({detalle})."))
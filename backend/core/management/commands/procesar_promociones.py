@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.promociones import procesar_promociones
+
+
+class Command(BaseCommand):
+    help = "Activa las promociones programadas cuyo inicio llegó y finaliza las vencidas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--continuo", action="store_true", help="No terminar: revisar periódicamente.")
+        parser.add_argument("--intervalo", type=float, default=60, help="Segundos entre revisiones en modo continuo.")
+
+    def handle(self, *args, **options):
+        while True:
+            resultado = procesar_promociones()
+            if any(resultado.values()) or not options["continuo"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Promociones activadas: {resultado['activadas']}, finalizadas: {resultado['finalizadas']}."
+                    )
+                )
+            if not options["continuo"]:
+                break
+            time.sleep(options["intervalo"])
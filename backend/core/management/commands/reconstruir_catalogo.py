@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.catalogo import sincronizar_productos
+from core.models import Producto
+
+
+class Command(BaseCommand):
+    help = "Recalcula en bloque la proyección de lectura ProductoCatalogo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Productos por lote de escritura.")
+
+    def handle(self, *args, **options):
+        total = sincronizar_productos(Producto.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Catálogo recalculado: {total} productos."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.busqueda import indice_disponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstruye en bloque el índice de búsqueda FTS5 de productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Productos por lote de inserción.")
+
+    def handle(self, *args, **options):
+        if not indice_disponible():
+            self.stdout.write(self.style.WARNING("El índice FTS5 solo está disponible en SQLite; nada que hacer."))
+            return
+        total = reconstruir_indice(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} productos indexados."))
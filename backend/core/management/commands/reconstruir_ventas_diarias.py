@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.ventas_diarias import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla de ventas diarias (VentaDiaria) desde los pedidos existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias-por-bloque", type=int, default=31, help="Días agregados por consulta.")
+
+    def handle(self, *args, **options):
+        total = reconstruir(dias_por_bloque=options["dias_por_bloque"])
+        self.stdout.write(self.style.SUCCESS(f"Ventas diarias reconstruidas: {total} filas."))
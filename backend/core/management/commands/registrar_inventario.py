@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.dashboard import registrar_inventario
+
+
+class Command(BaseCommand):
+    help = "Registra la foto diaria del valor del inventario. Pensado para ejecutarse una vez al día (cron)."
+
+    def handle(self, *args, **options):
+        snapshot = registrar_inventario()
+        self.stdout.write(self.style.SUCCESS(
+            f"Inventario {snapshot.fecha}: ${snapshot.valor_total} ({snapshot.unidades} unidades, {snapshot.productos} productos)."
+        ))
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.tareas import Worker
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas en segundo plano (exportaciones, descuentos, reconstrucciones) de la cola Tarea."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=2, help="Hilos por proceso.")
+        parser.add_argument("--procesos", type=int, default=1, help="Procesos worker (cada uno con sus hilos).")
+        parser.add_argument("--continuo", action="store_true", help="No terminar: esperar tareas nuevas.")
+        parser.add_argument("--intervalo", type=float, default=2, help="Segundos entre revisiones de la cola vacía.")
+
+    def handle(self, *args, **options):
+        hijos = []
+        if options["procesos"] > 1:
+            # Los procesos adicionales son copias de este comando con un solo proceso
+            argumentos = [
+                sys.executable, sys.argv[0], "runworker", "--hilos", str(options["hilos"]),
+                "--intervalo", str(options["intervalo"]),
+            ] + (["--continuo"] if options["continuo"] else [])
+            connection.close()
+            hijos = [subprocess.Popen(argumentos) for _ in range(options["procesos"] - 1)]
+        try:
+            procesadas = Worker(hilos=options["hilos"], intervalo=options["intervalo"]).ejecutar(options["continuo"])
+        finally:
+            for hijo in hijos:
+                hijo.wait()
+        self.stdout.write(self.style.SUCCESS(f"Worker terminado: {procesadas} tarea(s) procesada(s) en este proceso."))
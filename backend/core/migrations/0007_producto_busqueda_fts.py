@@ -0,0 +1,39 @@
+# Índice de búsqueda FTS5 para productos (solo SQLite; ver core/busqueda.py)
+
+from django.db import migrations
+
+TABLA = "core_producto_busqueda"
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+        "nombre, descripcion, marca, categoria, nro_referencia, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLA} (rowid, nombre, descripcion, marca, categoria, nro_referencia) "
+        "SELECT p.id, p.nombre, COALESCE(p.descripcion, ''), m.nombre, c.nombre, p.nro_referencia "
+        "FROM core_producto p "
+        "JOIN core_marca m ON m.id = p.marca_id "
+        "JOIN core_categoria c ON c.id = p.categoria_id"
+    )
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_producto_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:59
+
+from decimal import Decimal, ROUND_DOWN
+
+import django.db.models.deletion
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def poblar_catalogo(apps, schema_editor):
+    Producto = apps.get_model('core', 'Producto')
+    ProductoCatalogo = apps.get_model('core', 'ProductoCatalogo')
+    filas = []
+    for p in Producto.objects.select_related('marca', 'categoria').iterator(chunk_size=1000):
+        precio = Decimal(p.valor)
+        descuento = Decimal(str(p.descuento or 0))
+        if descuento > 0:
+            precio = precio * (Decimal('1') - descuento / Decimal('100'))
+        filas.append(ProductoCatalogo(
+            producto_id=p.pk,
+            marca_nombre=p.marca.nombre,
+            categoria_nombre=p.categoria.nombre,
+            imagen_url=default_storage.url(p.imagen_principal.name) if p.imagen_principal else '',
+            precio_con_descuento=precio.to_integral_value(rounding=ROUND_DOWN),
+        ))
+    ProductoCatalogo.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_producto_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoCatalogo',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalogo', serialize=False, to='core.producto', verbose_name='Producto')),
+                ('marca_nombre', models.CharField(max_length=100, verbose_name='Marca')),
+                ('categoria_nombre', models.CharField(max_length=100, verbose_name='Categoría')),
+                ('imagen_url', models.CharField(blank=True, default='', max_length=500, verbose_name='URL imagen principal')),
+                ('precio_con_descuento', models.DecimalField(decimal_places=0, max_digits=10, verbose_name='Precio con descuento (CLP)')),
+            ],
+            options={
+                'verbose_name': 'Producto (catálogo)',
+                'verbose_name_plural': 'Productos (catálogo)',
+            },
+        ),
+        migrations.RunPython(poblar_catalogo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:00
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_producto_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Cantidad')),
+                ('estado', models.CharField(choices=[('ACTIVA', 'Activa'), ('CONFIRMADA', 'Confirmada'), ('LIBERADA', 'Liberada'), ('EXPIRADA', 'Expirada')], default='ACTIVA', max_length=20, verbose_name='Estado')),
+                ('creada_en', models.DateTimeField(auto_now_add=True, verbose_name='Creada el')),
+                ('expira_en', models.DateTimeField(verbose_name='Expira el')),
+                ('carrito', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='core.cart', verbose_name='Carrito')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='core.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Reserva de stock',
+                'verbose_name_plural': 'Reservas de stock',
+                'indexes': [models.Index(fields=['estado', 'expira_en'], name='reserva_estado_expira_idx'), models.Index(fields=['carrito', 'estado'], name='reserva_carrito_estado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Los totales guardados de Cart pasan a mantenerse de forma incremental
+# (ver core/carrito.py); se recalculan una vez desde los items existentes.
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def recalcular_totales(apps, schema_editor):
+    Cart = apps.get_model('core', 'Cart')
+    totales = (
+        Cart.objects.annotate(
+            total_items=models.Sum(
+                models.F('items__cantidad') * models.F('items__precio_unitario'),
+                output_field=models.DecimalField(),
+            )
+        ).values_list('id', 'total_items', 'metodo_despacho', 'costo_despacho')
+    )
+    for cart_id, total_items, metodo_despacho, costo_despacho in totales.iterator(chunk_size=1000):
+        total_items = Decimal(total_items or 0)
+        iva = Decimal(total_items * 19 / 119).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        total = total_items + (Decimal(costo_despacho or 0) if metodo_despacho == 'DESPACHO_DOMICILIO' else 0)
+        Cart.objects.filter(pk=cart_id).update(subtotal=total_items - iva, iva=iva, total=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_reservastock'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DateField, F, IntegerField, Q, Sum, Value
+from django.db.models.functions import TruncDate
+
+ESTADOS = ["SOLICITADO", "PREPARACION", "LISTO_RETIRO", "ENVIADO", "ENTREGADO", "CANCELADO"]
+
+
+def poblar_ventas_diarias(apps, schema_editor):
+    """
+    Carga inicial del resumen; equivale a `manage.py reconstruir_ventas_diarias`.
+    """
+    Pedido = apps.get_model("core", "Pedido")
+    ItemPedido = apps.get_model("core", "ItemPedido")
+    VentaDiaria = apps.get_model("core", "VentaDiaria")
+
+    def agregados(ordenes, monto, unidades, estado):
+        campos = {
+            "total_ordenes": ordenes(),
+            "total_ingresos": Sum(monto, filter=~Q(**{estado: "CANCELADO"})),
+            "ingresos_entregados": Sum(monto, filter=Q(**{estado: "ENTREGADO"})),
+            "unidades": unidades,
+        }
+        for e in ESTADOS:
+            campos[f"ordenes_{e.lower()}"] = ordenes(Q(**{estado: e}))
+        return campos
+
+    def crear(fila, **extra):
+        for clave in ("total_ingresos", "ingresos_entregados", "unidades"):
+            fila[clave] = fila[clave] or 0
+        return VentaDiaria(fecha=fila.pop("fecha"), **fila, **extra)
+
+    # Las unidades del total se toman de las filas por sucursal más abajo
+    totales = (
+        Pedido.objects.annotate(fecha=TruncDate("fecha_creacion", output_field=DateField()))
+        .values("fecha")
+        .annotate(**agregados(lambda f=None: Count("id", filter=f), F("total"), Value(0, output_field=IntegerField()), "estado"))
+    )
+    filas = {fila["fecha"]: crear(dict(fila)) for fila in totales}
+    por_sucursal = (
+        ItemPedido.objects.annotate(fecha=TruncDate("pedido__fecha_creacion", output_field=DateField()))
+        .values("fecha", "producto__sucursal_id")
+        .annotate(**agregados(
+            lambda f=None: Count("pedido_id", distinct=True, filter=f),
+            F("cantidad") * F("precio_unitario"),
+            Sum("cantidad", filter=~Q(pedido__estado="CANCELADO")),
+            "pedido__estado",
+        ))
+    )
+    nuevas = []
+    for fila in por_sucursal:
+        fila = dict(fila)
+        sucursal_id = fila.pop("producto__sucursal_id")
+        if fila["fecha"] in filas:
+            filas[fila["fecha"]].unidades += fila["unidades"] or 0
+        if sucursal_id is not None:
+            nuevas.append(crear(fila, sucursal_id=sucursal_id))
+    VentaDiaria.objects.bulk_create(list(filas.values()) + nuevas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_exportacionreporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('total_ordenes', models.PositiveIntegerField(default=0, verbose_name='Órdenes totales')),
+                ('ordenes_solicitado', models.PositiveIntegerField(default=0, verbose_name='Órdenes solicitadas')),
+                ('ordenes_preparacion', models.PositiveIntegerField(default=0, verbose_name='Órdenes en preparación')),
+                ('ordenes_listo_retiro', models.PositiveIntegerField(default=0, verbose_name='Órdenes listas para retiro')),
+                ('ordenes_enviado', models.PositiveIntegerField(default=0, verbose_name='Órdenes enviadas')),
+                ('ordenes_entregado', models.PositiveIntegerField(default=0, verbose_name='Órdenes entregadas')),
+                ('ordenes_cancelado', models.PositiveIntegerField(default=0, verbose_name='Órdenes canceladas')),
+                ('total_ingresos', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Ingresos (sin cancelados)')),
+                ('ingresos_entregados', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Ingresos entregados')),
+                ('unidades', models.PositiveIntegerField(default=0, verbose_name='Unidades vendidas')),
+                ('actualizado_en', models.DateTimeField(auto_now=True, verbose_name='Actualizado en')),
+                ('sucursal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='core.sucursal', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Venta diaria',
+                'verbose_name_plural': 'Ventas diarias',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'sucursal'), name='venta_diaria_fecha_sucursal_uniq'), models.UniqueConstraint(condition=models.Q(('sucursal__isnull', True)), fields=('fecha',), name='venta_diaria_fecha_total_uniq')],
+            },
+        ),
+        migrations.RunPython(poblar_ventas_diarias, migrations.RunPython.noop),
+    ]
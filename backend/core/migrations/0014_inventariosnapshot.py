@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_ventadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventarioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True, verbose_name='Fecha')),
+                ('valor_total', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Valor total (CLP)')),
+                ('unidades', models.PositiveBigIntegerField(default=0, verbose_name='Unidades en stock')),
+                ('productos', models.PositiveIntegerField(default=0, verbose_name='Productos')),
+                ('creado_en', models.DateTimeField(auto_now=True, verbose_name='Registrado en')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de inventario',
+                'verbose_name_plural': 'Snapshots de inventario',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def poblar_eventos_estado(apps, schema_editor):
+    """
+    Traslada Pedido.historial_estados a PedidoEstadoEvento: un evento de
+    creación por pedido y uno por cada entrada del historial. Las fechas del
+    historial antiguo no siempre son válidas; esas entradas toman la fecha de
+    la siguiente entrada válida (o la última actualización del pedido).
+    """
+    Pedido = apps.get_model("core", "Pedido")
+    PedidoEstadoEvento = apps.get_model("core", "PedidoEstadoEvento")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    usuarios = {}
+
+    def usuario_id(username):
+        if username and username not in usuarios:
+            usuarios[username] = User.objects.filter(username=username).values_list("id", flat=True).first()
+        return usuarios.get(username)
+
+    eventos = []
+    pedidos = Pedido.objects.values_list("id", "estado", "fecha_creacion", "fecha_actualizacion", "historial_estados")
+    for pk, estado, creacion, actualizacion, historial in pedidos.iterator(chunk_size=2000):
+        eventos.append(PedidoEstadoEvento(pedido_id=pk, estado="SOLICITADO", fecha=creacion))
+        transiciones = []
+        anterior = "SOLICITADO"
+        for entrada in historial or []:
+            if not isinstance(entrada, dict) or not entrada.get("estado") or entrada["estado"] == anterior:
+                continue
+            fecha = parse_datetime(str(entrada.get("fecha") or ""))
+            if fecha and timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+            transiciones.append([anterior, entrada["estado"], fecha, usuario_id(entrada.get("usuario"))])
+            anterior = entrada["estado"]
+        if anterior != estado:
+            transiciones.append([anterior, estado, actualizacion, None])
+        siguiente = actualizacion
+        for transicion in reversed(transiciones):
+            transicion[2] = min(transicion[2] or siguiente, siguiente)
+            siguiente = transicion[2]
+        for anterior, nuevo, fecha, usuario in transiciones:
+            eventos.append(PedidoEstadoEvento(
+                pedido_id=pk, estado_anterior=anterior, estado=nuevo, fecha=max(fecha, creacion), usuario_id=usuario,
+            ))
+        if len(eventos) >= 2000:
+            PedidoEstadoEvento.objects.bulk_create(eventos)
+            eventos = []
+    PedidoEstadoEvento.objects.bulk_create(eventos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_inventariosnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoEstadoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, choices=[('SOLICITADO', 'Solicitado'), ('PREPARACION', 'En preparación'), ('LISTO_RETIRO', 'Listo para retiro'), ('ENVIADO', 'Enviado'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado')], max_length=20, null=True, verbose_name='Estado anterior')),
+                ('estado', models.CharField(choices=[('SOLICITADO', 'Solicitado'), ('PREPARACION', 'En preparación'), ('LISTO_RETIRO', 'Listo para retiro'), ('ENVIADO', 'Enviado'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado')], max_length=20, verbose_name='Estado')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_estado', to='core.pedido', verbose_name='Pedido')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Evento de estado de pedido',
+                'verbose_name_plural': 'Eventos de estado de pedido',
+                'indexes': [models.Index(fields=['pedido', 'fecha'], name='pedido_evento_pedido_idx'), models.Index(fields=['estado', 'fecha'], name='pedido_evento_estado_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_eventos_estado, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='pedido',
+            name='historial_estados',
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_tarea'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promocion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('descuento', models.FloatField(verbose_name='Descuento (%)')),
+                ('alcance', models.CharField(choices=[('PRODUCTOS', 'Productos'), ('CATEGORIA', 'Categoría'), ('MARCA', 'Marca'), ('SUCURSAL', 'Sucursal')], max_length=10, verbose_name='Alcance')),
+                ('inicio', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Inicio')),
+                ('fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('estado', models.CharField(choices=[('PROGRAMADA', 'Programada'), ('ACTIVA', 'Activa'), ('FINALIZADA', 'Finalizada'), ('CANCELADA', 'Cancelada')], default='PROGRAMADA', max_length=10, verbose_name='Estado')),
+                ('productos_afectados', models.PositiveIntegerField(default=0, verbose_name='Productos afectados')),
+                ('creada_en', models.DateTimeField(auto_now_add=True, verbose_name='Creada en')),
+                ('activada_en', models.DateTimeField(blank=True, null=True, verbose_name='Activada en')),
+                ('finalizada_en', models.DateTimeField(blank=True, null=True, verbose_name='Finalizada en')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.categoria', verbose_name='Categoría')),
+                ('creada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Creada por')),
+                ('marca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.marca', verbose_name='Marca')),
+                ('productos', models.ManyToManyField(blank=True, related_name='promociones', to='core.producto', verbose_name='Productos')),
+                ('sucursal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.sucursal', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Promoción',
+                'verbose_name_plural': 'Promociones',
+                'ordering': ['-creada_en'],
+            },
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='promocion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='productos_aplicados', to='core.promocion', verbose_name='Promoción vigente'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['estado', 'inicio'], name='promocion_estado_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['estado', 'fin'], name='promocion_estado_fin_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_promocion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True, verbose_name='Nombre')),
+                ('valor', models.PositiveBigIntegerField(default=0, verbose_name='Siguiente valor')),
+            ],
+            options={
+                'verbose_name': 'Secuencia',
+                'verbose_name_plural': 'Secuencias',
+            },
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='nro_referencia',
+            field=models.CharField(blank=True, editable=False, max_length=6, unique=True, verbose_name='N° Referencia'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_secuencia_nro_referencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoStripe',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='ID del evento')),
+                ('tipo', models.CharField(max_length=100, verbose_name='Tipo')),
+                ('payload', models.JSONField(verbose_name='Contenido')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('IGNORADO', 'Ignorado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Último error')),
+                ('recibido_en', models.DateTimeField(auto_now_add=True, verbose_name='Recibido el')),
+                ('procesado_en', models.DateTimeField(blank=True, null=True, verbose_name='Procesado el')),
+            ],
+            options={
+                'verbose_name': 'Evento de Stripe',
+                'verbose_name_plural': 'Eventos de Stripe',
+                'indexes': [models.Index(fields=['estado', 'recibido_en'], name='eventostripe_estado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_eventostripe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.producto')),
+                ('indice', models.TextField(db_column='core_producto_busqueda')),
+            ],
+            options={
+                'db_table': 'core_producto_busqueda',
+                'managed': False,
+            },
+        ),
+    ]
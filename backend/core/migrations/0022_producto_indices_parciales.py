@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_disp_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_disp_valor_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_disp_desc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_disp_nombre_idx',
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['fecha_creacion', 'id'], name='producto_disp_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['valor', 'id'], name='producto_disp_valor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['descuento', 'id'], name='producto_disp_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['nombre', 'id'], name='producto_disp_nombre_idx'),
+        ),
+    ]
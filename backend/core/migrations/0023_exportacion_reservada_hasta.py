@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_producto_indices_parciales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportacionreporte',
+            name='reservada_hasta',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reservada hasta'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Cliente.email admite nulos: los clientes sin correo ya no chocan con unique
+
+from django.db import migrations, models
+
+
+def vacios_a_nulo(apps, schema_editor):
+    Cliente = apps.get_model("core", "Cliente")
+    Cliente.objects.filter(email="").update(email=None)
+
+
+def nulos_a_vacio(apps, schema_editor):
+    Cliente = apps.get_model("core", "Cliente")
+    Cliente.objects.filter(email__isnull=True).update(email="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_exportacion_reservada_hasta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, unique=True, verbose_name='Correo electrónico'),
+        ),
+        migrations.RunPython(vacios_a_nulo, nulos_a_vacio),
+    ]
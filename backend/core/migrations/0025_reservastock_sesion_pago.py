@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_cliente_email_nulo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservastock',
+            name='sesion_pago',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Sesión de pago'),
+        ),
+    ]
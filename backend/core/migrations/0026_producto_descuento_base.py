@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_descuento(apps, schema_editor):
+    # Los productos sin promoción vigente tienen su descuento propio; los que están en
+    # promoción no guardaron el anterior y vuelven a 0 al terminar, como hasta ahora
+    Producto = apps.get_model("core", "Producto")
+    Producto.objects.filter(promocion__isnull=True).update(descuento_base=F("descuento"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_reservastock_sesion_pago'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='descuento_base',
+            field=models.FloatField(default=0, editable=False, verbose_name='Descuento base (%)'),
+        ),
+        migrations.RunPython(copiar_descuento, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,11 @@
 import os
-import random
 from decimal import Decimal, ROUND_HALF_UP
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -152,10 +152,47 @@ class UserProfile(models.Model):
     hora_salida = models.DateTimeField(null=True, blank=True, verbose_name=_("Hora de salida"))
     comprobante_entrada = models.FileField(upload_to="comprobantes_empleado/", blank=True, null=True, verbose_name=_("Comprobante de entrada"))
 
+    # Campos seguidos por las señales: los datos de rol que los permisos guardan en
+    # la sesión (core/permissions.py) y el estado de turno que dispara los emails
+    CAMPOS_ROLES = frozenset({"rol_id", "tipo_empleado", "sucursal_id"})
+    CAMPOS_SEGUIDOS = CAMPOS_ROLES | {"en_turno"}
+
     class Meta:
         verbose_name = _("Perfil de usuario")
         verbose_name_plural = _("Perfiles de usuario")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores leídos de la base: permiten saber qué cambió al guardar sin volver a consultar
+        if not instance.get_deferred_fields() & cls.CAMPOS_SEGUIDOS:
+            instance._valores_cargados = instance._valores_seguidos()
+        return instance
+
+    def _valores_seguidos(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS_SEGUIDOS}
+
+    def _campos_modificados(self, update_fields=None):
+        """
+        Campos seguidos que este save() escribe con un valor distinto al cargado
+        (todos si el perfil es nuevo o no se cargó completo).
+        """
+        campos = set(self.CAMPOS_SEGUIDOS)
+        if update_fields is not None:
+            campos &= {self._meta.get_field(nombre).attname for nombre in update_fields}
+        cargados = getattr(self, "_valores_cargados", None)
+        if cargados is None:
+            return campos
+        actuales = self._valores_seguidos()
+        return {campo for campo in campos if actuales[campo] != cargados[campo]}
+
+    def save(self, *args, **kwargs):
+        # Las señales post_save leen _modificados para omitir lo que no cambió
+        self._modificados = self._campos_modificados(kwargs.get("update_fields"))
+        super().save(*args, **kwargs)
+        if not self.get_deferred_fields() & self.CAMPOS_SEGUIDOS:
+            self._valores_cargados = self._valores_seguidos()
+
     def __str__(self):
         return f"Perfil de {self.user.username} ({self.rol})"
 
@@ -181,7 +218,6 @@ class UserProfile(models.Model):
             entrada=self.hora_entrada,
             comprobante_entrada=self.comprobante_entrada if self.comprobante_entrada else None
         )
-        enviar_email_confirmacion_turno_empleado(self)
 
     def marcar_salida(self):
         """
@@ -195,7 +231,6 @@ class UserProfile(models.Model):
         if ultimo_turno:
             ultimo_turno.salida = self.hora_salida
             ultimo_turno.save()
-        enviar_email_salida_turno_empleado(self)
 
     # Funcionalidad específica según subrol
     def pedidos_en_proceso(self):
@@ -215,17 +250,15 @@ class UserProfile(models.Model):
     def es_empleado_simple(self):
         return self.tipo_empleado == "EMPLEADO"
 
-# Señal robusta para crear/guardar UserProfile automáticamente
 @receiver(post_save, sender=User)
-def user_profile_post_save(sender, instance, created, **kwargs):
+def user_profile_post_save(sender, instance, created, raw=False, **kwargs):
     """
-    Crea o guarda el UserProfile automáticamente cuando se crea o guarda un User.
+    Crea el UserProfile cuando se crea un User. Los demás saves del usuario
+    (p. ej. last_login en cada login) no tocan el perfil: se guarda solo
+    cuando cambian sus propios campos.
     """
-    if created:
-        UserProfile.objects.create(user=instance)
-    else:
-        if hasattr(instance, "profile"):
-            instance.profile.save()
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
 
 class Address(models.Model):
     """
@@ -269,7 +302,8 @@ class Cliente(models.Model):
     Modelo específico para clientes, con historial de compras y preferencias.
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cliente", verbose_name=_("Usuario"))
-    email = models.EmailField(unique=True, verbose_name=_("Correo electrónico"))
+    # Nulo si el usuario no tiene correo (o ya lo usa otro cliente): varios nulos no chocan con unique
+    email = models.EmailField(unique=True, null=True, blank=True, verbose_name=_("Correo electrónico"))
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name=_("Fecha de registro"))
 
     class Meta:
@@ -286,11 +320,54 @@ class Cliente(models.Model):
 # PRODUCTOS Y VALORACIONES
 # --------------------------
 
+class Secuencia(models.Model):
+    """
+    Contador con nombre para asignar números correlativos sin colisiones
+    (p. ej. los N° de referencia de productos). Se avanza con un UPDATE atómico.
+    """
+    nombre = models.CharField(max_length=50, unique=True, verbose_name=_("Nombre"))
+    valor = models.PositiveBigIntegerField(default=0, verbose_name=_("Siguiente valor"))
+
+    class Meta:
+        verbose_name = _("Secuencia")
+        verbose_name_plural = _("Secuencias")
+
+    @classmethod
+    def reservar(cls, nombre, cantidad=1, inicio=0):
+        """
+        Reserva `cantidad` valores consecutivos de la secuencia y devuelve el
+        rango reservado. Dos reservas simultáneas nunca comparten valores.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(nombre=nombre).update(valor=F("valor") + cantidad):
+                cls.objects.get_or_create(nombre=nombre, defaults={"valor": inicio})
+                cls.objects.filter(nombre=nombre).update(valor=F("valor") + cantidad)
+            fin = cls.objects.filter(nombre=nombre).values_list("valor", flat=True).get()
+        return range(fin - cantidad, fin)
+
+NRO_REFERENCIA_MIN = 100000
+NRO_REFERENCIA_MAX = 999999
+
+def reservar_nros_referencia(cantidad):
+    """
+    Devuelve `cantidad` N° de referencia de 6 dígitos libres, tomados de la
+    secuencia "producto.nro_referencia". Los números ya usados por productos
+    antiguos (asignados al azar) se saltan con una consulta por rango.
+    """
+    nros = []
+    while len(nros) < cantidad:
+        rango = Secuencia.reservar("producto.nro_referencia", cantidad - len(nros), inicio=NRO_REFERENCIA_MIN)
+        if rango.stop - 1 > NRO_REFERENCIA_MAX:
+            raise ValueError(_("No quedan números de referencia disponibles."))
+        usados = set(
+            Producto.objects.filter(nro_referencia__gte=str(rango.start), nro_referencia__lte=str(rango.stop - 1))
+            .values_list("nro_referencia", flat=True)
+        )
+        nros.extend(str(n) for n in rango if str(n) not in usados)
+    return nros
+
 def generar_nro_referencia_unico():
-    while True:
-        nro_referencia = str(random.randint(100000, 999999))
-        if not Producto.objects.filter(nro_referencia=nro_referencia).exists():
-            return nro_referencia
+    return reservar_nros_referencia(1)[0]
 
 def upload_to_producto(instance, filename):
     # Unifica la lógica de rutas para imágenes de productos
@@ -316,9 +393,8 @@ class Producto(models.Model):
     marca = models.ForeignKey(Marca, on_delete=models.PROTECT, related_name="productos", verbose_name=_("Marca"))
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name="productos", verbose_name=_("Categoría"))
     sucursal = models.ForeignKey(Sucursal, on_delete=models.SET_NULL, null=True, blank=True, related_name="productos", verbose_name=_("Sucursal"))
-    nro_referencia = models.CharField(
-        max_length=6, unique=True, default=generar_nro_referencia_unico, editable=False, verbose_name=_("N° Referencia")
-    )
+    # Se asigna al guardar (o con reservar_nros_referencia en cargas masivas)
+    nro_referencia = models.CharField(max_length=6, unique=True, blank=True, editable=False, verbose_name=_("N° Referencia"))
     valor = models.DecimalField(
         max_digits=10, decimal_places=0, validators=[MinValueValidator(1)],
         verbose_name=_("Precio (CLP, IVA incluido)"),
@@ -336,24 +412,90 @@ class Producto(models.Model):
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name=_("Fecha de actualización"))
     # --- NUEVO CAMPO PARA DESCUENTO ---
     descuento = models.FloatField(default=0, verbose_name=_("Descuento (%)"), help_text=_("Porcentaje de descuento aplicado al producto"))
+    # Descuento propio del producto, sin promociones: el que recupera cuando termina la última que lo cubre
+    descuento_base = models.FloatField(default=0, editable=False, verbose_name=_("Descuento base (%)"))
+    promocion = models.ForeignKey(
+        "Promocion", on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name="productos_aplicados", verbose_name=_("Promoción vigente"),
+    )
 
     class Meta:
         verbose_name = _("Producto")
         verbose_name_plural = _("Productos")
+        # Índices para los filtros y órdenes del catálogo (ver ProductoListAPIView). Parciales
+        # sobre los disponibles: la consulta filtra "WHERE disponible" (sin "= 1") y así
+        # SQLite recorre el índice en el orden (campo, id) del cursor, sin ordenar todo.
+        indexes = [
+            models.Index(fields=["fecha_creacion", "id"], name="producto_disp_fecha_idx", condition=models.Q(disponible=True)),
+            models.Index(fields=["valor", "id"], name="producto_disp_valor_idx", condition=models.Q(disponible=True)),
+            models.Index(fields=["descuento", "id"], name="producto_disp_desc_idx", condition=models.Q(disponible=True)),
+            models.Index(fields=["nombre", "id"], name="producto_disp_nombre_idx", condition=models.Q(disponible=True)),
+        ]
+
+    # Campos de los que dependen el índice de búsqueda, la fila de catálogo y el
+    # vínculo marca-categoría; si un save() no cambia ninguno, esos pasos se omiten
+    CAMPOS_BUSQUEDA = frozenset({"nombre", "descripcion", "marca_id", "categoria_id", "nro_referencia"})
+    CAMPOS_CATALOGO = frozenset({"valor", "descuento", "marca_id", "categoria_id", "imagen_principal"})
+    CAMPOS_SEGUIDOS = CAMPOS_BUSQUEDA | CAMPOS_CATALOGO
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores leídos de la base: permiten saber qué cambió al guardar sin volver a consultar
+        if not instance.get_deferred_fields() & cls.CAMPOS_SEGUIDOS:
+            instance._valores_cargados = instance._valores_seguidos()
+        return instance
+
+    def _valores_seguidos(self):
+        valores = {campo: getattr(self, campo) for campo in self.CAMPOS_SEGUIDOS if campo != "imagen_principal"}
+        valores["imagen_principal"] = self.imagen_principal.name
+        return valores
+
+    def _campos_modificados(self, update_fields=None):
+        """
+        Campos seguidos que este save() escribe con un valor distinto al cargado
+        (todos si el producto es nuevo o no se cargó completo).
+        """
+        campos = set(self.CAMPOS_SEGUIDOS)
+        if update_fields is not None:
+            campos &= {self._meta.get_field(nombre).attname for nombre in update_fields}
+        cargados = getattr(self, "_valores_cargados", None)
+        if cargados is None:
+            return campos
+        actuales = self._valores_seguidos()
+        return {campo for campo in campos if actuales[campo] != cargados[campo]}
 
     def save(self, *args, **kwargs):
         self.disponible = self.stock > 0
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "stock" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "disponible"}
+        if self.promocion_id is None:
+            # Sin promoción vigente, el descuento del producto es su descuento propio
+            self.descuento_base = self.descuento
+            if update_fields is not None and "descuento" in update_fields:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "descuento_base"}
         if not self.nro_referencia:
             self.nro_referencia = generar_nro_referencia_unico()
+        # Las señales post_save leen _modificados para omitir lo que no cambió
+        self._modificados = self._campos_modificados(update_fields)
         super().save(*args, **kwargs)
-        # Asociar la categoría del producto a la marca si no está ya asociada
-        if self.categoria not in self.marca.categorias.all():
-            self.marca.categorias.add(self.categoria)
+        if {"marca_id", "categoria_id"} & self._modificados:
+            # Asociar la categoría del producto a la marca si no está ya asociada
+            vinculo = Marca.categorias.through.objects.filter(marca_id=self.marca_id, categoria_id=self.categoria_id)
+            if not vinculo.exists():
+                self.marca.categorias.add(self.categoria_id)
+        if not self.get_deferred_fields() & self.CAMPOS_SEGUIDOS:
+            self._valores_cargados = self._valores_seguidos()
 
     def reducir_stock(self, cantidad):
-        if cantidad <= self.stock:
-            self.stock -= cantidad
-            self.save()
+        """
+        Descuenta stock con un UPDATE condicional (stock >= cantidad), sin
+        lectura previa en Python, por lo que dos compras simultáneas no pueden sobrevender.
+        """
+        from .reservas import descontar_stock
+        if descontar_stock(self.pk, cantidad):
+            self.refresh_from_db(fields=["stock", "disponible"])
             return True
         return False
 
@@ -366,6 +508,92 @@ class Producto(models.Model):
     def __str__(self):
         return f"{self.nombre} - {self.marca} (Ref: {self.nro_referencia})"
 
+class ProductoCatalogo(models.Model):
+    """
+    Proyección desnormalizada de Producto para lectura (listados, carrito, pedidos).
+    Evita los joins a Marca/Categoria y el cálculo del precio con descuento al serializar.
+    Se mantiene desde señales y helpers en core/catalogo.py; no editar a mano.
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True, related_name="catalogo", verbose_name=_("Producto")
+    )
+    marca_nombre = models.CharField(max_length=100, verbose_name=_("Marca"))
+    categoria_nombre = models.CharField(max_length=100, verbose_name=_("Categoría"))
+    imagen_url = models.CharField(max_length=500, blank=True, default="", verbose_name=_("URL imagen principal"))
+    precio_con_descuento = models.DecimalField(
+        max_digits=10, decimal_places=0, verbose_name=_("Precio con descuento (CLP)")
+    )
+
+    class Meta:
+        verbose_name = _("Producto (catálogo)")
+        verbose_name_plural = _("Productos (catálogo)")
+
+    def __str__(self):
+        return f"Catálogo de producto #{self.producto_id}"
+
+class ProductoBusqueda(models.Model):
+    """
+    Índice FTS5 de productos (tabla virtual, solo SQLite; ver core/busqueda.py).
+    Sin migraciones propias: existe para que la búsqueda una el índice a
+    Producto con un JOIN por rowid, en vez de una subconsulta por fila.
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.DO_NOTHING, primary_key=True, db_column="rowid",
+        db_constraint=False, related_name="busqueda",
+    )
+    # Columna oculta de FTS5 con el nombre de la tabla: destino de MATCH y argumento de bm25()
+    indice = models.TextField(db_column="core_producto_busqueda")
+
+    class Meta:
+        managed = False
+        db_table = "core_producto_busqueda"
+
+class Promocion(models.Model):
+    """
+    Descuento porcentual sobre una lista de productos, una categoría, una marca o
+    una sucursal, vigente entre `inicio` y `fin` (sin fin: hasta cancelarla).
+    La activan y finalizan core/promociones.py y `python manage.py procesar_promociones`.
+    """
+    ALCANCE_CHOICES = [
+        ("PRODUCTOS", _("Productos")),
+        ("CATEGORIA", _("Categoría")),
+        ("MARCA", _("Marca")),
+        ("SUCURSAL", _("Sucursal")),
+    ]
+    ESTADO_CHOICES = [
+        ("PROGRAMADA", _("Programada")),
+        ("ACTIVA", _("Activa")),
+        ("FINALIZADA", _("Finalizada")),
+        ("CANCELADA", _("Cancelada")),
+    ]
+    nombre = models.CharField(max_length=100, verbose_name=_("Nombre"))
+    descuento = models.FloatField(verbose_name=_("Descuento (%)"))
+    alcance = models.CharField(max_length=10, choices=ALCANCE_CHOICES, verbose_name=_("Alcance"))
+    productos = models.ManyToManyField(Producto, blank=True, related_name="promociones", verbose_name=_("Productos"))
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, null=True, blank=True, verbose_name=_("Categoría"))
+    marca = models.ForeignKey(Marca, on_delete=models.CASCADE, null=True, blank=True, verbose_name=_("Marca"))
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, null=True, blank=True, verbose_name=_("Sucursal"))
+    inicio = models.DateTimeField(default=timezone.now, verbose_name=_("Inicio"))
+    fin = models.DateTimeField(null=True, blank=True, verbose_name=_("Fin"))
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default="PROGRAMADA", verbose_name=_("Estado"))
+    productos_afectados = models.PositiveIntegerField(default=0, verbose_name=_("Productos afectados"))
+    creada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("Creada por"))
+    creada_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Creada en"))
+    activada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Activada en"))
+    finalizada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Finalizada en"))
+
+    class Meta:
+        verbose_name = _("Promoción")
+        verbose_name_plural = _("Promociones")
+        ordering = ["-creada_en"]
+        indexes = [
+            models.Index(fields=["estado", "inicio"], name="promocion_estado_inicio_idx"),
+            models.Index(fields=["estado", "fin"], name="promocion_estado_fin_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.descuento}%, {self.estado})"
+
 class ValoracionProducto(models.Model):
     """
     Valoración y comentario de un producto por parte de un cliente.
@@ -383,6 +611,24 @@ class ValoracionProducto(models.Model):
     def __str__(self):
         return f"{self.producto} - {self.puntaje} estrellas"
 
+class InventarioSnapshot(models.Model):
+    """
+    Foto diaria del valor del inventario, para calcular su variación en el dashboard.
+    """
+    fecha = models.DateField(unique=True, verbose_name=_("Fecha"))
+    valor_total = models.DecimalField(max_digits=16, decimal_places=0, default=0, verbose_name=_("Valor total (CLP)"))
+    unidades = models.PositiveBigIntegerField(default=0, verbose_name=_("Unidades en stock"))
+    productos = models.PositiveIntegerField(default=0, verbose_name=_("Productos"))
+    creado_en = models.DateTimeField(auto_now=True, verbose_name=_("Registrado en"))
+
+    class Meta:
+        verbose_name = _("Snapshot de inventario")
+        verbose_name_plural = _("Snapshots de inventario")
+        ordering = ["-fecha"]
+
+    def __str__(self):
+        return f"Inventario {self.fecha}: ${self.valor_total}"
+
 # --------------------------
 # CARRITO Y ITEMS
 # --------------------------
@@ -464,15 +710,21 @@ class Cart(models.Model):
                 _("El subtotal más el IVA debe ser igual al total (se permite una diferencia máxima de 1 CLP por redondeo).")
             )
 
-    def calcular_totales(self):
+    def calcular_totales(self, total_items=None):
         """
-        Calcula subtotal, IVA y total del carrito según normativa chilena.
-        Todos los valores son en CLP (sin decimales).
+        Calcula subtotal, IVA y total del carrito según normativa chilena, con una
+        sola agregación en la base de datos. Todos los valores son en CLP (sin decimales).
+        Los items del carrito ya mantienen estos montos al día (ver core/carrito.py);
+        este método sirve para recalcularlos desde cero.
+        Si ya se conoce la suma de los items (`total_items`), no consulta la base.
         El precio de cada producto ya incluye IVA.
         Debes llamar a save() luego de este método para guardar los cambios.
         """
-        items = self.items.all()
-        total = sum(item.subtotal() for item in items)
+        if total_items is None:
+            total_items = self.items.aggregate(
+                total=models.Sum(models.F("cantidad") * models.F("precio_unitario"), output_field=models.DecimalField())
+            )["total"]
+        total = Decimal(total_items or 0)
         iva = Decimal(total * 19 / 119).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
         subtotal = total - iva
         if self.metodo_despacho == "DESPACHO_DOMICILIO":
@@ -527,6 +779,38 @@ class ItemCarrito(models.Model):
         """
         return Decimal(self.cantidad) * Decimal(self.precio_unitario)
 
+class ReservaStock(models.Model):
+    """
+    Retención temporal de stock de un producto para un carrito en checkout.
+    El stock se descuenta al reservar; si la reserva expira o se cancela, se repone.
+    Ver core/reservas.py.
+    """
+    ESTADO_CHOICES = [
+        ("ACTIVA", _("Activa")),
+        ("CONFIRMADA", _("Confirmada")),
+        ("LIBERADA", _("Liberada")),
+        ("EXPIRADA", _("Expirada")),
+    ]
+    carrito = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservas", verbose_name=_("Carrito"))
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="reservas", verbose_name=_("Producto"))
+    cantidad = models.PositiveIntegerField(validators=[MinValueValidator(1)], verbose_name=_("Cantidad"))
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="ACTIVA", verbose_name=_("Estado"))
+    creada_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Creada el"))
+    expira_en = models.DateTimeField(verbose_name=_("Expira el"))
+    # Sesión de Stripe Checkout que respalda la reserva: solo sus eventos pueden liberarla
+    sesion_pago = models.CharField(max_length=255, blank=True, default="", verbose_name=_("Sesión de pago"))
+
+    class Meta:
+        verbose_name = _("Reserva de stock")
+        verbose_name_plural = _("Reservas de stock")
+        indexes = [
+            models.Index(fields=["estado", "expira_en"], name="reserva_estado_expira_idx"),
+            models.Index(fields=["carrito", "estado"], name="reserva_carrito_estado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reserva {self.cantidad} x {self.producto_id} (carrito #{self.carrito_id}, {self.estado})"
+
 # --------------------------
 # PEDIDO Y TRACKING
 # --------------------------
@@ -562,7 +846,6 @@ class Pedido(models.Model):
     bodeguero_asignado = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True, related_name="pedidos_asignados", verbose_name=_("Bodeguero asignado")
     )
-    historial_estados = models.JSONField(default=list, blank=True, verbose_name=_("Historial de estados"))
     total = models.DecimalField(max_digits=12, decimal_places=0, default=0, verbose_name=_("Total (CLP, con IVA)"))
     actualizado_por = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True, related_name="pedidos_actualizados", verbose_name=_("Actualizado por")
@@ -571,43 +854,43 @@ class Pedido(models.Model):
     class Meta:
         verbose_name = _("Pedido")
         verbose_name_plural = _("Pedidos")
+        indexes = [
+            models.Index(fields=["fecha_creacion"], name="pedido_fecha_idx"),
+            models.Index(fields=["estado", "fecha_creacion"], name="pedido_estado_fecha_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado leído de la base: permite detectar el cambio al guardar sin volver a consultar
+        if "estado" in field_names:
+            instance._estado_cargado = instance.estado
+        return instance
 
     def actualizar_estado(self, nuevo_estado, usuario):
         """
-        Actualiza el estado del pedido y guarda el historial.
+        Actualiza el estado del pedido. La transición queda registrada en
+        PedidoEstadoEvento por la señal post_save.
         """
         self.estado = nuevo_estado
-        self.fecha_actualizacion = models.DateTimeField(auto_now=True)
-        self.historial_estados.append({
-            "estado": nuevo_estado,
-            "fecha": str(self.fecha_actualizacion),
-            "usuario": usuario.username if usuario else None
-        })
         self.actualizado_por = usuario
-        self.save()
+        self.save(update_fields=["estado", "actualizado_por", "fecha_actualizacion"])
 
     def asignar_bodeguero(self):
         """
-        Lógica para asignar automáticamente un bodeguero disponible.
-        """
-        bodegueros = UserProfile.objects.filter(rol__nombre="EMPLEADO", tipo_empleado="BODEGUERO", en_turno=True)
-        bodeguero_menos_carga = None
-        min_pedidos = None
-        for b in bodegueros:
-            pedidos = Pedido.objects.filter(bodeguero_asignado=b.user, estado__in=["PREPARACION", "SOLICITADO"]).count()
-            if min_pedidos is None or pedidos < min_pedidos:
-                min_pedidos = pedidos
-                bodeguero_menos_carga = b.user
-        if bodeguero_menos_carga:
-            self.bodeguero_asignado = bodeguero_menos_carga
-            self.save()
-        return self.bodeguero_asignado
+        Asigna automáticamente el bodeguero en turno menos cargado (ver core/asignacion.py).
+        """
+        from .asignacion import asignar
+        return asignar(self)
 
     def tracking_cliente(self):
         """
         Devuelve el historial de estados para mostrar al cliente.
         """
-        return self.historial_estados
+        return [
+            {"estado": evento.estado, "fecha": evento.fecha, "usuario": evento.usuario.username if evento.usuario else None}
+            for evento in self.eventos_estado.select_related("usuario").order_by("fecha", "id")
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.cliente.user.username} ({self.estado})"
@@ -631,6 +914,67 @@ class ItemPedido(models.Model):
         """
         return Decimal(self.cantidad) * Decimal(self.precio_unitario)
 
+class PedidoEstadoEvento(models.Model):
+    """
+    Transición de estado de un pedido. Tabla de solo inserción: una fila por
+    cambio (y una al crear el pedido, con estado_anterior nulo).
+    """
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="eventos_estado", verbose_name=_("Pedido"))
+    estado_anterior = models.CharField(
+        max_length=20, choices=Pedido.ESTADO_CHOICES, null=True, blank=True, verbose_name=_("Estado anterior")
+    )
+    estado = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES, verbose_name=_("Estado"))
+    fecha = models.DateTimeField(default=timezone.now, verbose_name=_("Fecha"))
+    usuario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Usuario")
+    )
+
+    class Meta:
+        verbose_name = _("Evento de estado de pedido")
+        verbose_name_plural = _("Eventos de estado de pedido")
+        indexes = [
+            models.Index(fields=["pedido", "fecha"], name="pedido_evento_pedido_idx"),
+            models.Index(fields=["estado", "fecha"], name="pedido_evento_estado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.pedido_id}: {self.estado_anterior or '-'} → {self.estado}"
+
+class VentaDiaria(models.Model):
+    """
+    Resumen precalculado de ventas por día de creación del pedido y sucursal
+    (ver core/ventas_diarias.py). La fila con sucursal nula es el total del día
+    sobre Pedido.total; las filas por sucursal suman las líneas de sus productos.
+    """
+    fecha = models.DateField(verbose_name=_("Fecha"))
+    sucursal = models.ForeignKey(
+        Sucursal, on_delete=models.CASCADE, null=True, blank=True, related_name="ventas_diarias", verbose_name=_("Sucursal")
+    )
+    total_ordenes = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes totales"))
+    ordenes_solicitado = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes solicitadas"))
+    ordenes_preparacion = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes en preparación"))
+    ordenes_listo_retiro = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes listas para retiro"))
+    ordenes_enviado = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes enviadas"))
+    ordenes_entregado = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes entregadas"))
+    ordenes_cancelado = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes canceladas"))
+    total_ingresos = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name=_("Ingresos (sin cancelados)"))
+    ingresos_entregados = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name=_("Ingresos entregados"))
+    unidades = models.PositiveIntegerField(default=0, verbose_name=_("Unidades vendidas"))
+    actualizado_en = models.DateTimeField(auto_now=True, verbose_name=_("Actualizado en"))
+
+    class Meta:
+        verbose_name = _("Venta diaria")
+        verbose_name_plural = _("Ventas diarias")
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "sucursal"], name="venta_diaria_fecha_sucursal_uniq"),
+            models.UniqueConstraint(
+                fields=["fecha"], condition=models.Q(sucursal__isnull=True), name="venta_diaria_fecha_total_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Ventas {self.fecha} ({self.sucursal or 'total'}): {self.total_ordenes} órdenes"
+
 # --------------------------
 # PAGO
 # --------------------------
@@ -674,6 +1018,35 @@ class Pago(models.Model):
     def __str__(self):
         return f"Pago {self.stripe_id} - {self.estado}"
 
+class EventoStripe(models.Model):
+    """
+    Evento recibido por el webhook de Stripe, guardado tal como llegó.
+    El id del evento es la clave primaria: una entrega repetida se detecta con
+    una búsqueda por índice y no se vuelve a procesar. Lo procesa core/pagos.py.
+    """
+    ESTADO_CHOICES = [
+        ("PENDIENTE", _("Pendiente")),
+        ("PROCESADO", _("Procesado")),
+        ("IGNORADO", _("Ignorado")),
+        ("ERROR", _("Error")),
+    ]
+    id = models.CharField(max_length=255, primary_key=True, verbose_name=_("ID del evento"))
+    tipo = models.CharField(max_length=100, verbose_name=_("Tipo"))
+    payload = models.JSONField(verbose_name=_("Contenido"))
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="PENDIENTE", verbose_name=_("Estado"))
+    intentos = models.PositiveIntegerField(default=0, verbose_name=_("Intentos"))
+    error = models.TextField(blank=True, default="", verbose_name=_("Último error"))
+    recibido_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Recibido el"))
+    procesado_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Procesado el"))
+
+    class Meta:
+        verbose_name = _("Evento de Stripe")
+        verbose_name_plural = _("Eventos de Stripe")
+        indexes = [models.Index(fields=["estado", "recibido_en"], name="eventostripe_estado_idx")]
+
+    def __str__(self):
+        return f"{self.tipo} ({self.id}) - {self.estado}"
+
 # --------------------------
 # AUDITORÍA DE CAMBIOS EN MODELOS
 # --------------------------
@@ -699,72 +1072,224 @@ class AuditoriaCambio(models.Model):
         return f"Auditoría: {self.content_type} ({self.campo}) por {self.usuario}"
 
 # --------------------------
-# FUNCIONES AUXILIARES DUMMY PARA EMAILS
+# EXPORTACIONES DE REPORTES
 # --------------------------
 
-def enviar_email_bienvenida(cliente):
-    print(f"[EMAIL] Bienvenida enviada a {cliente.email}")
+class ExportacionReporte(models.Model):
+    """
+    Exportación de reporte financiero generada en segundo plano (ver core/exportacion.py).
+    """
+    FORMATO_CHOICES = [
+        ("xlsx", "Excel (XLSX)"),
+        ("csv", "CSV"),
+    ]
+    ESTADO_CHOICES = [
+        ("PENDIENTE", "Pendiente"),
+        ("PROCESANDO", "Procesando"),
+        ("COMPLETADA", "Completada"),
+        ("ERROR", "Error"),
+    ]
+    solicitado_por = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="exportaciones", verbose_name=_("Solicitado por")
+    )
+    formato = models.CharField(max_length=4, choices=FORMATO_CHOICES, default="xlsx", verbose_name=_("Formato"))
+    desde = models.DateField(verbose_name=_("Desde"))
+    hasta = models.DateField(verbose_name=_("Hasta"))
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default="PENDIENTE", verbose_name=_("Estado"))
+    archivo = models.FileField(upload_to="reportes/", blank=True, null=True, verbose_name=_("Archivo"))
+    filas = models.PositiveIntegerField(default=0, verbose_name=_("Filas exportadas"))
+    error = models.TextField(blank=True, verbose_name=_("Error"))
+    # Mientras está PROCESANDO: si vence, el worker que la generaba murió y otro la retoma
+    reservada_hasta = models.DateTimeField(null=True, blank=True, verbose_name=_("Reservada hasta"))
+    creada_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Creada en"))
+    terminada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Terminada en"))
 
-def enviar_email_confirmacion_turno_empleado(empleado):
-    print(f"[EMAIL] Confirmación de entrada a turno enviada a {empleado.user.email} (comprobante: {empleado.comprobante_entrada})")
+    class Meta:
+        verbose_name = _("Exportación de reporte")
+        verbose_name_plural = _("Exportaciones de reportes")
+        ordering = ["-creada_en"]
 
-def enviar_email_salida_turno_empleado(empleado):
-    print(f"[EMAIL] Salida de turno registrada para {empleado.user.email} - {empleado.hora_salida}")
+    def __str__(self):
+        return f"Exportación #{self.id} ({self.formato}, {self.desde} a {self.hasta}) - {self.estado}"
 
-def enviar_email_pago_confirmado(cliente, pedido):
-    print(f"[EMAIL] Pago confirmado para {cliente.email} - Pedido #{pedido.id}")
+# --------------------------
+# TAREAS EN SEGUNDO PLANO
+# --------------------------
 
-def enviar_oferta_especial(cliente, pedido):
-    print(f"[EMAIL] Oferta especial enviada a {cliente.email} por compra de más de 4 productos en Pedido #{pedido.id}")
+class Tarea(models.Model):
+    """
+    Trabajo pesado encolado para el worker `python manage.py runworker` (ver
+    core/tareas.py). El cliente consulta su estado y progreso por la API.
+    """
+    ESTADO_CHOICES = [
+        ("PENDIENTE", _("Pendiente")),
+        ("EN_CURSO", _("En curso")),
+        ("COMPLETADA", _("Completada")),
+        ("ERROR", _("Error")),
+    ]
+    tipo = models.CharField(max_length=50, verbose_name=_("Tipo"))
+    parametros = models.JSONField(default=dict, blank=True, verbose_name=_("Parámetros"))
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default="PENDIENTE", verbose_name=_("Estado"))
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name=_("Progreso (%)"))
+    mensaje = models.CharField(max_length=200, blank=True, default="", verbose_name=_("Mensaje"))
+    resultado = models.JSONField(null=True, blank=True, verbose_name=_("Resultado"))
+    error = models.TextField(blank=True, default="", verbose_name=_("Error"))
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name=_("Intentos"))
+    reservada_hasta = models.DateTimeField(null=True, blank=True, verbose_name=_("Reservada hasta"))
+    creada_por = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="tareas", verbose_name=_("Creada por")
+    )
+    creada_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Creada en"))
+    iniciada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Iniciada en"))
+    terminada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Terminada en"))
+
+    class Meta:
+        verbose_name = _("Tarea")
+        verbose_name_plural = _("Tareas")
+        ordering = ["-creada_en"]
+        indexes = [
+            models.Index(fields=["estado", "creada_en"], name="tarea_estado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Tarea #{self.id} {self.tipo} ({self.estado})"
+
+# --------------------------
+# NOTIFICACIONES (OUTBOX)
+# --------------------------
+
+class Notificacion(models.Model):
+    """
+    Email pendiente de envío (outbox transaccional). Se crea en la misma
+    transacción que el cambio que la origina y la envía el worker
+    `python manage.py enviar_notificaciones` (ver core/notificaciones.py).
+    La clave evita encolar dos veces la misma notificación.
+    """
+    ESTADO_CHOICES = [
+        ("PENDIENTE", _("Pendiente")),
+        ("ENVIANDO", _("Enviando")),
+        ("ENVIADA", _("Enviada")),
+        ("FALLIDA", _("Fallida")),
+    ]
+    tipo = models.CharField(max_length=30, verbose_name=_("Tipo"))
+    clave = models.CharField(max_length=150, unique=True, verbose_name=_("Clave de deduplicación"))
+    destinatario = models.EmailField(verbose_name=_("Destinatario"))
+    asunto = models.CharField(max_length=200, verbose_name=_("Asunto"))
+    cuerpo = models.TextField(verbose_name=_("Cuerpo"))
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default="PENDIENTE", verbose_name=_("Estado"))
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name=_("Intentos"))
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name=_("Próximo intento"))
+    lote = models.CharField(max_length=32, blank=True, default="", verbose_name=_("Lote"))
+    ultimo_error = models.TextField(blank=True, default="", verbose_name=_("Último error"))
+    creada_en = models.DateTimeField(auto_now_add=True, verbose_name=_("Creada en"))
+    enviada_en = models.DateTimeField(null=True, blank=True, verbose_name=_("Enviada en"))
+
+    class Meta:
+        verbose_name = _("Notificación")
+        verbose_name_plural = _("Notificaciones")
+        indexes = [
+            models.Index(fields=["estado", "proximo_intento"], name="notificacion_pendiente_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} a {self.destinatario} ({self.estado})"
 
 # --------------------------
 # SIGNALS
 # --------------------------
 
 @receiver(post_save, sender=UserProfile)
-def email_confirmacion_entrada_turno_empleado(sender, instance, **kwargs):
+def email_confirmacion_entrada_turno_empleado(sender, instance, raw=False, **kwargs):
     """
-    Envía email de confirmación cuando un empleado marca entrada a turno.
+    Encola el email de confirmación cuando un empleado marca entrada a turno
+    (en_turno pasa a True; otros saves del perfil no lo reenvían).
     """
-    if instance.en_turno and instance.hora_entrada and instance.comprobante_entrada:
-        enviar_email_confirmacion_turno_empleado(instance)
+    if raw or "en_turno" not in instance._modificados:
+        return
+    if instance.en_turno and instance.hora_entrada:
+        from .notificaciones import notificar_entrada_turno
+        notificar_entrada_turno(instance)
 
 @receiver(post_save, sender=UserProfile)
-def email_confirmacion_salida_turno_empleado(sender, instance, **kwargs):
+def email_confirmacion_salida_turno_empleado(sender, instance, raw=False, **kwargs):
     """
-    Envía email de confirmación cuando un empleado marca salida de turno.
+    Encola el email de confirmación cuando un empleado marca salida de turno
+    (en_turno pasa a False).
     """
+    if raw or "en_turno" not in instance._modificados:
+        return
     if not instance.en_turno and instance.hora_salida:
-        enviar_email_salida_turno_empleado(instance)
+        from .notificaciones import notificar_salida_turno
+        notificar_salida_turno(instance)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidar_roles_perfil(sender, instance, signal, created=False, raw=False, **kwargs):
+    """
+    Si cambia el rol, subrol o sucursal del perfil, los permisos guardados en
+    las sesiones del usuario se vuelven a leer (core/permissions.py).
+    """
+    if raw:
+        return
+    if signal is post_save and not created and not instance._modificados & UserProfile.CAMPOS_ROLES:
+        return
+    from .permissions import invalidar_roles
+    invalidar_roles(instance.user_id)
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+@receiver(post_delete, sender=Sucursal)
+def invalidar_roles_todos(sender, created=False, raw=False, **kwargs):
+    """
+    Cambiar o borrar un rol, o borrar una sucursal (los perfiles quedan en NULL
+    sin señales), invalida los permisos guardados en todas las sesiones.
+    """
+    if created or raw:
+        return
+    from .permissions import invalidar_roles
+    invalidar_roles()
 
-@receiver(pre_save, sender=Pedido)
-def auditar_cambio_estado_pedido(sender, instance, **kwargs):
+@receiver(post_save, sender=Pedido)
+def registrar_evento_estado_pedido(sender, instance, created, raw=False, **kwargs):
     """
-    Registra en AuditoriaCambio cuando un Pedido cambia de estado.
+    Registra en PedidoEstadoEvento la creación del pedido y cada cambio de estado,
+    y los cambios también en AuditoriaCambio. El estado anterior es el leído de la
+    base al cargar la instancia (Pedido.from_db).
     """
-    if not instance.pk:
-        return  # Es un pedido nuevo, no hay cambio de estado
-    try:
-        pedido_anterior = Pedido.objects.get(pk=instance.pk)
-    except Pedido.DoesNotExist:
+    if raw:
+        return
+    if created:
+        anterior = None
+    elif hasattr(instance, "_estado_cargado"):
+        anterior = instance._estado_cargado
+    else:
+        # Instancia construida a mano: el último evento registrado da el estado previo
+        anterior = instance.eventos_estado.order_by("-fecha", "-id").values_list("estado", flat=True).first()
+    if not created and anterior == instance.estado:
         return
-    if pedido_anterior.estado != instance.estado:
+    PedidoEstadoEvento.objects.create(
+        pedido=instance, estado_anterior=anterior, estado=instance.estado,
+        fecha=instance.fecha_creacion if created else instance.fecha_actualizacion, usuario=instance.actualizado_por,
+    )
+    if not created:
         AuditoriaCambio.objects.create(
             usuario=instance.actualizado_por,
             content_type=ContentType.objects.get_for_model(Pedido),
             objeto_id=instance.pk,
             campo="estado",
-            valor_anterior=pedido_anterior.estado,
+            valor_anterior=anterior,
             valor_nuevo=instance.estado,
         )
+    instance._estado_cargado = instance.estado
 
 @receiver(post_save, sender=Cliente)
 def enviar_bienvenida_cliente(sender, instance, created, **kwargs):
     """
-    Envía email de bienvenida cuando se crea un Cliente.
+    Encola el email de bienvenida cuando se crea un Cliente.
     """
     if created:
-        enviar_email_bienvenida(instance)
+        from .notificaciones import notificar_bienvenida
+        notificar_bienvenida(instance)
 
 @receiver(post_save, sender=ValoracionProducto)
 def recalcular_promedio_valoracion(sender, instance, created, **kwargs):
@@ -788,14 +1313,110 @@ def pago_confirmado_actualiza_pedido(sender, instance, **kwargs):
         if pedido.estado != "SOLICITADO":
             return  # Ya procesado
         pedido.actualizar_estado("PREPARACION", pedido.cliente.user)
-        enviar_email_pago_confirmado(pedido.cliente, pedido)
+        from .notificaciones import notificar_pago_confirmado
+        notificar_pago_confirmado(pedido.cliente, pedido)
+
+@receiver(post_save, sender=Producto)
+def indexar_producto_busqueda(sender, instance, raw=False, **kwargs):
+    """
+    Mantiene el índice de búsqueda (core/busqueda.py) sincronizado con el producto.
+    """
+    if raw or not Producto.CAMPOS_BUSQUEDA & getattr(instance, "_modificados", Producto.CAMPOS_BUSQUEDA):
+        return
+    from .busqueda import indexar_producto
+    indexar_producto(instance)
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto_busqueda(sender, instance, **kwargs):
+    """
+    Quita el producto eliminado del índice de búsqueda.
+    """
+    from .busqueda import eliminar_producto
+    eliminar_producto(instance.pk)
+
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Categoria)
+def reindexar_productos_por_nombre(sender, instance, created, raw=False, **kwargs):
+    """
+    Si cambia una marca o categoría, reindexa sus productos (el índice guarda el nombre).
+    """
+    if created or raw:
+        return
+    from .busqueda import indexar_productos
+    indexar_productos(instance.productos.all())
+
+@receiver(post_save, sender=Producto)
+def sincronizar_producto_catalogo(sender, instance, raw=False, **kwargs):
+    """
+    Actualiza la proyección de lectura ProductoCatalogo del producto guardado.
+    """
+    if raw or not Producto.CAMPOS_CATALOGO & getattr(instance, "_modificados", Producto.CAMPOS_CATALOGO):
+        return
+    from .catalogo import sincronizar_producto
+    sincronizar_producto(instance)
+
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Categoria)
+def renombrar_en_catalogo(sender, instance, created, raw=False, **kwargs):
+    """
+    Propaga el nombre de la marca o categoría a ProductoCatalogo con un solo UPDATE.
+    """
+    if created or raw:
+        return
+    if sender is Marca:
+        ProductoCatalogo.objects.filter(producto__marca=instance).update(marca_nombre=instance.nombre)
+    else:
+        ProductoCatalogo.objects.filter(producto__categoria=instance).update(categoria_nombre=instance.nombre)
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=ImagenProducto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Marca)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=ImagenProducto)
+@receiver(m2m_changed, sender=Producto.imagenes_secundarias.through)
+@receiver(m2m_changed, sender=Marca.categorias.through)
+def invalidar_cache_catalogo(sender, **kwargs):
+    """
+    Cualquier cambio en el catálogo incrementa su versión e invalida las respuestas cacheadas.
+    """
+    if kwargs.get("raw"):
+        return
+    from .cache_catalogo import invalidar_catalogo
+    invalidar_catalogo()
 
 @receiver(post_save, sender=Pedido)
 def oferta_especial_por_compra(sender, instance, created, **kwargs):
     """
-    Si un pedido tiene más de 4 productos distintos, enviar oferta especial.
+    Si un pedido tiene más de 4 productos distintos, encola una oferta especial.
     """
     if created:
         total_productos = sum([item.cantidad for item in instance.items.all()])
         if total_productos > 4:
-            enviar_oferta_especial(instance.cliente, instance)
\ No newline at end of file
+            from .notificaciones import notificar_oferta_especial
+            notificar_oferta_especial(instance.cliente, instance)
+
+@receiver(post_save, sender=Pedido)
+@receiver(post_delete, sender=Pedido)
+def actualizar_venta_diaria_pedido(sender, instance, raw=False, **kwargs):
+    """
+    Recalcula el resumen de ventas del día del pedido (estado, total o pago completado).
+    """
+    if raw:
+        return
+    from .ventas_diarias import marcar_pedido
+    marcar_pedido(instance)
+
+@receiver(post_save, sender=ItemPedido)
+@receiver(post_delete, sender=ItemPedido)
+def actualizar_venta_diaria_item(sender, instance, raw=False, **kwargs):
+    """
+    Recalcula el resumen de ventas del día cuando cambian los items de un pedido.
+    """
+    if raw:
+        return
+    from .ventas_diarias import marcar_pedido_id
+    marcar_pedido_id(instance.pedido_id)
+
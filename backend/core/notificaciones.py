@@ -0,0 +1,219 @@
+"""
+Notificaciones por email mediante un outbox transaccional.
+
+Las señales no envían emails: insertan una fila Notificacion dentro de la
+misma transacción que el cambio que la origina (si la transacción se revierte,
+la notificación desaparece con ella). La clave de cada notificación es única,
+así que encolar dos veces el mismo aviso no genera un segundo email.
+
+El worker (`python manage.py enviar_notificaciones`) reclama lotes de
+notificaciones pendientes, las envía con un pool de hilos (cada hilo reutiliza
+su conexión al backend de email) respetando un límite de envíos por segundo,
+y registra el resultado del lote con pocas consultas. Los envíos fallidos se
+reintentan con espera exponencial hasta NOTIFICACIONES_MAX_INTENTOS.
+
+Reclamar un lote lo deja en ENVIANDO con una reserva de tiempo: si el worker
+muere a mitad de camino, al vencer la reserva otro worker lo retoma (entrega
+al menos una vez).
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Notificacion
+
+RESERVA_SEGUNDOS = 300
+REINTENTO_MAXIMO_SEGUNDOS = 3600
+
+def encolar(tipo, clave, destinatario, asunto, cuerpo):
+    """
+    Agrega la notificación al outbox (un INSERT; se ignora si la clave ya existe).
+    """
+    if not destinatario:
+        return
+    Notificacion.objects.bulk_create(
+        [Notificacion(tipo=tipo, clave=clave[:150], destinatario=destinatario, asunto=asunto, cuerpo=cuerpo)],
+        ignore_conflicts=True,
+    )
+
+def notificar_bienvenida(cliente):
+    encolar(
+        "BIENVENIDA", f"bienvenida:{cliente.pk}", cliente.email,
+        "Bienvenido a Ferremas",
+        f"Hola {cliente.user.username}, gracias por registrarte en Ferremas.",
+    )
+
+def notificar_entrada_turno(empleado):
+    comprobante = f" (comprobante: {empleado.comprobante_entrada})" if empleado.comprobante_entrada else ""
+    encolar(
+        "TURNO_ENTRADA", f"turno-entrada:{empleado.pk}:{empleado.hora_entrada.isoformat()}", empleado.user.email,
+        "Entrada a turno registrada",
+        f"Se registró tu entrada a turno el {timezone.localtime(empleado.hora_entrada):%d-%m-%Y %H:%M}{comprobante}.",
+    )
+
+def notificar_salida_turno(empleado):
+    encolar(
+        "TURNO_SALIDA", f"turno-salida:{empleado.pk}:{empleado.hora_salida.isoformat()}", empleado.user.email,
+        "Salida de turno registrada",
+        f"Se registró tu salida de turno el {timezone.localtime(empleado.hora_salida):%d-%m-%Y %H:%M}.",
+    )
+
+def notificar_pago_confirmado(cliente, pedido):
+    encolar(
+        "PAGO_CONFIRMADO", f"pago-confirmado:{pedido.pk}", cliente.email,
+        f"Pago confirmado - Pedido #{pedido.pk}",
+        f"Recibimos el pago de tu pedido #{pedido.pk} por ${f'{int(pedido.total):,}'.replace(',', '.')} CLP. "
+        "Ya lo estamos preparando.",
+    )
+
+def notificar_oferta_especial(cliente, pedido):
+    encolar(
+        "OFERTA_ESPECIAL", f"oferta-especial:{pedido.pk}", cliente.email,
+        "Una oferta especial para ti",
+        f"Por tu compra de más de 4 productos en el pedido #{pedido.pk} tienes una oferta especial en tu próxima compra.",
+    )
+
+class LimiteTasa:
+    """
+    Espacia los envíos para no superar `por_segundo` (compartido entre hilos).
+    """
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo if por_segundo else 0
+        self.siguiente = time.monotonic()
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            turno = max(self.siguiente, ahora)
+            self.siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+def reclamar(tamano):
+    """
+    Marca como ENVIANDO hasta `tamano` notificaciones listas para enviar (pendientes
+    o con la reserva de otro worker vencida) y las devuelve.
+    """
+    ahora = timezone.now()
+    disponibles = Q(estado="PENDIENTE") | Q(estado="ENVIANDO"), Q(proximo_intento__lte=ahora)
+    ids = list(
+        Notificacion.objects.filter(*disponibles).order_by("proximo_intento", "id").values_list("id", flat=True)[:tamano]
+    )
+    if not ids:
+        return []
+    lote = uuid.uuid4().hex
+    # El filtro se repite: si otro worker reclamó alguna entretanto, ya no cumple la condición
+    Notificacion.objects.filter(*disponibles, id__in=ids).update(
+        estado="ENVIANDO", lote=lote, proximo_intento=ahora + timedelta(seconds=RESERVA_SEGUNDOS)
+    )
+    return list(Notificacion.objects.filter(lote=lote, estado="ENVIANDO").order_by("proximo_intento", "id"))
+
+class Despachador:
+    """
+    Envía lotes del outbox con un pool de `hilos`. Usar como context manager
+    para cerrar el pool y las conexiones de email al terminar.
+    """
+    def __init__(self, hilos=4, por_segundo=None, max_intentos=None, reintento_segundos=None, backend=None):
+        self.pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="notificaciones")
+        self.limite = LimiteTasa(settings.NOTIFICACIONES_POR_SEGUNDO if por_segundo is None else por_segundo)
+        self.max_intentos = max_intentos or settings.NOTIFICACIONES_MAX_INTENTOS
+        self.reintento_segundos = (
+            settings.NOTIFICACIONES_REINTENTO_SEGUNDOS if reintento_segundos is None else reintento_segundos
+        )
+        self.backend = backend
+        self.local = threading.local()
+        self.conexiones = []
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.pool.shutdown(wait=True)
+        for conexion in self.conexiones:
+            try:
+                conexion.close()
+            except Exception:
+                pass
+
+    def _conexion(self):
+        # Una conexión por hilo, abierta una sola vez (p. ej. una sesión SMTP)
+        conexion = getattr(self.local, "conexion", None)
+        if conexion is None:
+            conexion = get_connection(self.backend)
+            conexion.open()
+            self.local.conexion = conexion
+            with self.lock:
+                self.conexiones.append(conexion)
+        return conexion
+
+    def _enviar(self, notificacion):
+        self.limite.esperar()
+        try:
+            EmailMessage(
+                notificacion.asunto, notificacion.cuerpo, settings.DEFAULT_FROM_EMAIL,
+                [notificacion.destinatario], connection=self._conexion(),
+            ).send()
+        except Exception as e:
+            # La conexión puede haber quedado inservible: el hilo abre otra en el próximo envío
+            self.local.conexion = None
+            return str(e) or e.__class__.__name__
+        return None
+
+    def procesar_lote(self, tamano=100):
+        """
+        Reclama y envía un lote. Devuelve {"enviadas", "reintentos", "fallidas"}.
+        """
+        notificaciones = reclamar(tamano)
+        errores = list(self.pool.map(self._enviar, notificaciones))
+        ahora = timezone.now()
+        enviadas = [n.id for n, error in zip(notificaciones, errores) if error is None]
+        con_error = []
+        for notificacion, error in zip(notificaciones, errores):
+            if error is None:
+                continue
+            notificacion.intentos += 1
+            notificacion.ultimo_error = error
+            notificacion.lote = ""
+            if notificacion.intentos >= self.max_intentos:
+                notificacion.estado = "FALLIDA"
+            else:
+                notificacion.estado = "PENDIENTE"
+                espera = min(self.reintento_segundos * 2 ** (notificacion.intentos - 1), REINTENTO_MAXIMO_SEGUNDOS)
+                notificacion.proximo_intento = ahora + timedelta(seconds=espera)
+            con_error.append(notificacion)
+        if enviadas:
+            Notificacion.objects.filter(id__in=enviadas).update(
+                estado="ENVIADA", enviada_en=ahora, lote="", intentos=F("intentos") + 1
+            )
+        if con_error:
+            Notificacion.objects.bulk_update(
+                con_error, ["estado", "intentos", "ultimo_error", "lote", "proximo_intento"], batch_size=500
+            )
+        fallidas = sum(1 for n in con_error if n.estado == "FALLIDA")
+        return {"enviadas": len(enviadas), "reintentos": len(con_error) - fallidas, "fallidas": fallidas}
+
+    def drenar(self, tamano=100):
+        """
+        Procesa lotes hasta que no quedan notificaciones listas para enviar.
+        """
+        totales = {"enviadas": 0, "reintentos": 0, "fallidas": 0}
+        while True:
+            resultado = self.procesar_lote(tamano)
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if not any(resultado.values()):
+                return totales
@@ -0,0 +1,161 @@
+"""
+Confirmación de pagos de Stripe por webhook.
+
+1. `registrar_evento` verifica la firma (cabecera Stripe-Signature) y guarda el
+   evento crudo en EventoStripe, cuya clave primaria es el id del evento. Una
+   entrega repetida cuesta una búsqueda por clave primaria y no encola nada.
+2. Cada evento nuevo encola la tarea "procesar_evento_stripe" (core/tareas.py),
+   que llama a `procesar_evento` en el worker: el webhook responde de inmediato.
+3. `procesar_evento` toma el evento en una transacción y, para un checkout
+   pagado, convierte el carrito en Pedido (core/checkout.py, que confirma sus
+   reservas de stock) y crea su Pago COMPLETADO. La señal post_save de Pago lo
+   pasa a PREPARACION y notifica al cliente. Si la sesión vence o falla, libera
+   las reservas de esa sesión (ReservaStock.sesion_pago), no las de una sesión
+   más nueva del mismo carrito.
+
+Reprocesar un evento no duplica nada: el evento solo se procesa desde PENDIENTE
+o ERROR, el Pago es único por sesión y el Pedido es único por carrito.
+
+`firmar` genera la cabecera Stripe-Signature con el mismo esquema que Stripe,
+para probar el webhook con eventos locales (ver el escenario "stripe_webhook").
+"""
+import hashlib
+import hmac
+import json
+import time
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .checkout import convertir_carrito
+from .models import Cart, EventoStripe, Pago
+from .reservas import cancelar as cancelar_reservas
+from .tareas import encolar
+
+MAX_INTENTOS = 5
+
+class EventoInvalido(Exception):
+    """
+    El cuerpo no es un evento de Stripe o su firma no es válida.
+    """
+
+def secreto_webhook():
+    return settings.STRIPE_WEBHOOK_SECRET
+
+def firmar(payload, secreto=None, timestamp=None):
+    """
+    Cabecera Stripe-Signature para `payload` (bytes), como la genera Stripe.
+    """
+    timestamp = int(timestamp or time.time())
+    firmado = f"{timestamp}.".encode() + payload
+    firma = hmac.new((secreto or secreto_webhook()).encode(), firmado, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={firma}"
+
+def registrar_evento(payload, firma):
+    """
+    Verifica y guarda un evento recibido. Devuelve (evento, creado); si es nuevo
+    encola su procesamiento. Lanza EventoInvalido si la firma no corresponde.
+    """
+    try:
+        stripe.WebhookSignature.verify_header(
+            payload.decode("utf-8"), firma or "", secreto_webhook(), tolerance=stripe.Webhook.DEFAULT_TOLERANCE
+        )
+        datos = json.loads(payload)
+        evento_id, tipo = datos["id"], datos["type"]
+    except (stripe.SignatureVerificationError, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise EventoInvalido(str(e) or "Evento inválido.")
+    evento, creado = EventoStripe.objects.get_or_create(id=evento_id, defaults={"tipo": tipo, "payload": datos})
+    if creado:
+        encolar("procesar_evento_stripe", evento_id=evento.id)
+    return evento, creado
+
+def _carrito(sesion):
+    carrito_id = (sesion.get("metadata") or {}).get("cart_id")
+    if not carrito_id:
+        return None
+    return Cart.objects.select_for_update().filter(pk=carrito_id).select_related("user").first()
+
+def _sesion_pagada(sesion):
+    if sesion.get("payment_status") != "paid":
+        return "IGNORADO"  # Pago asíncrono aún pendiente: llegará checkout.session.async_payment_succeeded
+    carrito = _carrito(sesion)
+    if carrito is None:
+        raise ValueError(f"La sesión {sesion.get('id')} no corresponde a un carrito.")
+    if Pago.objects.filter(stripe_id=sesion["id"]).exists():
+        return "PROCESADO"
+    # Los precios del carrito se fijaron al crear la sesión: son los que se cobraron
+    email = (sesion.get("customer_details") or {}).get("email")
+    pedido, _ = convertir_carrito(carrito, estado="PAGADO", email=email, fijar=False)
+    # La señal post_save de Pago avanza el pedido a PREPARACION y notifica al cliente
+    Pago.objects.create(pedido=pedido, stripe_id=sesion["id"], estado="COMPLETADO", monto=sesion.get("amount_total") or 0)
+    return "PROCESADO"
+
+def _sesion_no_pagada(sesion):
+    carrito = _carrito(sesion)
+    if carrito is not None and carrito.estado == "ACTIVO":
+        # Un vencimiento atrasado de una sesión anterior no libera el stock de la sesión vigente
+        cancelar_reservas(carrito, sesion_pago=sesion.get("id") or "")
+    return "PROCESADO"
+
+PROCESADORES = {
+    "checkout.session.completed": _sesion_pagada,
+    "checkout.session.async_payment_succeeded": _sesion_pagada,
+    "checkout.session.expired": _sesion_no_pagada,
+    "checkout.session.async_payment_failed": _sesion_no_pagada,
+}
+
+def procesar_evento(evento_id):
+    """
+    Procesa un evento PENDIENTE (o con ERROR) y devuelve su nuevo estado, o
+    None si ya estaba procesado. Un error deja el evento en ERROR para reintentarlo.
+    """
+    try:
+        with transaction.atomic():
+            evento = EventoStripe.objects.select_for_update().filter(
+                pk=evento_id, estado__in=["PENDIENTE", "ERROR"]
+            ).first()
+            if evento is None:
+                return None
+            procesador = PROCESADORES.get(evento.tipo)
+            estado = procesador(evento.payload["data"]["object"]) if procesador else "IGNORADO"
+            EventoStripe.objects.filter(pk=evento_id).update(
+                estado=estado, intentos=F("intentos") + 1, error="", procesado_en=timezone.now()
+            )
+        return estado
+    except Exception as e:
+        EventoStripe.objects.filter(pk=evento_id).update(estado="ERROR", intentos=F("intentos") + 1, error=str(e))
+        raise
+
+def procesar_pendientes(limite=None):
+    """
+    Procesa los eventos pendientes o con error (menos de MAX_INTENTOS), del más
+    antiguo al más nuevo; sirve si alguna tarea no llegó a ejecutarse.
+    Devuelve {estado: cantidad}.
+    """
+    eventos = EventoStripe.objects.filter(estado__in=["PENDIENTE", "ERROR"], intentos__lt=MAX_INTENTOS)
+    ids = list(eventos.order_by("recibido_en").values_list("id", flat=True)[:limite])
+    resumen = {}
+    for evento_id in ids:
+        try:
+            estado = procesar_evento(evento_id)
+        except Exception:
+            estado = "ERROR"
+        if estado:
+            resumen[estado] = resumen.get(estado, 0) + 1
+    return resumen
+
+def estado_pago(session_id, usuario):
+    """
+    (estado, pedido_id) del pago de una sesión de checkout del usuario, con una
+    consulta por índice. ("PENDIENTE", None) si el webhook aún no llega o no se procesa.
+    """
+    pago = (
+        Pago.objects.filter(stripe_id=session_id, pedido__cliente__user=usuario)
+        .values("estado", "pedido_id").first()
+    )
+    if pago is None:
+        return "PENDIENTE", None
+    return pago["estado"], pago["pedido_id"]
@@ -0,0 +1,236 @@
+"""
+Pasarela de pagos: acceso a Stripe para el checkout, con límites de tiempo y
+tolerancia a fallos, y una pasarela falsa en proceso para pruebas y benchmarks.
+
+- Un solo cliente por proceso (`obtener_pasarela`), con una requests.Session
+  que reutiliza conexiones HTTP (pool keep-alive) en vez de abrir una por pago.
+- Timeouts estrictos de conexión y de lectura (PASARELA_TIMEOUT) y un
+  presupuesto total por operación (PASARELA_PRESUPUESTO_SEGUNDOS), reintentos
+  incluidos: un Stripe lento no retiene un worker más que eso.
+- Reintentos con espera exponencial y jitter, solo ante errores transitorios
+  (red, timeout, 429, 5xx). Todos los intentos usan la misma clave de
+  idempotencia, derivada del carrito y su versión, así Stripe nunca crea dos
+  sesiones para el mismo checkout (tampoco ante un doble envío del formulario).
+- Un interruptor (circuit breaker): tras PASARELA_INTERRUPTOR_FALLOS fallos
+  transitorios seguidos deja de llamar a Stripe por PASARELA_INTERRUPTOR_SEGUNDOS
+  y falla de inmediato; luego deja pasar una llamada de prueba.
+
+Con PASARELA_PAGOS = "falsa" se usa PasarelaFalsa, que simula latencia, errores
+y timeouts sin red (ver el escenario de benchmark "pasarela").
+"""
+import hashlib
+import itertools
+import logging
+import random
+import threading
+import time
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+class ErrorPasarela(Exception):
+    """
+    La pasarela rechazó la operación (datos inválidos, credenciales, etc.); reintentar no sirve.
+    """
+
+class PasarelaNoDisponible(ErrorPasarela):
+    """
+    La pasarela no respondió a tiempo tras los reintentos, o el interruptor está abierto.
+    """
+
+def es_transitorio(error):
+    """
+    Errores de Stripe que vale la pena reintentar: red/timeout, límite de tasa y errores 5xx.
+    """
+    if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError)):
+        return True
+    return isinstance(error, stripe.StripeError) and (error.http_status or 0) >= 500
+
+def clave_idempotencia(carrito, reserva, line_items):
+    """
+    Clave del checkout de un carrito en una versión dada: el id del carrito, la
+    reserva de stock que respalda el pago (cada re-reserva es una versión nueva) y
+    un resumen de lo que se cobra. No depende del reloj: un doble envío que
+    reutiliza la reserva repite la clave.
+    """
+    version = hashlib.sha256(repr((line_items, int(carrito.total))).encode()).hexdigest()[:16]
+    return f"checkout-{carrito.id}-{reserva.pk}-{version}"
+
+class Interruptor:
+    """
+    Circuit breaker por proceso: CERRADO (normal), ABIERTO (falla sin llamar) y,
+    pasado el enfriamiento, SEMIABIERTO (una sola llamada de prueba decide).
+    """
+    def __init__(self, umbral=5, enfriamiento=30.0):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_desde = None
+        self.probando = False
+
+    @property
+    def estado(self):
+        with self.lock:
+            if self.abierto_desde is None:
+                return "CERRADO"
+            if time.monotonic() - self.abierto_desde < self.enfriamiento:
+                return "ABIERTO"
+            return "SEMIABIERTO"
+
+    def permitir(self):
+        with self.lock:
+            if self.abierto_desde is None:
+                return True
+            if time.monotonic() - self.abierto_desde < self.enfriamiento or self.probando:
+                return False
+            self.probando = True
+            return True
+
+    def exito(self):
+        with self.lock:
+            self.fallos = 0
+            self.abierto_desde = None
+            self.probando = False
+
+    def fallo(self):
+        with self.lock:
+            self.fallos += 1
+            if self.probando or self.fallos >= self.umbral:
+                if self.abierto_desde is None or self.probando:
+                    logger.warning("Pasarela de pagos: interruptor abierto tras %s fallos", self.fallos)
+                self.abierto_desde = time.monotonic()
+            self.probando = False
+
+class Pasarela:
+    """
+    Base de las pasarelas: reintentos, presupuesto de tiempo e interruptor.
+    Las subclases implementan `_crear_sesion(params, clave)`.
+    """
+    def __init__(self, reintentos=2, espera_base=0.2, presupuesto=15.0, interruptor=None):
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.presupuesto = presupuesto
+        self.interruptor = interruptor or Interruptor()
+
+    def _llamar(self, funcion):
+        if not self.interruptor.permitir():
+            raise PasarelaNoDisponible("La pasarela de pagos no está disponible; intenta en unos minutos.")
+        limite = time.monotonic() + self.presupuesto
+        for intento in itertools.count():
+            try:
+                resultado = funcion()
+            except stripe.StripeError as e:
+                if not es_transitorio(e):
+                    self.interruptor.exito()  # Stripe respondió: el servicio está arriba
+                    raise ErrorPasarela(e.user_message or str(e)) from e
+                espera = self.espera_base * 2 ** intento * random.uniform(0.5, 1.5)
+                if intento >= self.reintentos or time.monotonic() + espera >= limite:
+                    self.interruptor.fallo()
+                    raise PasarelaNoDisponible("La pasarela de pagos no respondió; intenta nuevamente.") from e
+                logger.info("Pasarela de pagos: reintento %s tras %s", intento + 1, e.__class__.__name__)
+                time.sleep(espera)
+            else:
+                self.interruptor.exito()
+                return resultado
+
+    def crear_sesion_checkout(self, params, clave):
+        """
+        Crea la sesión de Stripe Checkout y devuelve {"id", "url"}. Lanza
+        ErrorPasarela o PasarelaNoDisponible.
+        """
+        return self._llamar(lambda: self._crear_sesion(params, clave))
+
+    def _crear_sesion(self, params, clave):
+        raise NotImplementedError
+
+class PasarelaStripe(Pasarela):
+    def __init__(self, api_key, timeout=(3, 10), conexiones=10, **kwargs):
+        super().__init__(**kwargs)
+        sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexiones)
+        sesion.mount("https://", adaptador)
+        # Los reintentos los maneja la pasarela (con su presupuesto y el interruptor), no la librería
+        self.cliente = stripe.StripeClient(
+            api_key, http_client=stripe.RequestsClient(timeout=timeout, session=sesion), max_network_retries=0,
+        )
+
+    def _crear_sesion(self, params, clave):
+        sesion = self.cliente.checkout.sessions.create(params=params, options={"idempotency_key": clave})
+        return {"id": sesion.id, "url": sesion.url}
+
+class PasarelaFalsa(Pasarela):
+    """
+    Pasarela en proceso, sin red: responde tras `latencia` segundos y falla al
+    azar con errores de Stripe (`fallos` de 0 a 1: 5xx; `timeouts`: espera el
+    timeout de lectura y falla como error de conexión). Como Stripe, una clave
+    de idempotencia ya usada devuelve la misma sesión, y falla si los parámetros
+    no son los mismos.
+    """
+    def __init__(self, latencia=0.05, fallos=0.0, timeouts=0.0, timeout_lectura=10.0, semilla=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latencia = latencia
+        self.fallos = fallos
+        self.timeouts = timeouts
+        self.timeout_lectura = timeout_lectura
+        self.caida = False
+        self.rng = random.Random(semilla)
+        self.lock = threading.Lock()
+        self.sesiones = {}
+        self.llamadas = 0
+
+    def _crear_sesion(self, params, clave):
+        with self.lock:
+            self.llamadas += 1
+            azar = self.rng.random()
+        if self.caida or azar < self.timeouts:
+            time.sleep(self.timeout_lectura)
+            raise stripe.APIConnectionError("Timeout simulado de la pasarela falsa.")
+        time.sleep(self.latencia)
+        if azar < self.timeouts + self.fallos:
+            raise stripe.APIError("Error simulado de la pasarela falsa.", http_status=503)
+        with self.lock:
+            if clave not in self.sesiones:
+                sesion_id = f"cs_falsa_{len(self.sesiones) + 1}"
+                self.sesiones[clave] = ({"id": sesion_id, "url": f"https://checkout.falsa/{sesion_id}"}, params)
+            sesion, params_clave = self.sesiones[clave]
+        if params_clave != params:
+            raise stripe.IdempotencyError("Clave de idempotencia reutilizada con otros parámetros.", http_status=400)
+        return sesion
+
+_pasarela = None
+_pasarela_lock = threading.Lock()
+
+def crear_pasarela():
+    opciones = {
+        "reintentos": settings.PASARELA_REINTENTOS,
+        "presupuesto": settings.PASARELA_PRESUPUESTO_SEGUNDOS,
+        "interruptor": Interruptor(settings.PASARELA_INTERRUPTOR_FALLOS, settings.PASARELA_INTERRUPTOR_SEGUNDOS),
+    }
+    if settings.PASARELA_PAGOS == "falsa":
+        return PasarelaFalsa(timeout_lectura=settings.PASARELA_TIMEOUT[1], **opciones)
+    return PasarelaStripe(settings.STRIPE_SECRET_KEY, timeout=settings.PASARELA_TIMEOUT, **opciones)
+
+def obtener_pasarela():
+    """
+    Pasarela compartida del proceso (se crea en el primer uso).
+    """
+    global _pasarela
+    if _pasarela is None:
+        with _pasarela_lock:
+            if _pasarela is None:
+                _pasarela = crear_pasarela()
+    return _pasarela
+
+def usar_pasarela(pasarela):
+    """
+    Reemplaza la pasarela del proceso (p. ej. por una PasarelaFalsa) y devuelve la anterior.
+    """
+    global _pasarela
+    with _pasarela_lock:
+        anterior, _pasarela = _pasarela, pasarela
+    return anterior
@@ -1,5 +1,106 @@
+"""
+Permisos por rol para la API.
+
+El rol, el subrol (tipo_empleado) y la sucursal del usuario se leen de la base
+una vez y quedan guardados en su sesión; los permisos los consultan desde ahí,
+sin consultas a la base. Cada entrada de la sesión lleva las versiones de roles
+con que se leyó (una global y una por usuario, en la caché): las señales de
+UserProfile, Rol y Sucursal (models.py) las cambian y la siguiente petición
+vuelve a leer los datos.
+
+Las versiones viven en el alias ROLES_CACHE_ALIAS. Solo se confía en ellas si
+esa caché es compartida entre procesos (Redis, Memcached, base de datos,
+archivos): con una caché local (LocMem) la invalidación no llegaría a los
+demás workers y un rol revocado seguiría vigente en ellos, así que los roles
+se leen de la base en cada petición (una consulta).
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
 from rest_framework.permissions import BasePermission
 
+CLAVE_SESION = "roles"
+CLAVE_VERSION = "roles:version"
+SIN_ROLES = {"rol": None, "tipo_empleado": None, "sucursal_id": None}
+
+# Backends cuyo contenido es de cada proceso
+CACHES_LOCALES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+def _alias():
+    return getattr(settings, "ROLES_CACHE_ALIAS", "default")
+
+def _cache():
+    return caches[_alias()]
+
+def versiones_compartidas():
+    """
+    True si las versiones de roles viven en una caché que ven todos los workers.
+    """
+    return settings.CACHES[_alias()]["BACKEND"] not in CACHES_LOCALES
+
+def _clave_usuario(user_id):
+    return f"roles:usuario:{user_id}"
+
+def _versiones(user_id):
+    cache = _cache()
+    claves = [CLAVE_VERSION, _clave_usuario(user_id)]
+    versiones = cache.get_many(claves)
+    if len(versiones) < len(claves):
+        for clave in claves:
+            if clave not in versiones:
+                cache.add(clave, uuid.uuid4().hex, timeout=None)
+        versiones = cache.get_many(claves)
+    return [versiones.get(clave) for clave in claves]
+
+def invalidar_roles(user_id=None):
+    """
+    Cambia la versión de roles del usuario (o de todos si no se indica) al
+    confirmarse la transacción: las sesiones vuelven a leerlos de la base.
+    """
+    clave = _clave_usuario(user_id) if user_id else CLAVE_VERSION
+    transaction.on_commit(lambda: _cache().set(clave, uuid.uuid4().hex, timeout=None))
+
+def _leer_roles(user):
+    from .models import UserProfile
+    fila = UserProfile.objects.filter(user=user).values("rol__nombre", "tipo_empleado", "sucursal_id").first()
+    if fila is None:
+        return dict(SIN_ROLES)
+    return {"rol": fila["rol__nombre"], "tipo_empleado": fila["tipo_empleado"], "sucursal_id": fila["sucursal_id"]}
+
+def roles_de(request):
+    """
+    {"rol", "tipo_empleado", "sucursal_id"} del usuario de la petición. Se leen
+    de la sesión si siguen vigentes; si no, con una consulta, y se guardan en ella.
+    Sin caché compartida se leen siempre de la base.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return SIN_ROLES
+    # Varios permisos en la misma petición comparten el resultado
+    roles = getattr(user, "_roles", None)
+    if roles is not None:
+        return roles
+    if not versiones_compartidas():
+        user._roles = _leer_roles(user)
+        return user._roles
+    # Las versiones se leen antes que la base: un cambio concurrente deja la entrada ya vencida
+    versiones = _versiones(user.pk)
+    sesion = getattr(request, "session", None)
+    guardados = sesion.get(CLAVE_SESION) if sesion is not None else None
+    if guardados and guardados.get("usuario") == user.pk and guardados.get("versiones") == versiones:
+        roles = guardados
+    else:
+        roles = {"usuario": user.pk, "versiones": versiones, **_leer_roles(user)}
+        if sesion is not None:
+            sesion[CLAVE_SESION] = roles
+    user._roles = roles
+    return roles
+
 class IsAdminOrEmpleadoEspecial(BasePermission):
     """
     Permite acceso a superusuarios, staff, empleados con rol ADMINISTRADOR,
@@ -7,15 +108,12 @@ class IsAdminOrEmpleadoEspecial(BasePermission):
     """
     def has_permission(self, request, view):
         user = request.user
-        profile = getattr(user, "profile", None)
         if user.is_superuser or user.is_staff:
             return True
-        if profile:
-            if getattr(profile.rol, "nombre", None) == "ADMINISTRADOR":
-                return True
-            if getattr(profile.rol, "nombre", None) == "EMPLEADO" and profile.tipo_empleado in ["CONTADOR", "BODEGUERO"]:
-                return True
-        return False
+        roles = roles_de(request)
+        if roles["rol"] == "ADMINISTRADOR":
+            return True
+        return roles["rol"] == "EMPLEADO" and roles["tipo_empleado"] in ["CONTADOR", "BODEGUERO"]
 
 class IsSoloAdmin(BasePermission):
     """
@@ -23,31 +121,26 @@ class IsSoloAdmin(BasePermission):
     """
     def has_permission(self, request, view):
         user = request.user
-        profile = getattr(user, "profile", None)
         if user.is_superuser or user.is_staff:
             return True
-        if profile and getattr(profile.rol, "nombre", None) == "ADMINISTRADOR":
-            return True
-        return False
+        return roles_de(request)["rol"] == "ADMINISTRADOR"
 
 class IsEmpleadoSubrol(BasePermission):
     """
-    Permite acceso solo a empleados con un subrol específico.
-    Úsalo así: permission_classes = [IsEmpleadoSubrol.with_subrol("CONTADOR")]
+    Permite acceso solo a empleados; sin subrol, a cualquier empleado.
+    Para un subrol específico: permission_classes = [IsEmpleadoSubrol.with_subrol("CONTADOR")]
     """
     subrol = None
+    _por_subrol = {}
 
     @classmethod
     def with_subrol(cls, subrol):
-        class CustomSubrol(cls):
-            pass
-        CustomSubrol.subrol = subrol
-        return CustomSubrol
+        # Una sola clase por subrol, aunque se use en varias vistas
+        if (cls, subrol) not in cls._por_subrol:
+            nombre = f"{cls.__name__}{subrol.title()}"
+            cls._por_subrol[(cls, subrol)] = type(nombre, (cls,), {"subrol": subrol, "__module__": cls.__module__})
+        return cls._por_subrol[(cls, subrol)]
 
     def has_permission(self, request, view):
-        profile = getattr(request.user, "profile", None)
-        return (
-            profile
-            and getattr(profile.rol, "nombre", None) == "EMPLEADO"
-            and profile.tipo_empleado == self.subrol
-        )
\ No newline at end of file
+        roles = roles_de(request)
+        return roles["rol"] == "EMPLEADO" and (self.subrol is None or roles["tipo_empleado"] == self.subrol)
@@ -0,0 +1,162 @@
+"""
+Promociones: descuentos por lista de productos, categoría, marca o sucursal
+con ventana de vigencia.
+
+Activar o finalizar una promoción escribe Producto.descuento con un solo UPDATE
+sobre todos los productos de su alcance (sin save() por producto ni señales),
+luego recalcula en bloque su fila de ProductoCatalogo (el precio con descuento)
+e invalida la caché del catálogo una vez. El índice de búsqueda no guarda el
+descuento, así que no se toca.
+
+Cada producto recuerda qué promoción le fijó el descuento (Producto.promocion).
+Si dos promociones activas lo cubren, gana la activada más recientemente; al
+finalizar una, sus productos pasan a la siguiente promoción activa que los
+cubra o vuelven a su descuento propio (Producto.descuento_base, el que tenían
+antes de la primera promoción).
+
+`procesar_promociones()` (comando `python manage.py procesar_promociones`)
+activa las programadas cuyo inicio llegó y finaliza las vencidas.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_catalogo import invalidar_catalogo
+from .catalogo import sincronizar_productos
+from .models import Categoria, Marca, Producto, Promocion, Sucursal
+
+def productos_de(promocion):
+    """
+    Productos del alcance de la promoción (queryset, sin evaluar).
+    """
+    if promocion.alcance == "PRODUCTOS":
+        return Producto.objects.filter(promociones=promocion)
+    if promocion.alcance == "CATEGORIA":
+        return Producto.objects.filter(categoria_id=promocion.categoria_id)
+    if promocion.alcance == "MARCA":
+        return Producto.objects.filter(marca_id=promocion.marca_id)
+    return Producto.objects.filter(sucursal_id=promocion.sucursal_id)
+
+def _aplicar(productos, promocion, ahora):
+    return productos.update(descuento=promocion.descuento, promocion=promocion, fecha_actualizacion=ahora)
+
+def activar(promocion, ahora=None):
+    """
+    Activa una promoción programada: un UPDATE sobre sus productos. Devuelve
+    cuántos productos cambió (0 si ya no estaba programada).
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        if not Promocion.objects.filter(pk=promocion.pk, estado="PROGRAMADA").update(estado="ACTIVA", activada_en=ahora):
+            return 0
+        afectados = _aplicar(productos_de(promocion), promocion, ahora)
+        Promocion.objects.filter(pk=promocion.pk).update(productos_afectados=afectados)
+        sincronizar_productos(Producto.objects.filter(promocion=promocion))
+        invalidar_catalogo()
+    promocion.estado, promocion.activada_en, promocion.productos_afectados = "ACTIVA", ahora, afectados
+    return afectados
+
+def finalizar(promocion, estado="FINALIZADA", ahora=None):
+    """
+    Termina una promoción (FINALIZADA o CANCELADA). Si estaba activa, sus
+    productos pasan a otra promoción activa que los cubra o vuelven a su descuento base.
+    Devuelve cuántos productos cambiaron.
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        anterior = Promocion.objects.select_for_update().filter(pk=promocion.pk).values_list("estado", flat=True).first()
+        if anterior not in ("PROGRAMADA", "ACTIVA"):
+            return 0
+        Promocion.objects.filter(pk=promocion.pk).update(estado=estado, finalizada_en=ahora)
+        promocion.estado, promocion.finalizada_en = estado, ahora
+        if anterior == "PROGRAMADA":
+            return 0
+        propios = Producto.objects.filter(promocion=promocion)
+        # Los productos que cambian son exactamente los que la promoción tenía
+        ids = list(propios.values_list("pk", flat=True))
+        cambiados = 0
+        for otra in Promocion.objects.filter(estado="ACTIVA").order_by("-activada_en", "-id"):
+            cambiados += _aplicar(productos_de(otra).filter(promocion=promocion), otra, ahora)
+        cambiados += propios.update(descuento=F("descuento_base"), promocion=None, fecha_actualizacion=ahora)
+        limite = connection.features.max_query_params or len(ids) or 1
+        for i in range(0, len(ids), limite):
+            sincronizar_productos(Producto.objects.filter(pk__in=ids[i:i + limite]))
+        invalidar_catalogo()
+    return cambiados
+
+def procesar_promociones(ahora=None):
+    """
+    Activa las promociones programadas cuyo inicio llegó y finaliza las que
+    vencieron. Devuelve {"activadas": n, "finalizadas": m}.
+    """
+    ahora = ahora or timezone.now()
+    finalizadas = 0
+    vencidas = Promocion.objects.filter(estado__in=["PROGRAMADA", "ACTIVA"], fin__lte=ahora)
+    for promocion in vencidas.order_by("fin", "id"):
+        finalizar(promocion, ahora=ahora)
+        finalizadas += 1
+    activadas = 0
+    for promocion in Promocion.objects.filter(estado="PROGRAMADA", inicio__lte=ahora).order_by("inicio", "id"):
+        activar(promocion, ahora=ahora)
+        activadas += 1
+    return {"activadas": activadas, "finalizadas": finalizadas}
+
+def crear_promocion(datos, usuario=None):
+    """
+    Valida y crea una promoción a partir de un dict (nombre, descuento, alcance,
+    productos | categoria | marca | sucursal, inicio, fin). Si su inicio ya
+    llegó, la activa de inmediato. Lanza ValueError con un mensaje legible.
+    """
+    from django.utils.dateparse import parse_datetime
+
+    try:
+        descuento = float(datos.get("descuento"))
+    except (TypeError, ValueError):
+        raise ValueError("Descuento inválido.")
+    if not 0 < descuento < 100:
+        raise ValueError("El descuento debe estar entre 0 y 100.")
+    alcance = datos.get("alcance")
+    if alcance not in dict(Promocion.ALCANCE_CHOICES):
+        raise ValueError("Alcance inválido; usa PRODUCTOS, CATEGORIA, MARCA o SUCURSAL.")
+
+    fechas = {}
+    for campo in ("inicio", "fin"):
+        valor = datos.get(campo)
+        if valor in (None, ""):
+            continue
+        fecha = parse_datetime(str(valor))
+        if fecha is None:
+            raise ValueError(f"'{campo}' debe ser una fecha y hora ISO 8601.")
+        fechas[campo] = timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+    inicio = fechas.get("inicio", timezone.now())
+    fin = fechas.get("fin")
+    if fin is not None and fin <= inicio:
+        raise ValueError("El fin de la promoción debe ser posterior a su inicio.")
+
+    promocion = Promocion(
+        nombre=(datos.get("nombre") or f"Descuento {descuento:g}%")[:100], descuento=descuento,
+        alcance=alcance, inicio=inicio, fin=fin, creada_por=usuario,
+    )
+    objetivos = {"CATEGORIA": ("categoria", Categoria), "MARCA": ("marca", Marca), "SUCURSAL": ("sucursal", Sucursal)}
+    productos_ids = []
+    if alcance == "PRODUCTOS":
+        try:
+            productos_ids = [int(pk) for pk in datos.get("productos") or []]
+        except (TypeError, ValueError):
+            raise ValueError("Productos inválidos.")
+        if not productos_ids:
+            raise ValueError("Indica al menos un producto.")
+    else:
+        campo, modelo = objetivos[alcance]
+        objetivo = datos.get(campo)
+        if not objetivo or not modelo.objects.filter(pk=objetivo).exists():
+            raise ValueError(f"Indica un(a) {campo} existente.")
+        setattr(promocion, f"{campo}_id", objetivo)
+
+    with transaction.atomic():
+        promocion.save()
+        if productos_ids:
+            promocion.productos.add(*Producto.objects.filter(id__in=productos_ids).values_list("id", flat=True))
+    if promocion.inicio <= timezone.now() and (promocion.fin is None or promocion.fin > timezone.now()):
+        activar(promocion)
+    return promocion
@@ -0,0 +1,259 @@
+"""
+Motor de reportes de ventas agregados en SQL.
+
+Cada reporte es una sola consulta agrupada (TruncDate/TruncWeek/TruncMonth más
+Count/Sum condicionales), así que el número de consultas no depende del largo
+del rango. Los periodos sin pedidos se completan en Python con ceros.
+
+Sin agrupación se agrega sobre Pedido. Agrupando por sucursal, categoría o
+marca se agrega sobre ItemPedido (un pedido puede tener productos de varias),
+y los ingresos son la suma de las líneas de ese grupo.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count, DateField, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ItemPedido, Pedido
+
+GRANULARIDADES = {
+    "dia": TruncDate,
+    "semana": TruncWeek,
+    "mes": TruncMonth,
+}
+
+# campo de agrupación -> (id, nombre) relativo a ItemPedido
+AGRUPACIONES = {
+    "sucursal": ("producto__sucursal_id", "producto__sucursal__nombre"),
+    "categoria": ("producto__categoria_id", "producto__categoria__nombre"),
+    "marca": ("producto__marca_id", "producto__marca__nombre"),
+}
+
+ESTADOS = [estado for estado, _ in Pedido.ESTADO_CHOICES]
+
+def inicio_periodo(fecha, granularidad):
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+def periodos(desde, hasta, granularidad):
+    """
+    Inicio de cada periodo entre `desde` y `hasta` (ambos incluidos), en orden.
+    """
+    actual = inicio_periodo(desde, granularidad)
+    while actual <= hasta:
+        yield actual
+        if granularidad == "dia":
+            actual += timedelta(days=1)
+        elif granularidad == "semana":
+            actual += timedelta(weeks=1)
+        else:
+            actual = date(actual.year + actual.month // 12, actual.month % 12 + 1, 1)
+
+def rango_datetime(desde, hasta):
+    """
+    Límites [inicio, fin) en la zona horaria actual para filtrar fecha_creacion
+    por rango (usa el índice, a diferencia de __date).
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+def _fila_vacia():
+    fila = {"total_ordenes": 0, "total_ingresos": 0, "ingresos_entregados": 0, "unidades": 0}
+    fila.update({f"ordenes_{estado.lower()}": 0 for estado in ESTADOS})
+    return fila
+
+def resumen_ventas(desde, hasta, granularidad="dia", agrupar_por=None, rellenar=True):
+    """
+    Devuelve una fila por periodo (y por grupo, si se agrupa) con:
+    total_ordenes, ordenes_<estado> para cada estado, total_ingresos (excluye
+    cancelados), ingresos_entregados y unidades vendidas (excluye cancelados).
+    Con `rellenar`, los periodos sin datos aparecen con ceros (solo sin agrupación).
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida; usa una de: {', '.join(GRANULARIDADES)}.")
+    if agrupar_por is not None and agrupar_por not in AGRUPACIONES:
+        raise ValueError(f"Agrupación inválida; usa una de: {', '.join(AGRUPACIONES)}.")
+    truncar = GRANULARIDADES[granularidad]
+    inicio, fin = rango_datetime(desde, hasta)
+    dinero = DecimalField(max_digits=14, decimal_places=0)
+
+    if agrupar_por is None:
+        prefijo = ""
+        qs = Pedido.objects.filter(fecha_creacion__gte=inicio, fecha_creacion__lt=fin)
+        ordenes = lambda filtro=None: Count("id", filter=filtro)
+        monto = F("total")
+        # Subconsulta correlacionada: un join con items duplicaría las filas de Pedido
+        unidades_pedido = Subquery(
+            ItemPedido.objects.filter(pedido=OuterRef("pk")).values("pedido")
+            .annotate(n=Sum("cantidad")).values("n"),
+            output_field=IntegerField(),
+        )
+        unidades = Sum(unidades_pedido, filter=~Q(estado="CANCELADO"))
+        campos_grupo = []
+    else:
+        prefijo = "pedido__"
+        qs = ItemPedido.objects.filter(pedido__fecha_creacion__gte=inicio, pedido__fecha_creacion__lt=fin)
+        ordenes = lambda filtro=None: Count("pedido_id", distinct=True, filter=filtro)
+        monto = F("cantidad") * F("precio_unitario")
+        unidades = Sum("cantidad", filter=~Q(pedido__estado="CANCELADO"))
+        campos_grupo = list(AGRUPACIONES[agrupar_por])
+
+    estado = f"{prefijo}estado"
+    agregados = {
+        "total_ordenes": ordenes(),
+        "total_ingresos": Sum(monto, filter=~Q(**{estado: "CANCELADO"}), output_field=dinero),
+        "ingresos_entregados": Sum(monto, filter=Q(**{estado: "ENTREGADO"}), output_field=dinero),
+        "unidades": unidades,
+    }
+    for e in ESTADOS:
+        agregados[f"ordenes_{e.lower()}"] = ordenes(Q(**{estado: e}))
+
+    filas = (
+        qs.annotate(periodo=truncar(f"{prefijo}fecha_creacion", output_field=DateField()))
+        .values("periodo", *campos_grupo)
+        .annotate(**agregados)
+        .order_by("periodo", *campos_grupo)
+    )
+
+    return _completar(filas, desde, hasta, granularidad, agrupar_por, campos_grupo, rellenar)
+
+def _completar(filas, desde, hasta, granularidad, agrupar_por, campos_grupo, rellenar):
+    resultado = []
+    for fila in filas:
+        fila = dict(fila)
+        for clave in ("total_ingresos", "ingresos_entregados", "unidades"):
+            fila[clave] = int(fila[clave] or 0)
+        if agrupar_por is not None:
+            fila["grupo_id"] = fila.pop(campos_grupo[0])
+            fila["grupo"] = fila.pop(campos_grupo[1])
+        resultado.append(fila)
+
+    if rellenar and agrupar_por is None:
+        por_periodo = {fila["periodo"]: fila for fila in resultado}
+        resultado = [
+            por_periodo.get(inicio, {"periodo": inicio, **_fila_vacia()})
+            for inicio in periodos(desde, hasta, granularidad)
+        ]
+    return resultado
+
+def resumen_ventas_diarias(desde, hasta, granularidad="dia", agrupar_por=None, rellenar=True):
+    """
+    Igual que resumen_ventas, pero leyendo la tabla precalculada VentaDiaria
+    (una fila por día y sucursal), así que el costo depende del largo del rango
+    y no de la cantidad de pedidos. Solo admite agrupar por sucursal.
+    """
+    from .models import VentaDiaria
+
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida; usa una de: {', '.join(GRANULARIDADES)}.")
+    if agrupar_por not in (None, "sucursal"):
+        raise ValueError("La tabla de ventas diarias solo se agrupa por sucursal.")
+    campos_grupo = ["sucursal_id", "sucursal__nombre"] if agrupar_por else []
+    qs = VentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta, sucursal__isnull=agrupar_por is None)
+    if granularidad == "dia":
+        qs = qs.annotate(periodo=F("fecha"))
+    else:
+        qs = qs.annotate(periodo=GRANULARIDADES[granularidad]("fecha", output_field=DateField()))
+    metricas = ["total_ordenes", "total_ingresos", "ingresos_entregados", "unidades"]
+    metricas += [f"ordenes_{e.lower()}" for e in ESTADOS]
+    filas = (
+        qs.values("periodo", *campos_grupo)
+        .annotate(**{campo: Sum(campo) for campo in metricas})
+        .order_by("periodo", *campos_grupo)
+    )
+    return _completar(filas, desde, hasta, granularidad, agrupar_por, campos_grupo, rellenar)
+
+def resumen(desde, hasta, granularidad="dia", agrupar_por=None, rellenar=True):
+    """
+    Resumen de ventas para los endpoints: usa VentaDiaria cuando la agrupación
+    lo permite (total o por sucursal) y la consulta sobre pedidos en otro caso.
+    """
+    if agrupar_por in (None, "sucursal"):
+        return resumen_ventas_diarias(desde, hasta, granularidad, agrupar_por, rellenar)
+    return resumen_ventas(desde, hasta, granularidad, agrupar_por, rellenar)
+
+# Dimensiones por las que se puede dividir una serie de tiempo
+DIVISIONES = ("estado", "categoria", "sucursal")
+
+def contar_periodos(desde, hasta, granularidad):
+    if granularidad == "dia":
+        return (hasta - desde).days + 1
+    if granularidad == "semana":
+        return (inicio_periodo(hasta, "semana") - inicio_periodo(desde, "semana")).days // 7 + 1
+    return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+
+def elegir_granularidad(desde, hasta, granularidad="dia", max_puntos=None):
+    """
+    Devuelve la granularidad pedida o, si con ella el rango tiene más de
+    `max_puntos` periodos, la siguiente más gruesa (dia -> semana -> mes).
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida; usa una de: {', '.join(GRANULARIDADES)}.")
+    opciones = list(GRANULARIDADES)
+    for candidata in opciones[opciones.index(granularidad):]:
+        if not max_puntos or contar_periodos(desde, hasta, candidata) <= max_puntos:
+            return candidata
+    return opciones[-1]
+
+def _filas_por_estado(desde, hasta, granularidad):
+    inicio, fin = rango_datetime(desde, hasta)
+    filas = (
+        Pedido.objects.filter(fecha_creacion__gte=inicio, fecha_creacion__lt=fin)
+        .annotate(periodo=GRANULARIDADES[granularidad]("fecha_creacion", output_field=DateField()))
+        .values("periodo", "estado")
+        .annotate(ordenes=Count("id"), ingresos=Sum("total"))
+        .order_by("periodo", "estado")
+    )
+    nombres = dict(Pedido.ESTADO_CHOICES)
+    return [
+        (fila["periodo"], fila["estado"], str(nombres[fila["estado"]]), fila["ordenes"], int(fila["ingresos"] or 0))
+        for fila in filas
+    ]
+
+def series_ventas(desde, hasta, granularidad="dia", dividir_por=None):
+    """
+    Serie de tiempo de ingresos y órdenes en formato columnar:
+    {"periodos": [...], "series": [{"clave", "nombre", "ingresos": [...], "ordenes": [...]}]}
+    con un valor por periodo (los periodos sin ventas van en cero).
+
+    Sin división hay una sola serie "total"; dividiendo por estado los ingresos
+    son el total de los pedidos en ese estado (incluidos los cancelados), y por
+    categoría o sucursal son los ingresos sin cancelados de las líneas del grupo.
+    """
+    if dividir_por is not None and dividir_por not in DIVISIONES:
+        raise ValueError(f"División inválida; usa una de: {', '.join(DIVISIONES)}.")
+    if dividir_por == "estado":
+        filas = _filas_por_estado(desde, hasta, granularidad)
+    else:
+        filas = [
+            (
+                fila["periodo"],
+                fila.get("grupo_id", "total"),
+                fila.get("grupo") or "Total",
+                fila["total_ordenes"],
+                fila["total_ingresos"],
+            )
+            for fila in resumen(desde, hasta, granularidad, dividir_por, rellenar=False)
+        ]
+
+    etiquetas = list(periodos(desde, hasta, granularidad))
+    posicion = {periodo: i for i, periodo in enumerate(etiquetas)}
+    series = {}
+    if dividir_por is None:
+        series["total"] = {"clave": "total", "nombre": "Total", "ingresos": [0] * len(etiquetas), "ordenes": [0] * len(etiquetas)}
+    for periodo, clave, nombre, ordenes, ingresos in filas:
+        serie = series.setdefault(
+            clave, {"clave": clave, "nombre": nombre, "ingresos": [0] * len(etiquetas), "ordenes": [0] * len(etiquetas)}
+        )
+        i = posicion[periodo]
+        serie["ingresos"][i] += ingresos
+        serie["ordenes"][i] += ordenes
+    return {
+        "periodos": [periodo.isoformat() for periodo in etiquetas],
+        "series": list(series.values()),
+    }
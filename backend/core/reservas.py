@@ -0,0 +1,192 @@
+"""
+Reservas de stock para el checkout.
+
+El stock se descuenta en la base de datos con un UPDATE condicional
+(`WHERE stock >= n`), nunca con lectura-modificación-escritura en Python, así que
+checkouts concurrentes no pueden sobrevender. Un carrito completo se descuenta
+(o se repone) con un solo UPDATE por bloque de productos, no uno por producto. Mientras el pago está pendiente el
+stock queda retenido en filas ReservaStock con vencimiento; al expirar o cancelarse
+se repone, y al confirmarse el pago la reserva pasa a CONFIRMADA.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .cache_catalogo import invalidar_catalogo
+from .models import Producto, ReservaStock
+
+class StockInsuficiente(Exception):
+    """
+    No hay stock para reservar la cantidad pedida de un producto.
+    """
+    def __init__(self, producto_id, cantidad):
+        self.producto_id = producto_id
+        self.cantidad = cantidad
+        super().__init__(f"Stock insuficiente para el producto #{producto_id} (se pidieron {cantidad}).")
+
+def minutos_reserva():
+    return getattr(settings, "RESERVA_STOCK_MINUTOS", 30)
+
+def descontar_stock(producto_id, cantidad):
+    """
+    Descuenta `cantidad` del stock solo si alcanza. Devuelve True si se descontó.
+    `disponible` se recalcula en el mismo UPDATE (la expresión ve el stock anterior).
+    """
+    actualizados = Producto.objects.filter(pk=producto_id, stock__gte=cantidad).update(
+        stock=F("stock") - cantidad,
+        disponible=ExpressionWrapper(Q(stock__gt=cantidad), output_field=BooleanField()),
+    )
+    if actualizados:
+        invalidar_catalogo()
+    return bool(actualizados)
+
+def _bloques(cantidades, parametros_por_producto):
+    """
+    Ids de `cantidades` en orden (fijo, para que dos transacciones concurrentes no
+    se bloqueen mutuamente), en bloques que no superan el límite de parámetros por sentencia.
+    """
+    ids = sorted(cantidades)
+    limite = connection.features.max_query_params
+    tamano = max(1, limite // parametros_por_producto) if limite else len(ids) or 1
+    for i in range(0, len(ids), tamano):
+        yield ids[i:i + tamano]
+
+def _cantidad_por_producto(cantidades, ids):
+    return Case(*[When(pk=pk, then=Value(cantidades[pk])) for pk in ids], output_field=IntegerField())
+
+def descontar_stocks(cantidades):
+    """
+    Descuenta {producto_id: cantidad} con un UPDATE condicional por bloque. Si
+    algún producto no alcanza no se descuenta nada y se lanza StockInsuficiente.
+    """
+    fallido = None
+    with transaction.atomic():
+        for ids in _bloques(cantidades, 7):
+            cantidad = _cantidad_por_producto(cantidades, ids)
+            actualizados = Producto.objects.filter(pk__in=ids, stock__gte=cantidad).update(
+                stock=F("stock") - cantidad,
+                disponible=ExpressionWrapper(Q(stock__gt=cantidad), output_field=BooleanField()),
+            )
+            if actualizados < len(ids):
+                fallido = ids
+                transaction.set_rollback(True)
+                break
+    if fallido:
+        # Con el bloque ya deshecho, el producto que falta es el que no cumple la condición
+        suficientes = set(
+            Producto.objects.filter(pk__in=fallido, stock__gte=_cantidad_por_producto(cantidades, fallido))
+            .values_list("pk", flat=True)
+        )
+        producto_id = next((pk for pk in fallido if pk not in suficientes), fallido[0])
+        raise StockInsuficiente(producto_id, cantidades[producto_id])
+    if cantidades:
+        invalidar_catalogo()
+
+def reponer_stocks(cantidades):
+    """
+    Repone {producto_id: cantidad} con un UPDATE por bloque.
+    """
+    for ids in _bloques(cantidades, 3):
+        cantidad = _cantidad_por_producto(cantidades, ids)
+        Producto.objects.filter(pk__in=ids).update(stock=F("stock") + cantidad, disponible=True)
+    if cantidades:
+        invalidar_catalogo()
+
+def reservar(carrito, items, minutos=None, estado="ACTIVA"):
+    """
+    Reserva en una sola transacción todos los `items` [(producto_id, cantidad), ...]
+    para el carrito. Si algún producto no alcanza, no se reserva nada y se lanza
+    StockInsuficiente. Devuelve las reservas creadas (en `estado`).
+    """
+    cantidades = defaultdict(int)
+    for producto_id, cantidad in items:
+        cantidades[producto_id] += int(cantidad)
+    expira_en = timezone.now() + timedelta(minutes=minutos or minutos_reserva())
+    with transaction.atomic():
+        descontar_stocks(cantidades)
+        return ReservaStock.objects.bulk_create([
+            ReservaStock(carrito=carrito, producto_id=producto_id, cantidad=cantidad, estado=estado, expira_en=expira_en)
+            for producto_id, cantidad in sorted(cantidades.items())
+        ])
+
+def reservar_carrito(carrito, minutos=None):
+    """
+    (Re)reserva el contenido actual del carrito: libera las reservas activas
+    previas y reserva de nuevo todos sus items.
+    """
+    with transaction.atomic():
+        liberar(carrito.reservas.all())
+        items = carrito.items.values_list("producto_id", "cantidad")
+        return reservar(carrito, items, minutos=minutos)
+
+def reservar_checkout(carrito, vigentes_hasta):
+    """
+    Reservas que respaldan una sesión de pago del carrito. Si sus reservas activas
+    cubren exactamente los items actuales y vencen después de `vigentes_hasta`, se
+    reutilizan (un doble envío obtiene el mismo vencimiento); si no, se re-reserva
+    el carrito. Devuelve las reservas, ordenadas por producto.
+    """
+    with transaction.atomic():
+        reservas = list(carrito.reservas.select_for_update().filter(estado="ACTIVA").order_by("producto_id"))
+        cantidades = defaultdict(int)
+        for producto_id, cantidad in carrito.items.values_list("producto_id", "cantidad"):
+            cantidades[producto_id] += cantidad
+        if (
+            reservas and {r.producto_id: r.cantidad for r in reservas} == cantidades
+            and len({r.expira_en for r in reservas}) == 1 and reservas[0].expira_en > vigentes_hasta
+        ):
+            return reservas
+        liberar(carrito.reservas.all())
+        return reservar(carrito, cantidades.items())
+
+def asociar_sesion(reservas, sesion_pago):
+    """
+    Marca las reservas con la sesión de Stripe Checkout que respaldan.
+    """
+    return ReservaStock.objects.filter(pk__in=[r.pk for r in reservas]).update(sesion_pago=sesion_pago)
+
+def liberar(reservas, estado="LIBERADA"):
+    """
+    Repone el stock de las reservas ACTIVAS del queryset y las marca con `estado`.
+    Devuelve cuántas reservas se liberaron.
+    """
+    with transaction.atomic():
+        activas = list(
+            reservas.select_for_update().filter(estado="ACTIVA").values_list("id", "producto_id", "cantidad")
+        )
+        if not activas:
+            return 0
+        ReservaStock.objects.filter(id__in=[r[0] for r in activas], estado="ACTIVA").update(estado=estado)
+        por_producto = defaultdict(int)
+        for _id, producto_id, cantidad in activas:
+            por_producto[producto_id] += cantidad
+        reponer_stocks(por_producto)
+        return len(activas)
+
+def liberar_expiradas(ahora=None):
+    """
+    Libera (estado EXPIRADA) las reservas activas ya vencidas.
+    """
+    ahora = ahora or timezone.now()
+    return liberar(ReservaStock.objects.filter(expira_en__lt=ahora), estado="EXPIRADA")
+
+def confirmar(carrito):
+    """
+    Confirma las reservas activas del carrito (el pago se completó): el stock ya fue descontado.
+    """
+    return carrito.reservas.filter(estado="ACTIVA").update(estado="CONFIRMADA")
+
+def cancelar(carrito, sesion_pago=None):
+    """
+    Cancela el checkout del carrito y repone su stock reservado. Con
+    `sesion_pago` solo libera las reservas de esa sesión de Stripe: las de una
+    sesión más nueva del mismo carrito siguen vigentes.
+    """
+    reservas = carrito.reservas.all()
+    if sesion_pago is not None:
+        reservas = reservas.filter(sesion_pago=sesion_pago)
+    return liberar(reservas)
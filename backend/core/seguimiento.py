@@ -0,0 +1,60 @@
+"""
+Consultas sobre el historial de estados de los pedidos (PedidoEstadoEvento).
+
+El tiempo que un pedido pasa en un estado va desde el evento que lo deja en
+ese estado hasta el evento siguiente del mismo pedido, que se obtiene con una
+subconsulta correlacionada sobre el índice (pedido, fecha). Los pedidos que
+siguen en el estado no cuentan en el promedio.
+"""
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery
+
+from .models import PedidoEstadoEvento
+from .reportes import rango_datetime
+
+def historial(pedido_id):
+    """
+    Eventos de estado del pedido en orden cronológico.
+    """
+    return (
+        PedidoEstadoEvento.objects.filter(pedido_id=pedido_id)
+        .select_related("usuario").order_by("fecha", "id")
+    )
+
+def eventos_con_salida(eventos=None):
+    """
+    Anota cada evento con `salida` (fecha del evento siguiente del mismo pedido)
+    y `duracion` (tiempo en el estado; nulo si el pedido sigue en él).
+    """
+    eventos = eventos if eventos is not None else PedidoEstadoEvento.objects.all()
+    siguiente = (
+        PedidoEstadoEvento.objects.filter(pedido_id=OuterRef("pedido_id"))
+        .filter(Q(fecha__gt=OuterRef("fecha")) | Q(fecha=OuterRef("fecha"), id__gt=OuterRef("id")))
+        .order_by("fecha", "id").values("fecha")[:1]
+    )
+    return eventos.annotate(salida=Subquery(siguiente)).annotate(
+        duracion=ExpressionWrapper(F("salida") - F("fecha"), output_field=DurationField())
+    )
+
+def tiempos_por_estado(desde, hasta, estados=None):
+    """
+    Tiempo promedio en cada estado para las entradas a ese estado ocurridas en
+    el rango [desde, hasta] (fechas locales), en una consulta:
+    [{"estado", "entradas", "completadas", "promedio"}] con `promedio` como timedelta.
+    """
+    inicio, fin = rango_datetime(desde, hasta)
+    eventos = PedidoEstadoEvento.objects.filter(fecha__gte=inicio, fecha__lt=fin)
+    if estados:
+        eventos = eventos.filter(estado__in=estados)
+    filas = (
+        eventos_con_salida(eventos).order_by().values("estado")
+        .annotate(entradas=Count("id"), completadas=Count("salida"), promedio=Avg("duracion"))
+        .order_by("estado")
+    )
+    return list(filas)
+
+def tiempo_promedio_en_estado(estado, desde, hasta):
+    """
+    Tiempo promedio (timedelta) que los pedidos pasan en `estado`, o None si no hay datos.
+    """
+    filas = tiempos_por_estado(desde, hasta, estados=[estado])
+    return filas[0]["promedio"] if filas else None
@@ -4,20 +4,22 @@ from .models import (
     UserProfile,
     Pedido,
     ItemPedido,
+    PedidoEstadoEvento,
     Categoria,
     ItemCarrito,
 )
 from django.contrib.auth.models import User
-from decimal import Decimal, ROUND_DOWN
 
 # --- ProductoSerializer (para listado de productos) ---
+# Marca, categoría, imagen y precio con descuento se leen desde la proyección
+# ProductoCatalogo: usar querysets con select_related("catalogo").
 
 class ProductoSerializer(serializers.ModelSerializer):
-    imagen_principal = serializers.ImageField(use_url=True)
-    marca = serializers.StringRelatedField()
-    categoria = serializers.StringRelatedField()
+    imagen_principal = serializers.SerializerMethodField()
+    marca = serializers.CharField(source="catalogo.marca_nombre", read_only=True)
+    categoria = serializers.CharField(source="catalogo.categoria_nombre", read_only=True)
     descuento = serializers.FloatField(required=False)
-    precio_con_descuento = serializers.SerializerMethodField()
+    precio_con_descuento = serializers.IntegerField(source="catalogo.precio_con_descuento", read_only=True)
 
     class Meta:
         model = Producto
@@ -26,34 +28,30 @@ class ProductoSerializer(serializers.ModelSerializer):
             "disponible", "stock", "descuento", "precio_con_descuento"
         ]
 
-    def get_precio_con_descuento(self, obj):
-        valor = Decimal(obj.valor)
-        descuento = Decimal(str(obj.descuento or 0))
-        if descuento > 0:
-            precio_desc = valor * (Decimal('1') - descuento / Decimal('100'))
-            return int(precio_desc.to_integral_value(rounding=ROUND_DOWN))
-        return int(valor.to_integral_value(rounding=ROUND_DOWN))
+    def get_imagen_principal(self, obj):
+        # Sin fila de catálogo (loaddata, bulk_create sin sincronizar) se usa la imagen del producto
+        catalogo = getattr(obj, "catalogo", None)
+        if catalogo is not None:
+            url = catalogo.imagen_url
+        else:
+            url = obj.imagen_principal.url if obj.imagen_principal else ""
+        if not url:
+            return None
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
 # --- ProductoEnItemPedidoSerializer (producto embebido en item de pedido) ---
 
 class ProductoEnItemPedidoSerializer(serializers.ModelSerializer):
-    marca = serializers.StringRelatedField()
-    categoria = serializers.StringRelatedField()
+    marca = serializers.CharField(source="catalogo.marca_nombre", read_only=True)
+    categoria = serializers.CharField(source="catalogo.categoria_nombre", read_only=True)
     descuento = serializers.FloatField(required=False)
-    precio_con_descuento = serializers.SerializerMethodField()
+    precio_con_descuento = serializers.IntegerField(source="catalogo.precio_con_descuento", read_only=True)
 
     class Meta:
         model = Producto
         fields = ["id", "nombre", "marca", "categoria", "valor", "descuento", "precio_con_descuento"]
 
-    def get_precio_con_descuento(self, obj):
-        valor = Decimal(obj.valor)
-        descuento = Decimal(str(obj.descuento or 0))
-        if descuento > 0:
-            precio_desc = valor * (Decimal('1') - descuento / Decimal('100'))
-            return int(precio_desc.to_integral_value(rounding=ROUND_DOWN))
-        return int(valor.to_integral_value(rounding=ROUND_DOWN))
-
 # --- ItemPedidoSerializer (item de pedido, incluye producto embebido) ---
 
 class ItemPedidoSerializer(serializers.ModelSerializer):
@@ -82,14 +80,40 @@ class PedidoSimpleSerializer(serializers.ModelSerializer):
         return obj.cliente.user.username if obj.cliente and obj.cliente.user else None
 
     def get_bodeguero_asignado(self, obj):
-        if obj.bodeguero_asignado and hasattr(obj.bodeguero_asignado, "user"):
-            return obj.bodeguero_asignado.user.username
-        return None
+        return obj.bodeguero_asignado.username if obj.bodeguero_asignado else None
+
+# --- PedidoListaSerializer (fila liviana para listados, sin items) ---
+
+class PedidoListaSerializer(serializers.ModelSerializer):
+    """
+    Espera el queryset con select_related("cliente__user", "bodeguero_asignado")
+    y anotado con items_count (ver AdminOrderListAPIView).
+    """
+    cliente = serializers.CharField(source="cliente.user.username", read_only=True)
+    bodeguero_asignado = serializers.CharField(source="bodeguero_asignado.username", read_only=True, default=None)
+    items_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Pedido
+        fields = [
+            "id", "estado", "fecha_creacion", "fecha_actualizacion", "total", "cliente",
+            "items_count", "metodo_retiro", "bodeguero_asignado", "bodeguero_asignado_id"
+        ]
+
+# --- PedidoEstadoEventoSerializer (historial de estados de un pedido) ---
+
+class PedidoEstadoEventoSerializer(serializers.ModelSerializer):
+    usuario = serializers.StringRelatedField()
+
+    class Meta:
+        model = PedidoEstadoEvento
+        fields = ["estado_anterior", "estado", "fecha", "usuario"]
 
 # --- PedidoDetailSerializer (detalle completo de pedido) ---
 
 class PedidoDetailSerializer(serializers.ModelSerializer):
     items = ItemPedidoSerializer(many=True, read_only=True)
+    historial = PedidoEstadoEventoSerializer(source="eventos_estado", many=True, read_only=True)
     cliente = serializers.SerializerMethodField()
     direccion_envio = serializers.StringRelatedField()
     bodeguero_asignado = serializers.SerializerMethodField()
@@ -98,16 +122,14 @@ class PedidoDetailSerializer(serializers.ModelSerializer):
         model = Pedido
         fields = [
             "id", "estado", "fecha_creacion", "fecha_actualizacion", "total",
-            "cliente", "items", "metodo_retiro", "direccion_envio", "bodeguero_asignado"
+            "cliente", "items", "metodo_retiro", "direccion_envio", "bodeguero_asignado", "historial"
         ]
 
     def get_cliente(self, obj):
         return obj.cliente.user.username if obj.cliente and obj.cliente.user else None
 
     def get_bodeguero_asignado(self, obj):
-        if obj.bodeguero_asignado and hasattr(obj.bodeguero_asignado, "user"):
-            return obj.bodeguero_asignado.user.username
-        return None
+        return obj.bodeguero_asignado.username if obj.bodeguero_asignado else None
 
 # --- ItemCarritoSerializer (para items en el carrito de compras) ---
 
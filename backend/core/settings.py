@@ -89,10 +89,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # IMMEDIATE toma el lock de escritura al abrir la transacción: los checkouts
+        # concurrentes esperan su turno (hasta `timeout` s) en vez de fallar con "database is locked".
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Base de pruebas en archivo, no en memoria: los tests concurrentes usan una conexión por hilo
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Caché
+# El alias "catalogo" guarda las respuestas de productos y categorías (ver core/cache_catalogo.py).
+# Con varios workers conviene un backend compartido: define CATALOGO_CACHE_URL (p. ej. redis://localhost:6379/1).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CATALOGO_CACHE_URL'],
+    } if os.environ.get('CATALOGO_CACHE_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogo',
+    },
+}
+CATALOGO_CACHE_ALIAS = 'catalogo'
+CATALOGO_CACHE_TTL = 60 * 15
+# Versiones de los roles guardados en sesión (core/permissions.py): mismo backend compartido.
+# Si es LocMem (sin CATALOGO_CACHE_URL) los roles se leen de la base en cada petición.
+ROLES_CACHE_ALIAS = 'catalogo'
+
+# Segundos que se reutiliza el resumen del dashboard de administrador
+ADMIN_OVERVIEW_CACHE_TTL = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -159,6 +195,35 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 # Stripe keys
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY", "sk_test_xxx")
 STRIPE_PUBLIC_KEY = os.environ.get("STRIPE_PUBLIC_KEY", "pk_test_xxx")
+# Secreto de firma del endpoint /api/pago/stripe/webhook/ (`stripe listen` lo muestra en desarrollo)
+STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "whsec_test_xxx")
+
+# Pasarela de pagos (core/pasarela.py): "stripe" o "falsa" (en proceso, sin red)
+PASARELA_PAGOS = os.environ.get("PASARELA_PAGOS", "stripe")
+# Segundos para conectar y para leer la respuesta de cada intento
+PASARELA_TIMEOUT = (3, 10)
+PASARELA_REINTENTOS = 2
+# Tope de segundos de una operación, reintentos incluidos
+PASARELA_PRESUPUESTO_SEGUNDOS = 20
+# Fallos seguidos que abren el interruptor y segundos que se deja de llamar a Stripe
+PASARELA_INTERRUPTOR_FALLOS = 5
+PASARELA_INTERRUPTOR_SEGUNDOS = 30
+
+# Minutos que se retiene el stock de un carrito mientras su pago está pendiente
+# (mínimo 35: la sesión de Stripe debe durar al menos 30 y vence 5 antes que la reserva)
+RESERVA_STOCK_MINUTOS = 35
+
+# Emails: el worker `python manage.py enviar_notificaciones` los envía desde la tabla Notificacion.
+# En desarrollo se muestran en consola; con EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+# quedan en EMAIL_FILE_PATH.
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_FILE_PATH = BASE_DIR / "emails"
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "Ferremas <no-responder@ferremas.cl>")
+NOTIFICACIONES_MAX_INTENTOS = 5
+# Espera antes del primer reintento; se duplica en cada intento fallido
+NOTIFICACIONES_REINTENTO_SEGUNDOS = 30
+# Máximo de emails por segundo del worker (0 = sin límite)
+NOTIFICACIONES_POR_SEGUNDO = 10
 
 # Frontend URL (para CORS)
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:5173")
\ No newline at end of file
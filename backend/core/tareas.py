@@ -0,0 +1,229 @@
+"""
+Cola de tareas en segundo plano respaldada por la base de datos (modelo Tarea),
+sin broker externo.
+
+- `encolar(tipo, usuario, **parametros)` crea la tarea y vuelve de inmediato;
+  la vista responde 202 y el cliente consulta /api/admin/tareas/<id>/.
+- `python manage.py runworker` ejecuta las tareas con un pool de hilos (y,
+  opcionalmente, varios procesos). Cada hilo reclama una tarea con un UPDATE
+  condicional, así dos workers nunca toman la misma.
+- Una tarea en curso queda reservada por RESERVA_SEGUNDOS; el worker renueva la
+  reserva mientras la ejecuta. Si el worker muere, al vencer la reserva otro la
+  retoma (hasta MAX_INTENTOS veces).
+
+Cada tipo de tarea es una función registrada con @tarea(nombre) que recibe un
+`progreso(hechos, total=None, mensaje=None)` y los parámetros, y devuelve un
+resultado serializable a JSON.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+TAREAS = {}
+# Tareas que un administrador puede lanzar directamente desde la API
+TAREAS_ADMIN = ("reconstruir_catalogo", "reconstruir_indice_busqueda", "reconstruir_ventas_diarias")
+RESERVA_SEGUNDOS = 120
+MAX_INTENTOS = 3
+
+def tarea(nombre):
+    def registrar(funcion):
+        TAREAS[nombre] = funcion
+        return funcion
+    return registrar
+
+def encolar(tipo, usuario=None, **parametros):
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}.")
+    creada_por = usuario if usuario is not None and usuario.is_authenticated else None
+    return Tarea.objects.create(tipo=tipo, parametros=parametros, creada_por=creada_por)
+
+class Progreso:
+    """
+    Registra el avance de una tarea en curso, con a lo sumo una escritura por `intervalo` segundos.
+    """
+    def __init__(self, tarea_id, intervalo=1.0):
+        self.tarea_id = tarea_id
+        self.intervalo = intervalo
+        self.ultimo = 0.0
+
+    def __call__(self, hechos, total=None, mensaje=None):
+        ahora = time.monotonic()
+        if ahora - self.ultimo < self.intervalo:
+            return
+        self.ultimo = ahora
+        campos = {"reservada_hasta": timezone.now() + timedelta(seconds=RESERVA_SEGUNDOS)}
+        if total:
+            campos["progreso"] = min(99, int(hechos * 100 / total))
+        if mensaje is not None:
+            campos["mensaje"] = mensaje[:200]
+        Tarea.objects.filter(pk=self.tarea_id, estado="EN_CURSO").update(**campos)
+
+def _disponibles(ahora):
+    return Q(estado="PENDIENTE") | Q(estado="EN_CURSO", reservada_hasta__lt=ahora)
+
+def reclamar():
+    """
+    Toma la tarea disponible más antigua (pendiente o con la reserva vencida) o devuelve None.
+    """
+    while True:
+        ahora = timezone.now()
+        candidata = (
+            Tarea.objects.filter(_disponibles(ahora)).order_by("creada_en", "id").values_list("id", flat=True).first()
+        )
+        if candidata is None:
+            return None
+        tomada = Tarea.objects.filter(_disponibles(ahora), pk=candidata).update(
+            estado="EN_CURSO", reservada_hasta=ahora + timedelta(seconds=RESERVA_SEGUNDOS),
+            iniciada_en=ahora, intentos=F("intentos") + 1, progreso=0,
+        )
+        if tomada:
+            return Tarea.objects.get(pk=candidata)
+        # Otro worker la tomó entre la lectura y el UPDATE: probar con la siguiente
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea ya reclamada y registra su resultado o error.
+    """
+    try:
+        funcion = TAREAS.get(tarea.tipo)
+        if funcion is None:
+            raise ValueError(f"Tipo de tarea desconocido: {tarea.tipo}.")
+        if tarea.intentos > MAX_INTENTOS:
+            raise RuntimeError("La tarea se interrumpió demasiadas veces.")
+        resultado = funcion(Progreso(tarea.pk), **tarea.parametros)
+        campos = {"estado": "COMPLETADA", "progreso": 100, "resultado": resultado, "error": ""}
+    except Exception as e:
+        logger.exception("Error en la tarea #%s (%s)", tarea.pk, tarea.tipo)
+        campos = {"estado": "ERROR", "error": str(e) or e.__class__.__name__}
+    Tarea.objects.filter(pk=tarea.pk).update(**campos, reservada_hasta=None, terminada_en=timezone.now())
+
+class Worker:
+    """
+    Ejecuta tareas con `hilos` hilos. Sin `continuo`, termina cuando la cola queda vacía.
+    """
+    def __init__(self, hilos=2, intervalo=2.0):
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+        self.en_curso = set()
+        self.lock = threading.Lock()
+        self.procesadas = 0
+
+    def _renovar_reservas(self):
+        try:
+            while not self.detener.wait(RESERVA_SEGUNDOS / 3):
+                with self.lock:
+                    ids = list(self.en_curso)
+                if ids:
+                    Tarea.objects.filter(pk__in=ids, estado="EN_CURSO").update(
+                        reservada_hasta=timezone.now() + timedelta(seconds=RESERVA_SEGUNDOS)
+                    )
+        finally:
+            connection.close()
+
+    def _hilo(self, continuo):
+        try:
+            while not self.detener.is_set():
+                close_old_connections()
+                tarea = reclamar()
+                if tarea is None:
+                    if not continuo:
+                        return
+                    self.detener.wait(self.intervalo)
+                    continue
+                with self.lock:
+                    self.en_curso.add(tarea.pk)
+                try:
+                    ejecutar(tarea)
+                finally:
+                    with self.lock:
+                        self.en_curso.discard(tarea.pk)
+                        self.procesadas += 1
+        finally:
+            connection.close()
+
+    def ejecutar(self, continuo=False):
+        renovador = threading.Thread(target=self._renovar_reservas, daemon=True)
+        renovador.start()
+        hilos = [threading.Thread(target=self._hilo, args=(continuo,), daemon=True) for _ in range(self.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            for hilo in hilos:
+                while hilo.is_alive():
+                    hilo.join(timeout=1)
+        except KeyboardInterrupt:
+            # Las tareas en curso terminan; las que no alcancen se retoman al vencer su reserva
+            self.detener.set()
+            for hilo in hilos:
+                hilo.join()
+        finally:
+            self.detener.set()
+            renovador.join()
+        return self.procesadas
+
+# --------------------------
+# TIPOS DE TAREA
+# --------------------------
+
+@tarea("generar_exportacion")
+def tarea_generar_exportacion(progreso, exportacion_id):
+    from .exportacion import generar_exportacion
+    exportacion = generar_exportacion(exportacion_id, progreso=progreso)
+    if exportacion is None:
+        return {"exportacion_id": exportacion_id, "omitida": True}
+    if exportacion.estado == "ERROR":
+        raise RuntimeError(exportacion.error)
+    return {"exportacion_id": exportacion.id, "filas": exportacion.filas}
+
+@tarea("aplicar_descuento")
+def tarea_aplicar_descuento(progreso, productos, descuento):
+    from .promociones import crear_promocion
+    promocion = crear_promocion({"alcance": "PRODUCTOS", "productos": productos, "descuento": descuento})
+    return {"promocion_id": promocion.id, "productos": promocion.productos_afectados, "descuento": descuento}
+
+@tarea("reconstruir_catalogo")
+def tarea_reconstruir_catalogo(progreso):
+    from .catalogo import sincronizar_productos
+    from .models import Producto
+    return {"productos": sincronizar_productos(Producto.objects.all())}
+
+@tarea("reconstruir_indice_busqueda")
+def tarea_reconstruir_indice_busqueda(progreso):
+    from .busqueda import indice_disponible, reconstruir_indice
+    if not indice_disponible():
+        return {"productos": 0, "mensaje": "El índice FTS5 solo está disponible en SQLite."}
+    return {"productos": reconstruir_indice()}
+
+@tarea("reconstruir_ventas_diarias")
+def tarea_reconstruir_ventas_diarias(progreso):
+    from .ventas_diarias import reconstruir
+    return {"filas": reconstruir()}
+
+@tarea("importar_catalogo")
+def tarea_importar_catalogo(progreso, ruta, formato, actualizar_stock=False):
+    from django.core.files.storage import default_storage
+    from .importacion import ArchivoInvalido, importar_catalogo
+    try:
+        with default_storage.open(ruta, "rb") as archivo:
+            resultado = importar_catalogo(archivo, formato, progreso=progreso, actualizar_stock=actualizar_stock)
+    except ArchivoInvalido:
+        default_storage.delete(ruta)
+        raise
+    # Si el worker muere a medio camino el archivo queda para el reintento
+    default_storage.delete(ruta)
+    return resultado
+
+@tarea("procesar_evento_stripe")
+def tarea_procesar_evento_stripe(progreso, evento_id):
+    from .pagos import procesar_evento
+    return {"evento_id": evento_id, "estado": procesar_evento(evento_id)}
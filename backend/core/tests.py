@@ -0,0 +1,659 @@
+"""
+Pruebas de las garantías de core (sin sobreventa, idempotencia del webhook,
+caché del catálogo, promociones, permisos, ...): verifican comportamiento.
+
+Los tiempos se miden aparte con `python manage.py benchmark` (core/benchmarks.py).
+"""
+import io
+import json
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import ventas_diarias
+from .asignacion import asignar_pendientes
+from .busqueda import filtrar_productos
+from .cache_catalogo import CLAVE_VERSION
+from .carrito import agregar_item, cambiar_cantidad, eliminar_item
+from .catalogo import sincronizar_productos
+from .checkout import convertir_carrito
+from .importacion import importar_catalogo
+from .models import (
+    Cart, Categoria, Cliente, EventoStripe, ItemCarrito, ItemPedido, Marca, Pago, Pedido, Producto, ProductoCatalogo,
+    ReservaStock, Rol, Sucursal, Tarea, UserProfile, VentaDiaria,
+)
+from .pagos import firmar, procesar_evento
+from .pasarela import PasarelaFalsa, usar_pasarela
+from .promociones import crear_promocion, finalizar
+from .reservas import StockInsuficiente, asociar_sesion, reservar, reservar_carrito
+from .views import PaginacionCursorProductos
+
+def _producto(stock=10, valor=1000, nombre="Producto Prueba", **campos):
+    marca, _ = Marca.objects.get_or_create(nombre="Marca Prueba")
+    categoria, _ = Categoria.objects.get_or_create(nombre="Categoría Prueba")
+    return Producto.objects.create(nombre=nombre, marca=marca, categoria=categoria, valor=valor, stock=stock, **campos)
+
+def _escrituras(funcion, *args, **kwargs):
+    # El Client vacía connection.queries al iniciar cada request: se cuentan con un execute_wrapper
+    escrituras = {}
+    def contar(execute, sql, params, many, context):
+        partes = sql.split(None, 3)
+        if partes[0] in ("INSERT", "UPDATE", "DELETE"):
+            tabla = partes[1] if partes[0] == "UPDATE" else partes[2]
+            clave = (partes[0], tabla.strip('"'))
+            escrituras[clave] = escrituras.get(clave, 0) + 1
+        return execute(sql, params, many, context)
+    with connection.execute_wrapper(contar):
+        resultado = funcion(*args, **kwargs)
+    return resultado, escrituras
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("cliente", email="cliente@example.com", password="clave-prueba-1")
+
+    def test_login_solo_escribe_last_login_y_sesion(self):
+        respuesta, escrituras = _escrituras(
+            self.client.post, "/api/auth/login/", {"username": "cliente", "password": "clave-prueba-1"}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        # Django crea la sesión nueva (INSERT) y al responder guarda sus datos (UPDATE); el perfil no se toca
+        self.assertEqual(
+            escrituras,
+            {("UPDATE", "auth_user"): 1, ("INSERT", "django_session"): 1, ("UPDATE", "django_session"): 1},
+        )
+        self.usuario.refresh_from_db()
+        self.assertIsNotNone(self.usuario.last_login)
+
+    def test_guardar_usuario_no_guarda_el_perfil(self):
+        self.usuario.first_name = "Ana"
+        _resultado, escrituras = _escrituras(self.usuario.save)
+        self.assertEqual(escrituras, {("UPDATE", "auth_user"): 1})
+        self.assertTrue(UserProfile.objects.filter(user=self.usuario).exists())
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    """
+    Varios hilos, cada uno con su conexión, reservan el mismo producto. Necesita
+    la base de pruebas en archivo (DATABASES["default"]["TEST"]["NAME"]).
+    """
+    hilos = 8
+    intentos = 10
+    stock = 25
+
+    def test_sin_sobreventa(self):
+        producto = _producto(stock=self.stock)
+        carritos = [
+            Cart.objects.create(user=User.objects.create_user(f"concurrente_{i}")) for i in range(self.hilos)
+        ]
+        exitos, rechazos, errores = [], [], []
+        barrera = threading.Barrier(self.hilos)
+
+        def trabajador(carrito):
+            try:
+                barrera.wait()
+                for _ in range(self.intentos):
+                    try:
+                        reservar(carrito, [(producto.id, 1)])
+                        exitos.append(carrito.id)
+                    except StockInsuficiente:
+                        rechazos.append(carrito.id)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=trabajador, args=(carrito,)) for carrito in carritos]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errores, [])
+        producto.refresh_from_db()
+        reservado = ReservaStock.objects.filter(producto=producto).aggregate(total=Sum("cantidad"))["total"]
+        self.assertEqual(len(exitos), self.stock)
+        self.assertEqual(len(rechazos), self.hilos * self.intentos - self.stock)
+        self.assertEqual(reservado, self.stock)
+        self.assertEqual(producto.stock, 0)
+        self.assertFalse(producto.disponible)
+
+    def test_carrito_sin_stock_no_reserva_nada(self):
+        alcanza, falta = _producto(stock=5), _producto(stock=1)
+        carrito = Cart.objects.create(user=User.objects.create_user("sin_stock"))
+        with self.assertRaises(StockInsuficiente):
+            reservar(carrito, [(alcanza.id, 2), (falta.id, 2)])
+        alcanza.refresh_from_db()
+        self.assertEqual(alcanza.stock, 5)
+        self.assertFalse(ReservaStock.objects.exists())
+
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.producto = _producto(stock=10)
+        self.carrito = Cart.objects.create(user=User.objects.create_user("comprador", email="comprador@example.com"))
+        agregar_item(self.carrito, self.producto, 2)
+        self.carrito.refresh_from_db()
+        asociar_sesion(reservar_carrito(self.carrito), "cs_test_a")
+
+    def _evento(self, tipo="checkout.session.completed", pagado=True, sesion_id="cs_test_a"):
+        sesion = {
+            "id": sesion_id, "object": "checkout.session",
+            "amount_total": int(self.carrito.total_para_stripe()),
+            "payment_status": "paid" if pagado else "unpaid", "metadata": {"cart_id": str(self.carrito.id)},
+            "customer_details": {"email": "comprador@example.com"},
+        }
+        evento_id = f"evt_{tipo.rsplit('.', 1)[-1]}_{sesion_id}"
+        return json.dumps({"id": evento_id, "type": tipo, "data": {"object": sesion}}).encode()
+
+    def _entregar(self, payload, firma=None):
+        return self.client.post(
+            "/api/pago/stripe/webhook/", data=payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=firma or firmar(payload),
+        )
+
+    def test_entregas_repetidas_registran_un_evento(self):
+        payload = self._evento()
+        respuestas = [self._entregar(payload) for _ in range(3)]
+        self.assertEqual([r.status_code for r in respuestas], [200, 200, 200])
+        self.assertEqual([r.json()["duplicado"] for r in respuestas], [False, True, True])
+        self.assertEqual(EventoStripe.objects.count(), 1)
+        self.assertEqual(Tarea.objects.filter(tipo="procesar_evento_stripe").count(), 1)
+
+    def test_firma_invalida(self):
+        payload = self._evento()
+        self.assertEqual(self._entregar(payload, firma=firmar(payload, secreto="whsec_otro")).status_code, 400)
+        self.assertFalse(EventoStripe.objects.exists())
+
+    def test_procesar_dos_veces_crea_un_pedido(self):
+        self._entregar(self._evento())
+        evento = EventoStripe.objects.get()
+        self.assertEqual(procesar_evento(evento.pk), "PROCESADO")
+        self.assertIsNone(procesar_evento(evento.pk))
+        pedido = Pedido.objects.get(carrito=self.carrito)
+        self.assertEqual(Pago.objects.filter(pedido=pedido).count(), 1)
+        self.assertEqual(set(self.carrito.reservas.values_list("estado", flat=True)), {"CONFIRMADA"})
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 8)
+
+    def test_sesion_vencida_libera_reservas(self):
+        self._entregar(self._evento("checkout.session.expired", pagado=False))
+        procesar_evento(EventoStripe.objects.get().pk)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(self.carrito.reservas.filter(estado="ACTIVA").exists())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 10)
+
+    def test_vencimiento_de_sesion_anterior_no_libera_la_vigente(self):
+        # El cliente cambia el carrito y abre otra sesión: se re-reserva para la sesión B
+        agregar_item(self.carrito, self.producto, 1)
+        self.carrito.refresh_from_db()
+        asociar_sesion(reservar_carrito(self.carrito), "cs_test_b")
+        self._entregar(self._evento("checkout.session.expired", pagado=False, sesion_id="cs_test_a"))
+        procesar_evento(EventoStripe.objects.get().pk)
+        self.assertEqual(set(self.carrito.reservas.filter(estado="ACTIVA").values_list("sesion_pago", flat=True)), {"cs_test_b"})
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 7)
+        # La sesión B se paga con el stock que seguía reservado
+        self._entregar(self._evento(sesion_id="cs_test_b"))
+        self.assertEqual(procesar_evento(EventoStripe.objects.get(tipo="checkout.session.completed").pk), "PROCESADO")
+        self.assertEqual(set(self.carrito.reservas.filter(sesion_pago="cs_test_b").values_list("estado", flat=True)), {"CONFIRMADA"})
+        self.assertTrue(Pedido.objects.filter(carrito=self.carrito).exists())
+
+class StripeCheckoutTests(TestCase):
+    def setUp(self):
+        self.producto = _producto(stock=10, valor=10000)
+        self.usuario = User.objects.create_user("pagador", email="pagador@example.com")
+        self.carrito = Cart.objects.create(user=self.usuario)
+        agregar_item(self.carrito, self.producto, 2)
+        # El descuento llega con el carrito ya armado: el pago debe cobrar 7500
+        self.producto.descuento = 25
+        self.producto.save()
+        sincronizar_productos(Producto.objects.filter(pk=self.producto.pk))
+        self.client.force_login(self.usuario)
+        self.pasarela = PasarelaFalsa(latencia=0, reintentos=0)
+        self.anterior = usar_pasarela(self.pasarela)
+
+    def tearDown(self):
+        usar_pasarela(self.anterior)
+
+    def _precios(self):
+        self.carrito.refresh_from_db()
+        return list(self.carrito.items.values_list("precio_unitario", flat=True)), self.carrito.total
+
+    def test_pago_rechazado_no_cambia_los_precios(self):
+        antes = self._precios()
+        self.pasarela.fallos = 1.0
+        self.assertEqual(self.client.post("/api/pago/stripe/").status_code, 503)
+        self.assertEqual(self._precios(), antes)
+        self.assertFalse(self.carrito.reservas.filter(estado="ACTIVA").exists())
+        self.producto.stock = 1
+        self.producto.save()
+        self.assertEqual(self.client.post("/api/pago/stripe/").status_code, 409)
+        self.assertEqual(self._precios(), antes)
+
+    def test_sesion_creada_fija_los_precios_cobrados(self):
+        respuesta = self.client.post("/api/pago/stripe/")
+        self.assertEqual(respuesta.status_code, 200)
+        precios, _total = self._precios()
+        self.assertEqual(precios, [7500])
+        [(sesion, params)] = self.pasarela.sesiones.values()
+        self.assertEqual(sesion["id"], respuesta.json()["sessionId"])
+        self.assertEqual([item["price_data"]["unit_amount"] for item in params["line_items"]], [7500])
+        self.assertEqual(set(self.carrito.reservas.values_list("sesion_pago", flat=True)), {sesion["id"]})
+
+class CarritoTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("carrito")
+        self.carrito = Cart.objects.create(user=self.usuario)
+        self.a, self.b = _producto(valor=1990), _producto(valor=3333)
+
+    def _totales(self):
+        self.carrito.refresh_from_db()
+        guardados = (self.carrito.subtotal, self.carrito.iva, self.carrito.total)
+        self.carrito.calcular_totales()  # desde cero, sumando los items
+        return guardados, (self.carrito.subtotal, self.carrito.iva, self.carrito.total)
+
+    def test_totales_incrementales_iguales_al_recalculo(self):
+        item = agregar_item(self.carrito, self.a, 3)
+        agregar_item(self.carrito, self.b, 1)
+        agregar_item(self.carrito, self.a, 2)
+        cambiar_cantidad(item, 7)
+        eliminar_item(ItemCarrito.objects.get(producto=self.b))
+        guardados, recalculados = self._totales()
+        self.assertEqual(guardados, recalculados)
+        self.assertEqual(guardados[2], 7 * 1990)
+
+    def test_cambio_con_item_desactualizado_no_desvia_los_totales(self):
+        agregar_item(self.carrito, self.a, 2)
+        # Dos peticiones leyeron el item antes de que cualquiera lo cambiara
+        primera, segunda = ItemCarrito.objects.get(), ItemCarrito.objects.get()
+        cambiar_cantidad(primera, 5)
+        cambiar_cantidad(segunda, 3)
+        guardados, recalculados = self._totales()
+        self.assertEqual(guardados, recalculados)
+        self.assertEqual(guardados[2], 3 * 1990)
+
+    def test_items_no_disponibles_no_se_muestran_ni_suman(self):
+        agregar_item(self.carrito, self.a, 1)
+        agregar_item(self.carrito, self.b, 1)
+        Producto.objects.filter(pk=self.b.pk).update(disponible=False)
+        self.client.force_login(self.usuario)
+        datos = self.client.get("/api/cart/").json()
+        self.assertEqual(len(datos["items"]), 1)
+        self.assertEqual(int(datos["total"]), 1990)
+
+class CarritoLoteTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user("lote")
+        self.carrito = Cart.objects.create(user=self.usuario)
+        self.a, self.b, self.c = _producto(valor=1000), _producto(valor=2000), _producto(valor=3000)
+        agregar_item(self.carrito, self.a, 1)
+        agregar_item(self.carrito, self.b, 1)
+        self.client.force_login(self.usuario)
+
+    def _lote(self, operaciones):
+        return self.client.post("/api/cart/batch/", {"operaciones": operaciones}, content_type="application/json")
+
+    def _cantidades(self):
+        return dict(self.carrito.items.values_list("producto_id", "cantidad"))
+
+    def test_aplica_todas_las_operaciones_y_ajusta_los_totales(self):
+        respuesta = self._lote([
+            {"accion": "agregar", "producto_id": self.a.pk, "cantidad": 2},
+            {"accion": "eliminar", "producto_id": self.b.pk},
+            {"accion": "agregar", "producto_id": self.c.pk},
+            {"accion": "fijar", "producto_id": self.c.pk, "cantidad": 4},
+        ])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["resumen"], {"creados": 1, "actualizados": 1, "eliminados": 1})
+        self.assertEqual(self._cantidades(), {self.a.pk: 3, self.c.pk: 4})
+        self.assertEqual(int(respuesta.json()["total"]), 3 * 1000 + 4 * 3000)
+
+    def test_una_operacion_invalida_no_aplica_ninguna(self):
+        Producto.objects.filter(pk=self.c.pk).update(disponible=False)
+        respuesta = self._lote([
+            {"accion": "eliminar", "producto_id": self.a.pk},
+            {"accion": "agregar", "producto_id": self.c.pk},
+            {"accion": "fijar", "producto_id": self.b.pk, "cantidad": 0},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([e["indice"] for e in respuesta.json()["errores"]], [1, 2])
+        self.assertEqual(self._cantidades(), {self.a.pk: 1, self.b.pk: 1})
+        self.carrito.refresh_from_db()
+        self.assertEqual(int(self.carrito.total), 3000)
+
+class CatalogoPaginacionTests(TestCase):
+    def setUp(self):
+        caches["catalogo"].clear()
+        # Muchos empates en el primer campo del orden: mismo nombre, precio y descuento
+        for i in range(23):
+            producto = _producto(valor=1000 * (1 + i % 2))
+            if i % 3 == 0:
+                producto.descuento = 10
+                producto.save()
+
+    def _recorrer(self, orden, page_size=4):
+        ids, url, paginas = [], f"/api/productos/?orden={orden}&page_size={page_size}", []
+        while url:
+            datos = self.client.get(url).json()
+            paginas.append([p["id"] for p in datos["results"]])
+            ids += paginas[-1]
+            url = datos["next"]
+        return ids, paginas, datos
+
+    def test_cursor_sin_saltos_ni_repetidos_con_empates(self):
+        productos = Producto.objects.filter(disponible=True)
+        for orden, campos in PaginacionCursorProductos.ORDENES.items():
+            if orden == "relevancia":
+                continue
+            with self.subTest(orden=orden):
+                ids, paginas, ultima = self._recorrer(orden)
+                self.assertEqual(ids, list(productos.order_by(*campos).values_list("id", flat=True)))
+                # Volver desde la última página devuelve la penúltima tal cual
+                previa = self.client.get(ultima["previous"]).json()
+                self.assertEqual([p["id"] for p in previa["results"]], paginas[-2])
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        caches["catalogo"].clear()
+        self.en_nombre = _producto(nombre="Martillo Carpintero")
+        self.en_descripcion = _producto(nombre="Clavos de acero", descripcion="Para usar con martíllo")
+        self.otro = _producto(nombre="Taladro percutor")
+
+    def _buscar(self, texto):
+        productos = filtrar_productos(Producto.objects.all(), texto)
+        return list(productos.order_by("relevancia", "id").values_list("id", flat=True))
+
+    def test_ordena_por_relevancia_sin_tildes_ni_mayusculas(self):
+        respuesta = self.client.get("/api/productos/", {"search": "martillo"})
+        self.assertEqual([p["id"] for p in respuesta.json()["results"]], [self.en_nombre.pk, self.en_descripcion.pk])
+        self.assertEqual(self._buscar("MARTÍL"), [self.en_nombre.pk, self.en_descripcion.pk])
+        self.assertEqual(self._buscar("martillo taladro"), [])
+
+    def test_el_indice_sigue_los_cambios_del_producto(self):
+        self.en_nombre.nombre = "Serrucho"
+        self.en_nombre.save()
+        self.assertEqual(self._buscar("martillo"), [self.en_descripcion.pk])
+        self.assertEqual(self._buscar("serru"), [self.en_nombre.pk])
+        self.otro.delete()
+        self.assertEqual(self._buscar("taladro"), [])
+
+class AsignacionTests(TestCase):
+    def setUp(self):
+        rol, _ = Rol.objects.get_or_create(nombre="EMPLEADO")
+        self.norte, self.sur = (Sucursal.objects.create(nombre=n, direccion="Calle 1") for n in ("Norte", "Sur"))
+        self.b1, self.b2, self.b3, self.fuera_de_turno = (
+            self._bodeguero(f"bodeguero_{i}", rol, sucursal, en_turno=i < 3)
+            for i, sucursal in enumerate((self.norte, self.norte, self.sur, self.norte))
+        )
+        self.cliente = Cliente.objects.create(user=User.objects.create_user("cliente_asignacion"))
+        self.del_norte = _producto(sucursal=self.norte)
+        self.del_sur = _producto(sucursal=self.sur)
+        # b1 ya tiene un pedido abierto con 5 unidades
+        self._pedido((self.del_norte, 5), bodeguero_asignado=self.b1)
+
+    def _bodeguero(self, username, rol, sucursal, en_turno):
+        usuario = User.objects.create_user(username)
+        UserProfile.objects.filter(user=usuario).update(
+            rol=rol, tipo_empleado="BODEGUERO", sucursal=sucursal, en_turno=en_turno
+        )
+        return usuario
+
+    def _pedido(self, *items, **campos):
+        pedido = Pedido.objects.create(cliente=self.cliente, **campos)
+        for producto, cantidad in items:
+            ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=cantidad, precio_unitario=1000)
+        return pedido
+
+    def _carga(self, usuario):
+        return ItemPedido.objects.filter(pedido__bodeguero_asignado=usuario).aggregate(total=Sum("cantidad"))["total"] or 0
+
+    def test_reparte_por_sucursal_equilibrando_la_carga(self):
+        del_norte = [self._pedido((self.del_norte, 1)) for _ in range(8)]
+        del_sur = self._pedido((self.del_sur, 2), (self.del_norte, 1))
+        asignados = asignar_pendientes()
+        self.assertEqual(sum(asignados.values()), 9)
+        self.assertFalse(Pedido.objects.filter(bodeguero_asignado__isnull=True).exists())
+        self.assertNotIn(self.fuera_de_turno.pk, asignados)
+        del_sur.refresh_from_db()
+        self.assertEqual(del_sur.bodeguero_asignado, self.b3)
+        self.assertEqual(set(Pedido.objects.filter(pk__in=[p.pk for p in del_norte]).values_list(
+            "bodeguero_asignado", flat=True)), {self.b1.pk, self.b2.pk})
+        # 5 + 8 unidades del norte entre dos bodegueros: quedan a lo sumo a una de diferencia
+        self.assertLessEqual(abs(self._carga(self.b1) - self._carga(self.b2)), 1)
+
+    def test_asignar_elige_al_menos_cargado_y_no_reasigna(self):
+        pedido = self._pedido((self.del_norte, 1))
+        self.assertEqual(pedido.asignar_bodeguero(), self.b2)
+        pedido.bodeguero_asignado = None
+        self.assertEqual(pedido.asignar_bodeguero(), self.b2)
+        # Sin bodegueros en turno en su sucursal va al menos cargado de otra
+        UserProfile.objects.filter(user=self.b3).update(en_turno=False)
+        self.assertEqual(self._pedido((self.del_sur, 1)).asignar_bodeguero(), self.b2)
+
+class ConvertirCarritoTests(TestCase):
+    def setUp(self):
+        self.con_descuento = _producto(stock=10, valor=10000, descuento=20)
+        self.sin_descuento = _producto(stock=3, valor=5000)
+        sincronizar_productos(Producto.objects.all())
+        self.carrito = Cart.objects.create(user=User.objects.create_user("convierte"))
+        agregar_item(self.carrito, self.con_descuento, 2)
+        agregar_item(self.carrito, self.sin_descuento, 3)
+
+    def test_crea_el_pedido_una_sola_vez(self):
+        pedido, creado = convertir_carrito(self.carrito)
+        self.assertTrue(creado)
+        self.assertEqual(
+            set(pedido.items.values_list("producto_id", "cantidad", "precio_unitario")),
+            {(self.con_descuento.pk, 2, 8000), (self.sin_descuento.pk, 3, 5000)},
+        )
+        self.assertEqual(pedido.total, 2 * 8000 + 3 * 5000)
+        self.carrito.refresh_from_db()
+        self.assertEqual(self.carrito.estado, "EN_PROCESO")
+        # Un doble envío devuelve el mismo pedido sin descontar stock de nuevo
+        self.assertEqual(convertir_carrito(self.carrito), (pedido, False))
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(
+            dict(Producto.objects.values_list("id", "stock")), {self.con_descuento.pk: 8, self.sin_descuento.pk: 0}
+        )
+        # Sin correo el cliente se crea igual, con el correo nulo
+        self.assertIsNone(pedido.cliente.email)
+
+    def test_sin_stock_no_cambia_nada(self):
+        Producto.objects.filter(pk=self.sin_descuento.pk).update(stock=2)
+        with self.assertRaises(StockInsuficiente):
+            convertir_carrito(self.carrito)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(Cliente.objects.exists())
+        self.assertEqual(
+            dict(Producto.objects.values_list("id", "stock")), {self.con_descuento.pk: 10, self.sin_descuento.pk: 2}
+        )
+        self.carrito.refresh_from_db()
+        self.assertEqual(self.carrito.estado, "ACTIVO")
+
+class CacheCatalogoTests(TestCase):
+    def setUp(self):
+        caches["catalogo"].clear()
+        self.producto = _producto()
+        self.url = f"/api/productos/{self.producto.pk}/"
+
+    def _nombre(self):
+        return self.client.get(self.url).json()["nombre"]
+
+    def test_cambio_invalida_la_respuesta_cacheada(self):
+        self.assertEqual(self._nombre(), "Producto Prueba")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = "Producto Renombrado"
+            self.producto.save()
+        self.assertEqual(self._nombre(), "Producto Renombrado")
+
+    def test_version_perdida_no_revive_respuestas_anteriores(self):
+        self.assertEqual(self._nombre(), "Producto Prueba")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = "Producto Renombrado"
+            self.producto.save()
+        self.assertEqual(self._nombre(), "Producto Renombrado")
+        # La caché descarta la clave de versión (límite de entradas o reinicio) pero no las respuestas
+        caches["catalogo"].delete(CLAVE_VERSION)
+        self.assertEqual(self._nombre(), "Producto Renombrado")
+
+class PromocionesTests(TestCase):
+    def setUp(self):
+        self.con_descuento = _producto(valor=10000)
+        self.con_descuento.descuento = 10
+        self.con_descuento.save()
+        self.sin_descuento = _producto(valor=10000)
+        sincronizar_productos(Producto.objects.all())
+
+    def _precios(self):
+        return dict(ProductoCatalogo.objects.values_list("producto_id", "precio_con_descuento"))
+
+    def _crear(self, descuento):
+        ids = [self.con_descuento.pk, self.sin_descuento.pk]
+        return crear_promocion({"alcance": "PRODUCTOS", "productos": ids, "descuento": descuento, "fin": None})
+
+    def test_activar_y_finalizar_restaura_el_descuento_propio(self):
+        promocion = self._crear(25)
+        self.assertEqual(promocion.estado, "ACTIVA")
+        self.assertEqual(set(self._precios().values()), {7500})
+        self.assertEqual(finalizar(promocion), 2)
+        self.con_descuento.refresh_from_db()
+        self.sin_descuento.refresh_from_db()
+        self.assertEqual((self.con_descuento.descuento, self.con_descuento.promocion_id), (10, None))
+        self.assertEqual(self.sin_descuento.descuento, 0)
+        self.assertEqual(self._precios(), {self.con_descuento.pk: 9000, self.sin_descuento.pk: 10000})
+
+    def test_al_finalizar_pasa_a_otra_promocion_activa(self):
+        primera = self._crear(20)
+        segunda = self._crear(30)
+        finalizar(segunda)
+        self.con_descuento.refresh_from_db()
+        self.assertEqual((self.con_descuento.descuento, self.con_descuento.promocion_id), (20, primera.pk))
+        finalizar(primera)
+        self.con_descuento.refresh_from_db()
+        self.assertEqual(self.con_descuento.descuento, 10)
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.existente = _producto(stock=10, valor=1000)
+        # Un checkout en curso retiene 3 unidades
+        reservar(Cart.objects.create(user=User.objects.create_user("reserva")), [(self.existente.pk, 3)])
+
+    def _importar(self, **kwargs):
+        archivo = io.BytesIO((
+            "nro_referencia;nombre;marca;categoria;valor;stock\n"
+            f"{self.existente.nro_referencia};Producto Renombrado;Marca Prueba;Categoría Prueba;2.990;50\n"
+            ";Producto Nuevo;Marca Nueva;Categoría Prueba;1500;4\n"
+        ).encode())
+        return importar_catalogo(archivo, "csv", **kwargs)
+
+    def test_actualiza_existentes_y_asigna_referencias_sin_tocar_el_stock(self):
+        resultado = self._importar()
+        self.assertEqual((resultado["creados"], resultado["actualizados"], resultado["filas_con_error"]), (1, 1, 0))
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nombre, self.existente.valor), ("Producto Renombrado", 2990))
+        self.assertEqual(self.existente.stock, 7)
+        nuevo = Producto.objects.get(nombre="Producto Nuevo")
+        self.assertTrue(nuevo.nro_referencia)
+        self.assertNotEqual(nuevo.nro_referencia, self.existente.nro_referencia)
+        self.assertEqual((nuevo.stock, nuevo.disponible, nuevo.marca.nombre), (4, True, "Marca Nueva"))
+        self.assertEqual(ProductoCatalogo.objects.get(producto=self.existente).precio_con_descuento, 2990)
+
+    def test_actualizar_stock_descuenta_las_reservas_activas(self):
+        self._importar(actualizar_stock=True)
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.stock, 47)
+        self.assertEqual(Producto.objects.get(nombre="Producto Nuevo").stock, 4)
+
+class PermisosRolesTests(TestCase):
+    """
+    Endpoint de bodeguero: el rol revocado deja de valer en la petición siguiente,
+    con la caché local por defecto y con una caché compartida entre procesos.
+    """
+    url = "/api/bodeguero/ordenes/"
+
+    def setUp(self):
+        rol, _ = Rol.objects.get_or_create(nombre="EMPLEADO")
+        self.usuario = User.objects.create_user("bodeguero")
+        UserProfile.objects.filter(user=self.usuario).update(rol=rol, tipo_empleado="BODEGUERO")
+        self.client.force_login(self.usuario)
+
+    def _consultas_roles(self):
+        consultas = []
+        def contar(execute, sql, params, many, context):
+            if "core_userprofile" in sql:
+                consultas.append(sql)
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(contar):
+            codigo = self.client.get(self.url).status_code
+        return codigo, len(consultas)
+
+    def test_cache_local_lee_los_roles_en_cada_peticion(self):
+        self.assertEqual(self._consultas_roles(), (200, 1))
+        # Un cambio hecho por otro proceso: aquí no llega ninguna invalidación
+        UserProfile.objects.filter(user=self.usuario).update(tipo_empleado="CONTADOR")
+        self.assertEqual(self._consultas_roles(), (403, 1))
+
+    def test_cache_compartida_guarda_los_roles_en_la_sesion(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        compartida = {
+            **settings.CACHES,
+            settings.ROLES_CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directorio},
+        }
+        with override_settings(CACHES=compartida):
+            self.assertEqual(self._consultas_roles(), (200, 1))
+            self.assertEqual(self._consultas_roles(), (200, 0))
+            perfil = UserProfile.objects.get(user=self.usuario)
+            perfil.tipo_empleado = "CONTADOR"
+            with self.captureOnCommitCallbacks(execute=True):
+                perfil.save()
+            self.assertEqual(self._consultas_roles(), (403, 1))
+
+class VentasDiariasTests(TestCase):
+    def setUp(self):
+        self.producto = _producto()
+        cliente = Cliente.objects.create(user=User.objects.create_user("ventas"), email="ventas@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido = Pedido.objects.create(cliente=cliente, estado="ENTREGADO", total=0)
+        self.dia = timezone.localdate(self.pedido.fecha_creacion)
+
+    def _item(self, cantidad):
+        ItemPedido.objects.create(pedido=self.pedido, producto=self.producto, cantidad=cantidad, precio_unitario=1000)
+
+    def _unidades(self):
+        return VentaDiaria.objects.get(fecha=self.dia, sucursal__isnull=True).unidades
+
+    def test_items_de_una_transaccion_recalculan_el_dia_una_vez(self):
+        with mock.patch.object(ventas_diarias, "recalcular", wraps=ventas_diarias.recalcular) as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    self._item(2)
+        recalcular.assert_called_once_with(self.dia, self.dia)
+        self.assertEqual(self._unidades(), 6)
+
+    def test_marcas_revertidas_no_impiden_el_siguiente_recalculo(self):
+        # Un savepoint revertido en medio de la transacción: el resto se recalcula igual
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self._item(5)
+                transaction.set_rollback(True)
+            self._item(1)
+        self.assertEqual(self._unidades(), 1)
+        # Una transacción cuyas únicas marcas se revierten no programa nada...
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self._item(5)
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        # ...ni deja a la siguiente sin recálculo
+        with self.captureOnCommitCallbacks(execute=True):
+            self._item(3)
+        self.assertEqual(self._unidades(), 4)
@@ -36,15 +36,28 @@ from .views import (
     AdminOverviewAPIView,
     AdminOrderListAPIView,
     AdminOrderAssignAPIView,
+    AdminOrderAssignPendientesAPIView,
     AdminOrderUpdateAPIView,
     AdminFinancialReportAPIView,
+    AdminExportacionReporteAPIView,
+    AdminVentasSeriesAPIView,
+    AdminTiemposEstadoAPIView,
+    AdminTareasAPIView,
+    AdminPromocionesAPIView,
+    AdminPromocionDetalleAPIView,
+    AdminTareaDetalleAPIView,
+    AdminExportacionDescargaAPIView,
     TurnoHistorialAPIView,
     CartAPIView, 
     CartItemUpdateAPIView, 
     CartItemDeleteAPIView,
     CartItemCreateAPIView,
+    CartBatchAPIView,
     StripePaymentAPIView,
+    StripeWebhookAPIView,
+    StripeConfirmAPIView,
     AdminDiscountsAPIView,
+    AdminImportarCatalogoAPIView,
 )
 from django.conf import settings
 from django.conf.urls.static import static
@@ -77,9 +90,12 @@ urlpatterns = [
     path("api/cart/items/<int:item_id>/", CartItemUpdateAPIView.as_view(), name="cart-item-update"),
     path("api/cart/items/<int:item_id>/delete/", CartItemDeleteAPIView.as_view(), name="cart-item-delete"),
     path("api/cart/items/", CartItemCreateAPIView.as_view(), name="cart-item-create"),
+    path("api/cart/batch/", CartBatchAPIView.as_view(), name="cart-batch"),
 
     # API Stripe
     path('api/pago/stripe/', StripePaymentAPIView.as_view(), name='stripe-payment'),
+    path('api/pago/stripe/webhook/', StripeWebhookAPIView.as_view(), name='stripe-webhook'),
+    path('api/pago/stripe/confirm/', StripeConfirmAPIView.as_view(), name='stripe-confirm'),
 
     # API Empleados
     path('api/empleados/marcar_entrada/', MarcarEntradaAPIView.as_view(), name='empleado-marcar-entrada'),
@@ -96,14 +112,24 @@ urlpatterns = [
 
     # API Admin
     path('api/admin/orders/', AdminOrderListAPIView.as_view(), name='admin-orders-list'),
+    path('api/admin/orders/assign-pendientes/', AdminOrderAssignPendientesAPIView.as_view(), name='admin-orders-assign-pendientes'),
     path('api/admin/orders/<int:pedido_id>/assign/', AdminOrderAssignAPIView.as_view(), name='admin-order-assign'),
     path('api/admin/orders/<int:pedido_id>/', AdminOrderUpdateAPIView.as_view(), name='admin-order-update'),
     path('api/admin/reportes/financieros/', AdminFinancialReportAPIView.as_view(), name='admin-financial-report'),
     path('api/admin/reportes/financieros_xlsx/', AdminFinancialReportAPIView.as_view(), name='admin-financial-report-xlsx'),
+    path('api/admin/promociones/', AdminPromocionesAPIView.as_view(), name='admin-promociones'),
+    path('api/admin/promociones/<int:pk>/', AdminPromocionDetalleAPIView.as_view(), name='admin-promocion-detalle'),
+    path('api/admin/tareas/', AdminTareasAPIView.as_view(), name='admin-tareas'),
+    path('api/admin/tareas/<int:pk>/', AdminTareaDetalleAPIView.as_view(), name='admin-tarea-detalle'),
+    path('api/admin/pedidos/tiempos-estado/', AdminTiemposEstadoAPIView.as_view(), name='admin-tiempos-estado'),
+    path('api/admin/ventas/series/', AdminVentasSeriesAPIView.as_view(), name='admin-ventas-series'),
+    path('api/admin/reportes/exportaciones/<int:pk>/', AdminExportacionReporteAPIView.as_view(), name='admin-exportacion'),
+    path('api/admin/reportes/exportaciones/<int:pk>/descargar/', AdminExportacionDescargaAPIView.as_view(), name='admin-exportacion-descarga'),
     path('api/admin/overview/', AdminOverviewAPIView.as_view(), name='admin-overview'),
     path('api/admin/empleados/', AdminEmpleadosListAPIView.as_view(), name='admin-empleados-list'),
     path('api/admin/empleados/<int:empleado_id>/', AdminEmpleadoDetailAPIView.as_view(), name='admin-empleado-detalle'),
     path('api/admin/discounts/', AdminDiscountsAPIView.as_view(), name='admin-discounts'),
+    path('api/admin/productos/importar/', AdminImportarCatalogoAPIView.as_view(), name='admin-productos-importar'),
 ]
 
 # Soporte para archivos media en desarrollo
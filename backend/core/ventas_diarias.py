@@ -0,0 +1,131 @@
+"""
+Mantenimiento de la tabla precalculada VentaDiaria.
+
+Cada cambio en un pedido (estado, total o items; el pago completado llega como
+cambio de estado) vuelve a agregar solo el día de creación de ese pedido con el
+motor de core/reportes.py y reemplaza sus filas. El costo depende de los
+pedidos de ese día, no del historial completo. La lectura de los dashboards
+queda en reportes.resumen_ventas_diarias.
+
+Las escrituras masivas que no pasan por señales (bulk_create, update) deben
+llamar a marcar_dia() o ejecutar `python manage.py reconstruir_ventas_diarias`.
+"""
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Pedido, VentaDiaria
+from .reportes import ESTADOS, resumen_ventas
+
+CAMPOS = ["total_ordenes", "total_ingresos", "ingresos_entregados", "unidades"]
+CAMPOS += [f"ordenes_{estado.lower()}" for estado in ESTADOS]
+
+def recalcular(desde, hasta):
+    """
+    Recalcula las filas de VentaDiaria entre `desde` y `hasta` (ambos incluidos)
+    con dos consultas agregadas y las reemplaza. Devuelve las filas escritas.
+    """
+    totales = resumen_ventas(desde, hasta, "dia", rellenar=False)
+    por_sucursal = resumen_ventas(desde, hasta, "dia", "sucursal")
+    filas = [
+        VentaDiaria(fecha=fila["periodo"], **{campo: fila[campo] for campo in CAMPOS})
+        for fila in totales
+    ]
+    filas += [
+        VentaDiaria(fecha=fila["periodo"], sucursal_id=fila["grupo_id"], **{campo: fila[campo] for campo in CAMPOS})
+        for fila in por_sucursal
+        if fila["grupo_id"] is not None  # productos sin sucursal solo cuentan en el total
+    ]
+    with transaction.atomic():
+        VentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+        VentaDiaria.objects.bulk_create(filas)
+    return len(filas)
+
+# Pendientes de la transacción en curso, por hilo (cada hilo tiene sus conexiones) y alias
+_registro = threading.local()
+
+def _pendientes_por_alias():
+    if not hasattr(_registro, "pendientes"):
+        _registro.pendientes = {}
+    return _registro.pendientes
+
+class _Pendientes:
+    """
+    Días y pedidos marcados en la transacción actual. El recálculo corre una sola
+    vez al confirmar, un día a la vez; las fechas de los pedidos se leen entonces,
+    todas en una consulta.
+
+    Cada marca programa el mismo objeto con on_commit (si la marca estaba en un
+    savepoint revertido su llamada se descarta, las demás siguen): la primera
+    llamada lo saca del registro y hace el trabajo, las siguientes no encuentran
+    nada pendiente. Si toda la transacción se revierte el objeto queda en el
+    registro y la próxima transacción lo reutiliza: a lo sumo recalcula de más
+    días que no cambiaron, lo que no altera el resultado.
+    """
+    def __init__(self, alias):
+        self.alias = alias
+        self.dias = set()
+        self.pedidos = set()
+
+    def __call__(self):
+        pendientes = _pendientes_por_alias()
+        if pendientes.get(self.alias) is self:
+            del pendientes[self.alias]
+        dias, pedidos = self.dias, self.pedidos
+        self.dias, self.pedidos = set(), set()
+        if pedidos:
+            fechas = Pedido.objects.filter(pk__in=pedidos).values_list("fecha_creacion", flat=True)
+            dias.update(timezone.localdate(fecha) for fecha in fechas)
+        for dia in sorted(dias):
+            recalcular(dia, dia)
+
+def _marcar(dia=None, pedido_id=None):
+    alias = transaction.get_connection().alias
+    registro = _pendientes_por_alias()
+    pendientes = registro.get(alias)
+    if pendientes is None:
+        pendientes = registro[alias] = _Pendientes(alias)
+    if dia is not None:
+        pendientes.dias.add(dia)
+    if pedido_id is not None:
+        pendientes.pedidos.add(pedido_id)
+    transaction.on_commit(pendientes, using=alias)  # fuera de una transacción corre de inmediato
+
+def marcar_dia(fecha):
+    """
+    Programa el recálculo del día `fecha` para cuando se confirme la transacción
+    actual (una vez por día y transacción, aunque se marque varias veces).
+    """
+    _marcar(dia=fecha)
+
+def marcar_pedido(pedido):
+    if pedido.fecha_creacion:
+        marcar_dia(timezone.localdate(pedido.fecha_creacion))
+
+def marcar_pedido_id(pedido_id):
+    """
+    Como marcar_pedido, sin leer el pedido: su fecha se consulta al confirmar.
+    """
+    _marcar(pedido_id=pedido_id)
+
+def reconstruir(dias_por_bloque=31):
+    """
+    Reconstruye toda la tabla a partir de los pedidos, por bloques de días.
+    Devuelve la cantidad de filas escritas.
+    """
+    rango = Pedido.objects.aggregate(primero=Min("fecha_creacion"), ultimo=Max("fecha_creacion"))
+    total = 0
+    with transaction.atomic():
+        VentaDiaria.objects.all().delete()
+        if rango["primero"] is None:
+            return 0
+        desde = timezone.localdate(rango["primero"])
+        ultimo = timezone.localdate(rango["ultimo"])
+        while desde <= ultimo:
+            hasta = min(desde + timedelta(days=dias_por_bloque - 1), ultimo)
+            total += recalcular(desde, hasta)
+            desde = hasta + timedelta(days=1)
+    return total
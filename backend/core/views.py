@@ -1,16 +1,38 @@
 from django.views.generic import View
 from django.http import FileResponse, Http404
+import json
 import os
 from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
-from .models import Producto, UserProfile, Pedido, ItemPedido, Categoria, Cliente, TurnoEmpleado
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from .models import Producto, UserProfile, Pedido, ItemPedido, Categoria, Cliente, TurnoEmpleado, ExportacionReporte, VentaDiaria, Tarea, Promocion
 from .permissions import IsAdminOrEmpleadoEspecial, IsSoloAdmin, IsEmpleadoSubrol
+from .asignacion import asignar as asignar_bodeguero, asignar_pendientes, bodegueros_en_turno
+from .busqueda import filtrar_productos
+from .seguimiento import tiempos_por_estado
+from .cache_catalogo import cache_catalogo
+from .carrito import agregar_item, cambiar_cantidad, eliminar_item, aplicar_operaciones, totales_disponibles, OperacionesInvalidas
+from .checkout import guardar_precios, precios_vigentes
+from .dashboard import resumen_general
+from .exportacion import (
+    CONTENT_TYPES as CONTENT_TYPES_EXPORTACION, encolar_exportacion, nombre_archivo as nombre_archivo_exportacion,
+    respuesta_exportacion,
+)
+from .importacion import ArchivoInvalido, formato_de as formato_importacion
+from .pagos import EventoInvalido, estado_pago, registrar_evento as registrar_evento_stripe
+from .pasarela import ErrorPasarela, PasarelaNoDisponible, clave_idempotencia, obtener_pasarela
+from .promociones import crear_promocion, finalizar as finalizar_promocion
+from .reportes import elegir_granularidad, rango_datetime, resumen, series_ventas
+from .reservas import StockInsuficiente, asociar_sesion, reservar_checkout, cancelar as cancelar_reservas
+from .tareas import TAREAS_ADMIN, encolar as encolar_tarea
+from django.urls import reverse
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -18,8 +40,6 @@ from django.utils.decorators import method_decorator
 from django.http import JsonResponse
 from django.db.models import Sum, Count
 from .models import Cart, ItemCarrito
-import stripe
-import openpyxl
 from rest_framework.generics import RetrieveAPIView
 from django.http import HttpResponse
 from .serializers import (
@@ -28,6 +48,7 @@ from .serializers import (
     ItemPedidoSerializer,
     PedidoSimpleSerializer,
     PedidoDetailSerializer,
+    PedidoListaSerializer,
     UserProfileSerializer,
     ItemCarritoSerializer,
 )
@@ -95,7 +116,7 @@ def _get_pedido_bodeguero(pedido_id, user):
     pedido = get_object_or_404(
         Pedido.objects.select_related(
             "bodeguero_asignado", "cliente", "direccion_envio"
-        ).prefetch_related("items__producto"),
+        ).prefetch_related("items__producto__catalogo"),
         id=pedido_id,
     )
     if not _bodeguero_asignado_equals_user(pedido.bodeguero_asignado, user):
@@ -118,24 +139,198 @@ def _validar_transicion_estado_pedido(estado_actual, nuevo_estado):
         return False
     return nuevo_estado in flujo.get(estado_actual, [])
 
+def _snapshot_carrito(cart):
+    """
+    Items y totales guardados del carrito, en una consulta (el carrito ya está cargado).
+    Como antes, solo se listan y suman los items cuyo producto sigue disponible.
+    """
+    items = list(ItemCarrito.objects.filter(carrito=cart).select_related("producto__catalogo"))
+    return {
+        "items": ItemCarritoSerializer([item for item in items if item.producto.disponible], many=True).data,
+        **totales_disponibles(cart, items),
+    }
+
 class PaginacionFerremas(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 50
 
+class PaginacionCursorProductos(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el catálogo. El costo de cada página no
+    depende de su posición, a diferencia de OFFSET.
+    El orden se elige con ?orden= entre las claves de ORDENES; si hay búsqueda
+    y no se indica orden, se ordena por relevancia.
+
+    A diferencia de CursorPagination, el cursor guarda todos los campos del
+    orden (p. ej. descuento e id), no solo el primero: con muchos empates
+    (la mayoría de los productos tiene descuento 0) la página siguiente sigue
+    siendo un filtro (descuento, id) < (d, i) sobre el índice, sin OFFSET.
+    """
+    page_size = 24
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ORDENES = {
+        "nuevos": ("-fecha_creacion", "-id"),
+        "precio_asc": ("valor", "id"),
+        "precio_desc": ("-valor", "-id"),
+        "nombre": ("nombre", "id"),
+        "descuento": ("-descuento", "-id"),
+        "relevancia": ("relevancia", "id"),
+    }
+    ordering = ORDENES["nuevos"]
+
+    def get_ordering(self, request, queryset, view):
+        orden = request.query_params.get("orden")
+        if orden is None and request.query_params.get("search", "").strip():
+            orden = "relevancia"
+        if orden == "relevancia" and "relevancia" not in queryset.query.annotations:
+            return self.ordering
+        return self.ORDENES.get(orden, self.ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        valores = [getattr(instance, campo.lstrip("-")) for campo in ordering]
+        return json.dumps([str(valor) for valor in valores])
+
+    def _filtro_posicion(self, posicion, reverse):
+        """
+        Productos estrictamente después de `posicion` en el orden (o antes, si el
+        cursor es inverso): (a, b) > (x, y) equivale a a > x OR (a = x AND b > y).
+        """
+        try:
+            valores = json.loads(posicion)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        filtro = models.Q()
+        iguales = {}
+        for campo, valor in zip(self.ordering, valores):
+            nombre = campo.lstrip("-")
+            operador = "lt" if reverse != campo.startswith("-") else "gt"
+            filtro |= models.Q(**iguales, **{f"{nombre}__{operador}": valor})
+            iguales[nombre] = valor
+        # Cota redundante sobre el primer campo: permite a SQLite recorrer el índice por rango
+        primero = self.ordering[0]
+        operador = "lte" if reverse != primero.startswith("-") else "gte"
+        return models.Q(**{f"{primero.lstrip('-')}__{operador}": valores[0]}) & filtro
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Igual que CursorPagination.paginate_queryset, salvo el filtro por posición
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, posicion = 0, False, None
+        else:
+            offset, reverse, posicion = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*(c[1:] if c.startswith("-") else f"-{c}" for c in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if posicion is not None:
+            queryset = queryset.filter(self._filtro_posicion(posicion, reverse))
+
+        # Un elemento extra indica si hay página siguiente
+        resultados = list(queryset[offset:offset + self.page_size + 1])
+        self.page = resultados[:self.page_size]
+        if len(resultados) > len(self.page):
+            hay_siguiente = True
+            siguiente = self._get_position_from_instance(resultados[-1], self.ordering)
+        else:
+            hay_siguiente = False
+            siguiente = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = posicion is not None or offset > 0
+            self.has_previous = hay_siguiente
+            if self.has_next:
+                self.next_position = posicion
+            if self.has_previous:
+                self.previous_position = siguiente
+        else:
+            self.has_next = hay_siguiente
+            self.has_previous = posicion is not None or offset > 0
+            if self.has_next:
+                self.next_position = siguiente
+            if self.has_previous:
+                self.previous_position = posicion
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+def _ultima_modificacion_catalogo(request, *args, **kwargs):
+    return Producto.objects.aggregate(ultima=models.Max("fecha_actualizacion"))["ultima"]
+
+def _ultima_modificacion_producto(request, pk):
+    return Producto.objects.filter(id=pk).values_list("fecha_actualizacion", flat=True).first()
+
+def _parse_entero(valor, campo):
+    """
+    Convierte un parámetro de query a entero o lanza ValueError con mensaje legible.
+    """
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"El parámetro '{campo}' debe ser un número entero.")
+
+def _filtrar_productos(productos, params):
+    """
+    Aplica búsqueda y filtros del catálogo sobre un queryset de Producto.
+    Parámetros soportados: search, categoria, marca, sucursal, precio_min,
+    precio_max, con_descuento y descuento_min.
+    """
+    busqueda = (params.get("search") or "").strip()
+    if busqueda:
+        productos = filtrar_productos(productos, busqueda)
+    # categoria y marca aceptan id o nombre
+    for campo in ("categoria", "marca"):
+        valor = params.get(campo)
+        if valor:
+            if valor.isdigit():
+                productos = productos.filter(**{f"{campo}_id": int(valor)})
+            else:
+                productos = productos.filter(**{f"{campo}__nombre__iexact": valor})
+    if params.get("sucursal"):
+        productos = productos.filter(sucursal_id=_parse_entero(params["sucursal"], "sucursal"))
+    if params.get("precio_min"):
+        productos = productos.filter(valor__gte=_parse_entero(params["precio_min"], "precio_min"))
+    if params.get("precio_max"):
+        productos = productos.filter(valor__lte=_parse_entero(params["precio_max"], "precio_max"))
+    if params.get("con_descuento") in ("1", "true", "True"):
+        productos = productos.filter(descuento__gt=0)
+    if params.get("descuento_min"):
+        productos = productos.filter(descuento__gte=_parse_entero(params["descuento_min"], "descuento_min"))
+    return productos
+
 # --- API Views ---
 
 class ProductoListAPIView(APIView):
     """
-    Lista todos los productos disponibles para el frontend.
+    Lista los productos disponibles para el frontend, con búsqueda, filtros,
+    orden y paginación por cursor.
     """
 
+    @cache_catalogo(_ultima_modificacion_catalogo)
     def get(self, request):
-        productos = Producto.objects.filter(disponible=True)
+        productos = Producto.objects.filter(disponible=True).select_related("catalogo")
+        try:
+            productos = _filtrar_productos(productos, request.query_params)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+        paginator = PaginacionCursorProductos()
+        page = paginator.paginate_queryset(productos, request, view=self)
         serializer = ProductoSerializer(
-            productos, many=True, context={"request": request}
+            page, many=True, context={"request": request}
         )
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
 class LoginAPIView(APIView):
     permission_classes = [AllowAny]
@@ -186,27 +381,42 @@ class RegisterAPIView(APIView):
         )
 
 class ProductoDetailAPIView(APIView):
+    @cache_catalogo(_ultima_modificacion_producto)
     def get(self, request, pk):
-        producto = get_object_or_404(Producto, id=pk, disponible=True)
+        producto = get_object_or_404(Producto.objects.select_related("catalogo"), id=pk, disponible=True)
         serializer = ProductoSerializer(producto, context={"request": request})
         return Response(serializer.data)
 
 class CartAPIView(APIView):
     """
-    Devuelve los items del carrito y el total.
+    Devuelve los items del carrito y sus totales guardados (mantenidos de forma incremental).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         # Obtener el carrito del usuario autenticado
         cart, _ = Cart.objects.get_or_create(user=request.user, estado="ACTIVO")
-        # Filtrar solo items cuyo producto existe y está disponible
-        items = ItemCarrito.objects.filter(carrito=cart, producto__isnull=False, producto__disponible=True)
-        total = sum(item.subtotal() for item in items)
-        return Response({
-            "items": ItemCarritoSerializer(items, many=True).data,
-            "total": total
-        })
+        return Response(_snapshot_carrito(cart))
+
+class CartBatchAPIView(APIView):
+    """
+    Aplica un lote de operaciones (agregar, fijar, eliminar) sobre el carrito en
+    una sola transacción y devuelve el carrito resultante.
+    Body: {"operaciones": [{"accion": "agregar", "producto_id": 1, "cantidad": 2}, ...]}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        cart, _ = Cart.objects.get_or_create(user=request.user, estado="ACTIVO")
+        try:
+            resumen = aplicar_operaciones(cart, request.data.get("operaciones"))
+        except OperacionesInvalidas as e:
+            return Response(
+                {"error": "Operaciones inválidas; no se aplicó ningún cambio.", "errores": e.errores},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        cart.refresh_from_db(fields=["subtotal", "iva", "total"])
+        return Response({**_snapshot_carrito(cart), "resumen": resumen})
 
 class CartItemCreateAPIView(APIView):
     """
@@ -220,21 +430,11 @@ class CartItemCreateAPIView(APIView):
         if not producto_id:
             return Response({"error": "Falta el producto_id."}, status=400)
         try:
-            producto = Producto.objects.get(id=producto_id, disponible=True)
+            producto = Producto.objects.select_related("catalogo").get(id=producto_id, disponible=True)
         except Producto.DoesNotExist:
             return Response({"error": "Producto no encontrado o no disponible."}, status=404)
         cart, _ = Cart.objects.get_or_create(user=request.user, estado="ACTIVO")
-        item, created = ItemCarrito.objects.get_or_create(
-            carrito=cart,
-            producto=producto,
-            defaults={"precio_unitario": producto.valor}
-        )
-        if not created:
-            item.cantidad += int(cantidad)
-        else:
-            item.cantidad = int(cantidad)
-            item.precio_unitario = producto.valor  # Asegura que siempre tenga precio
-        item.save()
+        item = agregar_item(cart, producto, cantidad)
         return Response(ItemCarritoSerializer(item).data, status=201)
 
 class CartItemUpdateAPIView(APIView):
@@ -245,12 +445,13 @@ class CartItemUpdateAPIView(APIView):
 
     def patch(self, request, item_id):
         try:
-            item = ItemCarrito.objects.get(id=item_id, carrito__user=request.user, carrito__estado="ACTIVO")
+            item = ItemCarrito.objects.select_related("producto__catalogo").get(
+                id=item_id, carrito__user=request.user, carrito__estado="ACTIVO"
+            )
             cantidad = request.data.get("cantidad") or request.data.get("quantity")
             if not cantidad or int(cantidad) < 1:
                 return Response({"error": "La cantidad debe ser mayor a 0."}, status=status.HTTP_400_BAD_REQUEST)
-            item.cantidad = int(cantidad)
-            item.save()
+            cambiar_cantidad(item, cantidad)
             return Response(ItemCarritoSerializer(item).data)
         except ItemCarrito.DoesNotExist:
             return Response({"error": "El item no existe o no pertenece al carrito activo."}, status=status.HTTP_404_NOT_FOUND)
@@ -264,7 +465,7 @@ class CartItemDeleteAPIView(APIView):
     def delete(self, request, item_id):
         try:
             item = ItemCarrito.objects.get(id=item_id, carrito__user=request.user, carrito__estado="ACTIVO")
-            item.delete()
+            eliminar_item(item)
             return Response({"success": "El item fue eliminado del carrito."}, status=status.HTTP_204_NO_CONTENT)
         except ItemCarrito.DoesNotExist:
             return Response({"error": "El item no existe o no pertenece al carrito activo."}, status=status.HTTP_404_NOT_FOUND)
@@ -395,12 +596,9 @@ class BodegueroOrdenesAPIView(APIView):
     def get(self, request):
         bodeguero = request.user
         pedidos = (
-            Pedido.objects.filter(
-                models.Q(bodeguero_asignado=bodeguero)
-                | models.Q(bodeguero_asignado=getattr(bodeguero, "profile", None))
-            )
+            Pedido.objects.filter(bodeguero_asignado=bodeguero)
             .select_related("cliente", "direccion_envio")
-            .prefetch_related("items__producto")
+            .prefetch_related("items__producto__catalogo")
             .order_by("-fecha_creacion")
         )
         paginator = PaginacionFerremas()
@@ -462,14 +660,14 @@ class ContadorReportesAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsEmpleadoSubrol.with_subrol("CONTADOR")]
 
     def get(self, request):
-        total_ventas = (
-            Pedido.objects.filter(estado="ENTREGADO").aggregate(
-                total=models.Sum("total")
-            )["total"]
-            or 0
+        totales = VentaDiaria.objects.filter(sucursal__isnull=True).aggregate(
+            total_ventas=Sum("ingresos_entregados"),
+            pedidos_entregados=Sum("ordenes_entregado"),
+            pedidos_cancelados=Sum("ordenes_cancelado"),
         )
-        pedidos_entregados = Pedido.objects.filter(estado="ENTREGADO").count()
-        pedidos_cancelados = Pedido.objects.filter(estado="CANCELADO").count()
+        total_ventas = totales["total_ventas"] or 0
+        pedidos_entregados = totales["pedidos_entregados"] or 0
+        pedidos_cancelados = totales["pedidos_cancelados"] or 0
         return _respuesta_ok(
             {
                 "total_ventas": total_ventas,
@@ -519,6 +717,7 @@ class AdminEmpleadoDetailAPIView(APIView):
         return _respuesta_ok({"empleado": serializer.data})
 
 class CategoriaListAPIView(APIView):
+    @cache_catalogo(_ultima_modificacion_catalogo)
     def get(self, request):
         categorias = Categoria.objects.all()
         data = [
@@ -529,102 +728,142 @@ class CategoriaListAPIView(APIView):
 
 class AdminOverviewAPIView(APIView):
     """
-    Devuelve el resumen general para el dashboard de administrador.
+    Devuelve el resumen general para el dashboard de administrador (ver core/dashboard.py).
     """
     permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
 
     def get(self, request):
-        # Ingresos totales (solo pedidos entregados)
-        total_revenue = Pedido.objects.filter(estado="ENTREGADO").aggregate(
-            total=Sum("total")
-        )["total"] or 0
-
-        # Ingresos del mes anterior
-        from django.utils import timezone
-        from datetime import timedelta
-
-        now = timezone.now()
-        last_month = now - timedelta(days=30)
-        revenue_last_month = Pedido.objects.filter(
-            estado="ENTREGADO", fecha_creacion__gte=last_month
-        ).aggregate(total=Sum("total"))["total"] or 0
-
-        # Órdenes totales y cambio
-        orders = Pedido.objects.filter(estado="ENTREGADO").count()
-        orders_last_month = Pedido.objects.filter(
-            estado="ENTREGADO", fecha_creacion__gte=last_month
-        ).count()
-
-        # Clientes totales y cambio
-        customers = Cliente.objects.count()
-        customers_last_month = Cliente.objects.filter(
-            fecha_registro__gte=last_month
-        ).count()
-
-        # Valor inventario (suma de stock * valor de cada producto)
-        from .models import Producto
-        inventory_value = sum([
-            int(p.stock) * int(p.valor)
-            for p in Producto.objects.all()
-        ])
-
-        # Cambios porcentuales (evita división por cero)
-        def percent_change(current, previous):
-            if previous == 0:
-                return 0.0
-            return ((current - previous) / previous) * 100
-
-        data = {
-            "total_revenue": total_revenue,
-            "revenue_change": percent_change(revenue_last_month, total_revenue),
-            "orders": orders,
-            "orders_change": percent_change(orders_last_month, orders),
-            "customers": customers,
-            "customers_change": percent_change(customers_last_month, customers),
-            "inventory_value": inventory_value,
-            "inventory_change": 0.0,  # Puedes calcularlo si tienes histórico
-        }
-        return Response(data)
+        return Response(resumen_general())
 
 # --- Órdenes para dashboard admin: listar, asignar, modificar ---
 
+class PaginacionCursorPedidos(CursorPagination):
+    """
+    Paginación por cursor para el listado de pedidos del admin (más recientes primero).
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-fecha_creacion", "-id")
+
+def _filtrar_pedidos(pedidos, params):
+    """
+    Filtros del listado de pedidos: estado (uno o varios separados por coma),
+    desde/hasta (YYYY-MM-DD), bodeguero (id de usuario o "ninguno"),
+    metodo_retiro y buscar (N° de pedido o usuario del cliente).
+    Lanza ValueError si algún valor es inválido.
+    """
+    from datetime import date
+    if params.get("estado"):
+        estados = [e.strip().upper() for e in params["estado"].split(",") if e.strip()]
+        validos = dict(Pedido.ESTADO_CHOICES)
+        if any(e not in validos for e in estados):
+            raise ValueError(f"Estado inválido; usa uno de: {', '.join(validos)}.")
+        pedidos = pedidos.filter(estado__in=estados)
+    try:
+        desde = date.fromisoformat(params["desde"]) if params.get("desde") else None
+        hasta = date.fromisoformat(params["hasta"]) if params.get("hasta") else None
+    except ValueError:
+        raise ValueError("Las fechas deben tener formato YYYY-MM-DD.")
+    if desde:
+        pedidos = pedidos.filter(fecha_creacion__gte=rango_datetime(desde, desde)[0])
+    if hasta:
+        pedidos = pedidos.filter(fecha_creacion__lt=rango_datetime(hasta, hasta)[1])
+    bodeguero = params.get("bodeguero")
+    if bodeguero == "ninguno":
+        pedidos = pedidos.filter(bodeguero_asignado__isnull=True)
+    elif bodeguero:
+        pedidos = pedidos.filter(bodeguero_asignado_id=_parse_entero(bodeguero, "bodeguero"))
+    if params.get("metodo_retiro"):
+        pedidos = pedidos.filter(metodo_retiro=params["metodo_retiro"])
+    buscar = params.get("buscar", "").strip().lstrip("#")
+    if buscar:
+        if buscar.isdigit():
+            pedidos = pedidos.filter(models.Q(id=int(buscar)) | models.Q(cliente__user__username__icontains=buscar))
+        else:
+            pedidos = pedidos.filter(cliente__user__username__icontains=buscar)
+    return pedidos
+
 class AdminOrderListAPIView(APIView):
+    """
+    Listado paginado de pedidos (sin items; el detalle se pide a /api/admin/orders/<id>/).
+    Una consulta por página, sin importar cuántos pedidos haya.
+    """
     permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
 
     def get(self, request):
-        pedidos = Pedido.objects.select_related("cliente", "bodeguero_asignado").order_by("-fecha_creacion")
-        serializer = PedidoSimpleSerializer(pedidos, many=True)
-        return Response(serializer.data)
+        pedidos = (
+            Pedido.objects.select_related("cliente__user", "bodeguero_asignado")
+            .annotate(items_count=Count("items"))
+        )
+        try:
+            pedidos = _filtrar_pedidos(pedidos, request.GET)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+        paginator = PaginacionCursorPedidos()
+        page = paginator.paginate_queryset(pedidos, request, view=self)
+        serializer = PedidoListaSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 class AdminOrderAssignAPIView(APIView):
+    """
+    Asigna un bodeguero al pedido: el indicado en bodeguero_id (id del perfil)
+    o, si no se indica, el bodeguero en turno menos cargado.
+    """
     permission_classes = [permissions.IsAuthenticated, IsSoloAdmin]
 
     def post(self, request, pedido_id):
         pedido = get_object_or_404(Pedido, id=pedido_id)
         bodeguero_id = request.data.get("bodeguero_id")
         if bodeguero_id:
-            bodeguero = get_object_or_404(UserProfile, id=bodeguero_id)
-            pedido.bodeguero_asignado = bodeguero
-            pedido.save()
+            bodeguero = get_object_or_404(UserProfile, id=bodeguero_id, tipo_empleado="BODEGUERO")
+            pedido.bodeguero_asignado = bodeguero.user
+            pedido.save(update_fields=["bodeguero_asignado", "fecha_actualizacion"])
             return Response({"success": True, "mensaje": "Bodeguero asignado manualmente."})
-        # Asignación automática (ejemplo simple: primer bodeguero disponible)
-        bodegueros = UserProfile.objects.filter(tipo_empleado="BODEGUERO", en_turno=True)
-        if bodegueros.exists():
-            pedido.bodeguero_asignado = bodegueros.first()
-            pedido.save()
+        if pedido.bodeguero_asignado_id:
+            return Response({"success": False, "mensaje": "El pedido ya tiene bodeguero asignado."}, status=400)
+        if asignar_bodeguero(pedido):
             return Response({"success": True, "mensaje": "Bodeguero asignado automáticamente."})
         return Response({"success": False, "mensaje": "No hay bodegueros disponibles."}, status=400)
 
+class AdminOrderAssignPendientesAPIView(APIView):
+    """
+    Reparte todos los pedidos SOLICITADO sin bodeguero entre los bodegueros en turno según su carga.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsSoloAdmin]
+
+    def post(self, request):
+        asignados = asignar_pendientes()
+        if not asignados and not bodegueros_en_turno().exists():
+            return Response({"success": False, "mensaje": "No hay bodegueros disponibles."}, status=400)
+        total = sum(asignados.values())
+        return Response({
+            "success": True,
+            "mensaje": f"{total} pedido(s) asignado(s).",
+            "asignados": [{"usuario_id": user_id, "pedidos": cantidad} for user_id, cantidad in asignados.items()],
+        })
+
+def _pedido_con_detalle(pedido_id):
+    return get_object_or_404(
+        Pedido.objects.select_related("cliente__user", "bodeguero_asignado", "direccion_envio")
+        .prefetch_related("items__producto__catalogo", "eventos_estado__usuario"),
+        id=pedido_id,
+    )
+
 class AdminOrderUpdateAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
 
+    def get(self, request, pedido_id):
+        serializer = PedidoDetailSerializer(_pedido_con_detalle(pedido_id))
+        return Response(serializer.data)
+
     def patch(self, request, pedido_id):
         pedido = get_object_or_404(Pedido, id=pedido_id)
         estado = request.data.get("estado")
         if estado:
             pedido.actualizar_estado(estado, request.user)
         # Otros campos editables...
-        serializer = PedidoDetailSerializer(pedido)
+        serializer = PedidoDetailSerializer(_pedido_con_detalle(pedido_id))
         return Response(serializer.data)
 
 # Descuentos para productos
@@ -643,89 +882,324 @@ class AdminDiscountsAPIView(APIView):
                 return Response({"success": False, "mensaje": "Descuento inválido."}, status=400)
         except Exception:
             return Response({"success": False, "mensaje": "Descuento inválido."}, status=400)
-        productos = Producto.objects.filter(id__in=productos_ids)
-        for prod in productos:
-            prod.descuento = descuento
-            prod.save()
-        return Response({"success": True, "mensaje": "Descuento aplicado correctamente."})
+        try:
+            productos_ids = [int(pk) for pk in productos_ids]
+        except (TypeError, ValueError):
+            return Response({"success": False, "mensaje": "Productos inválidos."}, status=400)
+        # Se aplica en el worker; el cliente sigue la tarea en /api/admin/tareas/<id>/
+        tarea = encolar_tarea("aplicar_descuento", request.user, productos=productos_ids, descuento=descuento)
+        return Response(
+            {"success": True, "mensaje": "Descuento en proceso.", "tarea": _datos_tarea(tarea)},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+class AdminImportarCatalogoAPIView(APIView):
+    """
+    Recibe un archivo CSV/XLSX de productos (campo `archivo`) y encola su
+    importación (core/importacion.py). El stock de los productos existentes solo
+    se reemplaza con `actualizar_stock=true`. Responde 202 con la tarea; su
+    resultado trae los conteos y los errores por fila.
+    """
+    permission_classes = [IsAuthenticated, IsSoloAdmin]
+
+    def post(self, request):
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"success": False, "mensaje": "Adjunta el archivo en el campo 'archivo'."}, status=400)
+        try:
+            formato = formato_importacion(archivo.name)
+        except ArchivoInvalido as e:
+            return Response({"success": False, "mensaje": str(e)}, status=400)
+        ruta = default_storage.save(f"importaciones/{timezone.now():%Y%m%d%H%M%S}_{archivo.name}", archivo)
+        actualizar_stock = request.data.get("actualizar_stock") in ("1", "true", "True")
+        tarea = encolar_tarea(
+            "importar_catalogo", request.user, ruta=ruta, formato=formato, actualizar_stock=actualizar_stock
+        )
+        return Response(
+            {"success": True, "mensaje": "Importación en proceso.", "tarea": _datos_tarea(tarea)},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+def _datos_promocion(promocion):
+    return {
+        "id": promocion.id,
+        "nombre": promocion.nombre,
+        "descuento": promocion.descuento,
+        "alcance": promocion.alcance,
+        "categoria": promocion.categoria_id,
+        "marca": promocion.marca_id,
+        "sucursal": promocion.sucursal_id,
+        "inicio": promocion.inicio,
+        "fin": promocion.fin,
+        "estado": promocion.estado,
+        "productos_afectados": promocion.productos_afectados,
+        "activada_en": promocion.activada_en,
+        "finalizada_en": promocion.finalizada_en,
+    }
+
+class AdminPromocionesAPIView(APIView):
+    """
+    GET: promociones (filtro opcional por estado). POST: crea una promoción
+    (nombre, descuento, alcance PRODUCTOS|CATEGORIA|MARCA|SUCURSAL con productos,
+    categoria, marca o sucursal, inicio y fin ISO 8601 opcionales). Si ya está
+    vigente se aplica de inmediato con un solo UPDATE (ver core/promociones.py).
+    """
+    permission_classes = [IsAuthenticated, IsSoloAdmin]
+
+    def get(self, request):
+        promociones = Promocion.objects.all()
+        if request.GET.get("estado"):
+            promociones = promociones.filter(estado=request.GET["estado"])
+        return _respuesta_ok({"promociones": [_datos_promocion(p) for p in promociones[:100]]})
+
+    def post(self, request):
+        try:
+            promocion = crear_promocion(request.data, request.user)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+        return _respuesta_ok(
+            {"promocion": _datos_promocion(promocion)}, "Promoción creada.", status_code=status.HTTP_201_CREATED
+        )
+
+class AdminPromocionDetalleAPIView(APIView):
+    """
+    GET: detalle de una promoción. DELETE: la cancela y restaura los descuentos de sus productos.
+    """
+    permission_classes = [IsAuthenticated, IsSoloAdmin]
+
+    def get(self, request, pk):
+        return _respuesta_ok({"promocion": _datos_promocion(get_object_or_404(Promocion, pk=pk))})
+
+    def delete(self, request, pk):
+        promocion = get_object_or_404(Promocion, pk=pk)
+        if promocion.estado not in ("PROGRAMADA", "ACTIVA"):
+            return _respuesta_error("La promoción ya terminó.", status.HTTP_409_CONFLICT)
+        finalizar_promocion(promocion, estado="CANCELADA")
+        return _respuesta_ok({"promocion": _datos_promocion(promocion)}, "Promoción cancelada.")
 
 # Reportes financieros para admin
 
+def _parse_rango_reporte(params, dias_por_defecto=7):
+    """
+    Lee desde/hasta (YYYY-MM-DD) de los parámetros; por defecto, los últimos `dias_por_defecto` días.
+    Lanza ValueError con un mensaje legible si el formato o el rango no son válidos.
+    """
+    from datetime import date
+    hoy = timezone.now().date()
+    try:
+        hasta = date.fromisoformat(params["hasta"]) if params.get("hasta") else hoy
+        desde = (
+            date.fromisoformat(params["desde"]) if params.get("desde")
+            else hasta - timezone.timedelta(days=dias_por_defecto - 1)
+        )
+    except ValueError:
+        raise ValueError("Las fechas deben tener formato YYYY-MM-DD.")
+    if desde > hasta:
+        raise ValueError("La fecha 'desde' no puede ser posterior a 'hasta'.")
+    return desde, hasta
+
 class AdminFinancialReportAPIView(APIView):
+    """
+    Reporte financiero por periodo, leído del resumen VentaDiaria (o, agrupando por
+    categoría o marca, con una consulta agrupada sobre los pedidos; ver core/reportes.py).
+    Parámetros: desde, hasta (YYYY-MM-DD; por defecto últimos 7 días),
+    granularidad (dia, semana, mes), agrupar_por (sucursal, categoria, marca)
+    y export=xlsx|csv para exportar el detalle. XLSX se genera por defecto en el
+    worker (respuesta 202 con la ExportacionReporte y su Tarea; segundo_plano=0
+    lo descarga directamente); CSV se transmite directamente salvo con segundo_plano=1.
+    """
     permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
 
     def get(self, request, *args, **kwargs):
-        print("GET recibido", request.GET)
-        if request.GET.get("export") == "xlsx":
-            print("Generando Excel detallado...")
-            wb = openpyxl.Workbook()
-            ws_resumen = wb.active
-            ws_resumen.title = "Resumen Diario"
-
-            # Hoja 1: Resumen diario (sin promedio)
-            ws_resumen.append([
-                "Fecha", "Órdenes Totales", "Entregadas", "Canceladas", "En preparación", "Ingresos (CLP)"
-            ])
-            hoy = timezone.now().date()
-            dias = 7
-            for i in range(dias):
-                fecha = hoy - timezone.timedelta(days=i)
-                pedidos = Pedido.objects.filter(fecha_creacion__date=fecha)
-                entregadas = pedidos.filter(estado="ENTREGADO")
-                total_entregadas = entregadas.count()
-                ingresos_entregadas = entregadas.aggregate(total=Sum("total"))["total"] or 0
-
-                ws_resumen.append([
-                    fecha.strftime("%Y-%m-%d"),
-                    pedidos.count(),
-                    total_entregadas,
-                    pedidos.filter(estado="CANCELADO").count(),
-                    pedidos.filter(estado="PREPARACION").count(),
-                    int(ingresos_entregadas),
-                ])
-
-            # Hoja 2: Detalle de órdenes
-            ws_detalle = wb.create_sheet(title="Órdenes Detalle")
-            ws_detalle.append([
-                "ID", "Cliente", "Fecha", "Estado", "Total (CLP)"
-            ])
-            pedidos = Pedido.objects.filter(
-                fecha_creacion__date__gte=hoy - timezone.timedelta(days=dias-1)
-            ).select_related("cliente")
-            for pedido in pedidos:
-                ws_detalle.append([
-                    pedido.id,
-                    getattr(pedido.cliente, "user", None).username if getattr(pedido.cliente, "user", None) else "",
-                    pedido.fecha_creacion.strftime("%Y-%m-%d %H:%M"),
-                    pedido.estado,
-                    int(pedido.total)
-                ])
-
-            response = HttpResponse(
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            response["Content-Disposition"] = 'attachment; filename="reporte_financiero_detallado.xlsx"'
-            wb.save(response)
-            return response
-
-        # Respuesta JSON para la tabla (igual que antes)
-        hoy = timezone.now().date()
-        dias = 7
-        data = []
-        for i in range(dias):
-            fecha = hoy - timezone.timedelta(days=i)
-            pedidos = Pedido.objects.filter(fecha_creacion__date=fecha)
-            total_ordenes = pedidos.count()
-            total_ingresos = pedidos.exclude(estado="CANCELADO").aggregate(total=Sum("total"))["total"] or 0
-            total_canceladas = pedidos.filter(estado="CANCELADO").count()
-            data.append({
-                "fecha": fecha.strftime("%Y-%m-%d"),
-                "total_ordenes": total_ordenes,
-                "total_ingresos": int(total_ingresos),
-                "total_canceladas": total_canceladas,
-            })
+        try:
+            desde, hasta = _parse_rango_reporte(request.GET)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+
+        formato = request.GET.get("export")
+        if formato is not None:
+            if formato not in CONTENT_TYPES_EXPORTACION:
+                return _respuesta_error("Formato de exportación inválido; usa xlsx o csv.")
+            segundo_plano = request.GET.get("segundo_plano", "1" if formato == "xlsx" else "0")
+            if segundo_plano in ("1", "true"):
+                exportacion, tarea = encolar_exportacion(request.user, formato, desde, hasta)
+                return _respuesta_ok(
+                    {**_datos_exportacion(request, exportacion), "tarea": _datos_tarea(tarea)},
+                    "Exportación en proceso.",
+                    status_code=status.HTTP_202_ACCEPTED,
+                )
+            return respuesta_exportacion(formato, desde, hasta)
+
+        try:
+            agrupar_por = request.GET.get("agrupar_por") or None
+            filas = resumen(desde, hasta, request.GET.get("granularidad", "dia"), agrupar_por)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+
+        # Más reciente primero, como muestra la tabla del dashboard
+        if agrupar_por is None:
+            filas = list(reversed(filas))
+        data = [
+            {
+                **{k: v for k, v in fila.items() if k != "periodo"},
+                "fecha": fila["periodo"].strftime("%Y-%m-%d"),
+                "total_canceladas": fila["ordenes_cancelado"],
+            }
+            for fila in filas
+        ]
         return Response(data)
 
+class AdminVentasSeriesAPIView(APIView):
+    """
+    Serie de tiempo de ingresos y órdenes para el gráfico de ventas.
+    Parámetros: desde, hasta (por defecto últimos 30 días), granularidad
+    (dia, semana, mes), dividir_por (estado, categoria, sucursal) y max_puntos
+    (si el rango tiene más periodos, se pasa a una granularidad más gruesa).
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+    MAX_PUNTOS = 120
+
+    def get(self, request):
+        try:
+            desde, hasta = _parse_rango_reporte(request.GET, dias_por_defecto=30)
+            max_puntos = _parse_entero(request.GET.get("max_puntos", self.MAX_PUNTOS), "max_puntos")
+            granularidad = elegir_granularidad(
+                desde, hasta, request.GET.get("granularidad", "dia"), max(1, max_puntos)
+            )
+            datos = series_ventas(desde, hasta, granularidad, request.GET.get("dividir_por") or None)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+        return Response({"desde": desde, "hasta": hasta, "granularidad": granularidad, **datos})
+
+class AdminTiemposEstadoAPIView(APIView):
+    """
+    Tiempo promedio que los pedidos pasan en cada estado, según PedidoEstadoEvento.
+    Parámetros: desde, hasta (entradas al estado en el rango; por defecto últimos
+    30 días) y estado (lista separada por comas, opcional).
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+
+    def get(self, request):
+        try:
+            desde, hasta = _parse_rango_reporte(request.GET, dias_por_defecto=30)
+        except ValueError as e:
+            return _respuesta_error(str(e))
+        estados = [e for e in request.GET.get("estado", "").split(",") if e] or None
+        filas = tiempos_por_estado(desde, hasta, estados)
+        return Response({
+            "desde": desde,
+            "hasta": hasta,
+            "estados": [
+                {
+                    "estado": fila["estado"],
+                    "entradas": fila["entradas"],
+                    "completadas": fila["completadas"],
+                    "promedio_segundos": round(fila["promedio"].total_seconds()) if fila["promedio"] else None,
+                }
+                for fila in filas
+            ],
+        })
+
+def _datos_exportacion(request, exportacion):
+    datos = {
+        "id": exportacion.id,
+        "estado": exportacion.estado,
+        "formato": exportacion.formato,
+        "desde": exportacion.desde,
+        "hasta": exportacion.hasta,
+        "filas": exportacion.filas,
+        "error": exportacion.error,
+        "creada_en": exportacion.creada_en,
+        "terminada_en": exportacion.terminada_en,
+        "url_descarga": None,
+    }
+    if exportacion.estado == "COMPLETADA" and exportacion.archivo:
+        datos["url_descarga"] = request.build_absolute_uri(
+            reverse("admin-exportacion-descarga", args=[exportacion.id])
+        )
+    return datos
+
+class AdminExportacionReporteAPIView(APIView):
+    """
+    Estado de una exportación de reporte en segundo plano.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+
+    def get(self, request, pk):
+        exportacion = get_object_or_404(ExportacionReporte, pk=pk)
+        return _respuesta_ok(_datos_exportacion(request, exportacion))
+
+class AdminExportacionDescargaAPIView(APIView):
+    """
+    Descarga el archivo de una exportación completada (enviado por partes).
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+
+    def get(self, request, pk):
+        exportacion = get_object_or_404(ExportacionReporte, pk=pk)
+        if exportacion.estado != "COMPLETADA" or not exportacion.archivo:
+            return _respuesta_error("La exportación aún no está disponible.", status.HTTP_409_CONFLICT)
+        return FileResponse(
+            exportacion.archivo.open("rb"),
+            as_attachment=True,
+            filename=nombre_archivo_exportacion(exportacion.formato, exportacion.desde, exportacion.hasta),
+            content_type=CONTENT_TYPES_EXPORTACION[exportacion.formato],
+        )
+
+def _datos_tarea(tarea):
+    return {
+        "id": tarea.id,
+        "tipo": tarea.tipo,
+        "estado": tarea.estado,
+        "progreso": tarea.progreso,
+        "mensaje": tarea.mensaje,
+        "resultado": tarea.resultado,
+        "error": tarea.error,
+        "creada_en": tarea.creada_en,
+        "iniciada_en": tarea.iniciada_en,
+        "terminada_en": tarea.terminada_en,
+    }
+
+def _tareas_visibles(request):
+    # Los administradores ven todas las tareas; el resto, solo las propias
+    tareas = Tarea.objects.all()
+    if not IsSoloAdmin().has_permission(request, None):
+        tareas = tareas.filter(creada_por=request.user)
+    return tareas
+
+class AdminTareasAPIView(APIView):
+    """
+    GET: últimas tareas en segundo plano. POST {"tipo": ...}: encola una tarea
+    de mantenimiento (reconstruir_catalogo, reconstruir_indice_busqueda,
+    reconstruir_ventas_diarias); solo administradores.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+
+    def get(self, request):
+        tareas = _tareas_visibles(request)
+        if request.GET.get("estado"):
+            tareas = tareas.filter(estado=request.GET["estado"])
+        return _respuesta_ok({"tareas": [_datos_tarea(t) for t in tareas[:50]]})
+
+    def post(self, request):
+        if not IsSoloAdmin().has_permission(request, self):
+            return _respuesta_error("Solo un administrador puede lanzar tareas.", status.HTTP_403_FORBIDDEN)
+        tipo = request.data.get("tipo")
+        if tipo not in TAREAS_ADMIN:
+            return _respuesta_error(f"Tipo de tarea inválido; usa {', '.join(TAREAS_ADMIN)}.")
+        tarea = encolar_tarea(tipo, request.user)
+        return _respuesta_ok({"tarea": _datos_tarea(tarea)}, "Tarea encolada.", status_code=status.HTTP_202_ACCEPTED)
+
+class AdminTareaDetalleAPIView(APIView):
+    """
+    Estado y progreso de una tarea en segundo plano.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrEmpleadoEspecial]
+
+    def get(self, request, pk):
+        tarea = get_object_or_404(_tareas_visibles(request), pk=pk)
+        return _respuesta_ok({"tarea": _datos_tarea(tarea)})
+
 @method_decorator(ensure_csrf_cookie, name="dispatch")
 class CSRFTokenView(APIView):
     """
@@ -743,48 +1217,105 @@ class StripePaymentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-
         try:
             cart = Cart.objects.get(user=request.user, estado="ACTIVO")
         except Cart.DoesNotExist:
             return Response({"error": "No hay carrito activo."}, status=400)
 
-        cart.calcular_totales()
+        # Se cobra el precio vigente (con descuentos). Se fija en el carrito recién al crear la
+        # sesión: un intento rechazado no cambia sus precios. El webhook crea el pedido con ellos.
+        lineas = precios_vigentes(cart)
         total_stripe = cart.total_para_stripe()
         if total_stripe < 50:
             return Response({"error": "El monto mínimo para pagar es $50 CLP."}, status=400)
 
         line_items = []
-        for item in cart.items.all():
+        for linea in lineas:
             line_items.append({
                 "price_data": {
                     "currency": "clp",
                     "product_data": {
-                        "name": item.producto.nombre,
+                        "name": linea["nombre"],
                     },
-                    "unit_amount": int(item.precio_unitario),  # en CLP
+                    "unit_amount": int(linea["precio"]),  # en CLP
                 },
-                "quantity": item.cantidad,
+                "quantity": linea["cantidad"],
             })
 
+        # Retiene el stock mientras la sesión de pago está abierta. La sesión vence 5 minutos
+        # antes que la reserva (un pago aceptado siempre tiene su stock); un doble envío
+        # reutiliza la reserva si su sesión sigue abierta al menos un minuto más.
+        try:
+            reservas = reservar_checkout(cart, vigentes_hasta=timezone.now() + timezone.timedelta(minutes=6))
+        except StockInsuficiente as e:
+            return Response(
+                {"error": "No hay stock suficiente para uno de los productos.", "producto_id": e.producto_id},
+                status=status.HTTP_409_CONFLICT,
+            )
+
         # URL de éxito y cancelación
         success_url = settings.FRONTEND_URL + "/pago/exito"
         cancel_url = settings.FRONTEND_URL + "/carrito"
+        expires_at = int((reservas[0].expira_en - timezone.timedelta(minutes=5)).timestamp())
+        params = {
+            "payment_method_types": ["card"],
+            "line_items": line_items,
+            "mode": "payment",
+            "success_url": success_url + "?session_id={CHECKOUT_SESSION_ID}",
+            "cancel_url": cancel_url,
+            "metadata": {"user_id": request.user.id, "cart_id": cart.id},
+            "customer_email": request.user.email,
+            "expires_at": expires_at,
+        }
 
         try:
-            session = stripe.checkout.Session.create(
-                payment_method_types=["card"],
-                line_items=line_items,
-                mode="payment",
-                success_url=success_url + "?session_id={CHECKOUT_SESSION_ID}",
-                cancel_url=cancel_url,
-                metadata={"user_id": request.user.id, "cart_id": cart.id},
-                customer_email=request.user.email,
+            session = obtener_pasarela().crear_sesion_checkout(
+                params, clave_idempotencia(cart, reservas[0], line_items)
             )
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+        except PasarelaNoDisponible as e:
+            cancelar_reservas(cart)
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ErrorPasarela as e:
+            cancelar_reservas(cart)
+            return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
+        # Las reservas quedan asociadas a la sesión: solo sus eventos de vencimiento las liberan
+        with transaction.atomic():
+            guardar_precios(cart, lineas)
+            asociar_sesion(reservas, session["id"])
+        return Response({"sessionId": session["id"]})
+
+class StripeWebhookAPIView(APIView):
+    """
+    Recibe los eventos de Stripe: verifica la firma, guarda el evento y responde
+    de inmediato; el worker lo procesa (core/pagos.py). Las entregas repetidas
+    también responden 200 para que Stripe no siga reintentando.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
-        
+    def post(self, request):
+        try:
+            evento, creado = registrar_evento_stripe(request.body, request.META.get("HTTP_STRIPE_SIGNATURE"))
+        except EventoInvalido as e:
+            return _respuesta_error(f"Evento inválido: {e}")
+        return _respuesta_ok({"evento": evento.id, "duplicado": not creado})
 
-        return Response({"sessionId": session.id})
\ No newline at end of file
+class StripeConfirmAPIView(APIView):
+    """
+    Estado del pago de una sesión de Checkout, para la página de éxito. Mientras
+    el webhook no se procesa responde `pendiente`; el cliente vuelve a consultar.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        session_id = request.query_params.get("session_id")
+        if not session_id:
+            return _respuesta_error("Falta session_id.")
+        estado, pedido_id = estado_pago(session_id, request.user)
+        return Response({
+            "success": estado == "COMPLETADO",
+            "pendiente": estado == "PENDIENTE",
+            "estado": estado,
+            "pedido_id": pedido_id,
+        })
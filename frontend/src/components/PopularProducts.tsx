@@ -116,11 +116,11 @@ const PopularProducts: React.FC<{ navigateTo?: (page: string, categoria?: string
 
   React.useEffect(() => {
     setCargando(true);
-    fetch(`${API_URL}/api/productos/`)
+    fetch(`${API_URL}/api/productos/?page_size=12`)
       .then(res => res.json())
       .then(data => {
         setProductos(
-          data.map((item: any) => ({
+          (data.results || []).map((item: any) => ({
             id: item.id,
             nombre: item.nombre,
             marca: typeof item.marca === "string" ? item.marca : (item.marca?.nombre ?? "Sin marca"),
@@ -21,6 +21,8 @@ import {
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
 import { getCookie } from "../../utils/cookies";
+import { fetchTodasLasPaginas } from "../../utils/paginacion";
+import { esperarTarea } from "../../utils/tareas";
 
 interface Producto {
   id: number;
@@ -65,8 +67,9 @@ const DiscountsPage: React.FC = () => {
   const fetchProductos = async () => {
     setLoading(true);
     try {
-      const res = await fetch("http://localhost:8000/api/productos/", { credentials: "include" });
-      const data = await res.json();
+      const data = await fetchTodasLasPaginas<Producto>("http://localhost:8000/api/productos/?page_size=100", {
+        credentials: "include",
+      });
       setProductos(data);
     } catch {
       setProductos([]);
@@ -107,10 +110,12 @@ const DiscountsPage: React.FC = () => {
         },
         body: JSON.stringify({ productos: selected, descuento: pct }),
       });
+      const data = await res.json();
       if (!res.ok) {
-        const data = await res.json();
         setError(data.mensaje || "Error al aplicar el descuento.");
       } else {
+        // El descuento se aplica en segundo plano: esperar a que la tarea termine
+        await esperarTarea(data.tarea.id);
         setSuccess("¡Descuento aplicado!");
         setSelected([]);
         setDescuento("");
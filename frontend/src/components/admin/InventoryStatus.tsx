@@ -1,6 +1,7 @@
 import React from "react";
 import { Card, CardHeader, CardBody, Progress } from "@heroui/react";
 import { Icon } from "@iconify/react";
+import { fetchTodasLasPaginas } from "../../utils/paginacion";
 
 interface CategoriaInventario {
   categoria: string;
@@ -51,11 +52,7 @@ const InventoryStatus: React.FC = () => {
 
   React.useEffect(() => {
     setLoading(true);
-    fetch("http://localhost:8000/api/productos/", { credentials: "include" })
-      .then(async res => {
-        if (!res.ok) throw new Error("No se pudo cargar el inventario");
-        return res.json();
-      })
+    fetchTodasLasPaginas<Producto>("http://localhost:8000/api/productos/?page_size=100", { credentials: "include" })
       .then((productos: Producto[]) => {
         const agrupado: Record<string, number> = {};
         productos.forEach(prod => {
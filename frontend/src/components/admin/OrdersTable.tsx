@@ -11,7 +11,6 @@ import {
   TableCell,
   Chip,
   Button,
-  Pagination,
   Spinner,
   Input,
   Select,
@@ -52,52 +51,89 @@ const statusLabelMap: Record<PedidoStatus, string> = {
 const formatoCLP = (valor: number) =>
   valor.toLocaleString("es-CL", { style: "currency", currency: "CLP", minimumFractionDigits: 0 });
 
+interface ItemDetalle {
+  id: number;
+  cantidad: number;
+  precio_unitario: number;
+  producto: { id: number; nombre: string; marca: string };
+}
+
+interface PedidoDetalle {
+  id: number;
+  metodo_retiro: string;
+  direccion_envio: string | null;
+  bodeguero_asignado: string | null;
+  items: ItemDetalle[];
+}
+
+const API_PEDIDOS = "http://localhost:8000/api/admin/orders/";
+
+const construirUrlPedidos = (busqueda: string, estado: PedidoStatus | "", porPagina: number) => {
+  const params = new URLSearchParams({ page_size: String(porPagina) });
+  if (busqueda.trim()) params.set("buscar", busqueda.trim());
+  if (estado) params.set("estado", estado);
+  return `${API_PEDIDOS}?${params.toString()}`;
+};
+
 const OrdersTable: React.FC = () => {
   const [pedidos, setPedidos] = React.useState<Pedido[]>([]);
   const [loading, setLoading] = React.useState(true);
-  const [page, setPage] = React.useState(1);
   const [search, setSearch] = React.useState("");
   const [statusFilter, setStatusFilter] = React.useState<PedidoStatus | "">("");
+  // Paginación por cursor: la URL de la página actual y los enlaces que entrega el backend
+  const [urlPagina, setUrlPagina] = React.useState<string | null>(null);
+  const [siguiente, setSiguiente] = React.useState<string | null>(null);
+  const [anterior, setAnterior] = React.useState<string | null>(null);
+  // El detalle (items) se pide solo al abrir un pedido
+  const [detalle, setDetalle] = React.useState<PedidoDetalle | null>(null);
+  const [cargandoDetalle, setCargandoDetalle] = React.useState<number | null>(null);
   const rowsPerPage = 10;
 
   React.useEffect(() => {
     setLoading(true);
-    fetch("http://localhost:8000/api/admin/orders/", { credentials: "include" })
+    const url = urlPagina || construirUrlPedidos(search, statusFilter, rowsPerPage);
+    // Pequeño retardo para no consultar en cada tecla de la búsqueda
+    const timer = setTimeout(() => {
+      fetch(url, { credentials: "include" })
+        .then(async (res) => {
+          if (!res.ok) throw new Error("No se pudo cargar las órdenes");
+          return res.json();
+        })
+        .then((data: any) => {
+          const pedidos: Pedido[] = (data.results || []).map((p: any) => ({
+            id: p.id,
+            codigo: p.codigo || `#ORD-${p.id}`,
+            cliente_nombre: p.cliente || "Cliente",
+            fecha_creacion: p.fecha_creacion ? new Date(p.fecha_creacion).toLocaleDateString("es-CL") : "",
+            total: Number(p.total ?? 0),
+            estado: p.estado,
+            items_count: p.items_count ?? 0,
+          }));
+          setPedidos(pedidos);
+          setSiguiente(data.next || null);
+          setAnterior(data.previous || null);
+        })
+        .catch(() => setPedidos([]))
+        .finally(() => setLoading(false));
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [search, statusFilter, urlPagina]);
+
+  const verDetalle = (id: number) => {
+    if (detalle?.id === id) {
+      setDetalle(null);
+      return;
+    }
+    setCargandoDetalle(id);
+    fetch(`${API_PEDIDOS}${id}/`, { credentials: "include" })
       .then(async (res) => {
-        if (!res.ok) throw new Error("No se pudo cargar las órdenes");
+        if (!res.ok) throw new Error("No se pudo cargar el pedido");
         return res.json();
       })
-      .then((data: any) => {
-        const pedidosRaw = Array.isArray(data) ? data : data.results || [];
-        const pedidos: Pedido[] = pedidosRaw.map((p: any) => ({
-          id: p.id,
-          codigo: p.codigo || `#ORD-${p.id}`,
-          cliente_nombre: p.cliente?.nombre || p.cliente_nombre || "Cliente",
-          fecha_creacion: p.fecha_creacion ? new Date(p.fecha_creacion).toLocaleDateString("es-CL") : "",
-          total: p.total ?? 0,
-          estado: p.estado,
-          items_count: p.items?.length ?? p.items_count ?? 0,
-        }));
-        setPedidos(pedidos);
-      })
-      .catch(() => setPedidos([]))
-      .finally(() => setLoading(false));
-  }, []);
-
-  const filteredPedidos = pedidos.filter((pedido) => {
-    const searchLower = search.toLowerCase();
-    const clienteLower = pedido.cliente_nombre.toLowerCase();
-    const codigoLower = pedido.codigo.toLowerCase();
-
-    const matchesSearch =
-      search === "" || clienteLower.includes(searchLower) || codigoLower.includes(searchLower);
-
-    const matchesStatus = statusFilter === "" || pedido.estado === statusFilter;
-
-    return matchesSearch && matchesStatus;
-  });
-
-  const paginated = filteredPedidos.slice((page - 1) * rowsPerPage, page * rowsPerPage);
+      .then((data: PedidoDetalle) => setDetalle(data))
+      .catch(() => setDetalle(null))
+      .finally(() => setCargandoDetalle(null));
+  };
 
   return (
     <Card>
@@ -106,7 +142,10 @@ const OrdersTable: React.FC = () => {
           <Input
             placeholder="Buscar por código o cliente..."
             value={search}
-            onChange={(e) => setSearch(e.target.value)}
+            onChange={(e) => {
+              setSearch(e.target.value);
+              setUrlPagina(null);
+            }}
             size="sm"
             startContent={<Icon icon="lucide:search" width={16} height={16} />}
           />
@@ -115,6 +154,7 @@ const OrdersTable: React.FC = () => {
             onSelectionChange={(keys) => {
               const val = Array.from(keys)[0] as PedidoStatus | "";
               setStatusFilter(val);
+              setUrlPagina(null);
             }}
             size="sm"
           >
@@ -132,23 +172,32 @@ const OrdersTable: React.FC = () => {
           <div className="flex justify-center py-8">
             <Spinner size="lg" />
           </div>
-        ) : filteredPedidos.length === 0 ? (
+        ) : pedidos.length === 0 ? (
           <div className="text-center text-danger-500 py-8">No hay órdenes disponibles.</div>
         ) : (
           <Table
             removeWrapper
             aria-label="Orders table"
             bottomContent={
-              <div className="flex w-full justify-center">
-                <Pagination
-                  isCompact
-                  showControls
-                  showShadow
-                  color="primary"
-                  page={page}
-                  total={Math.ceil(filteredPedidos.length / rowsPerPage)}
-                  onChange={setPage}
-                />
+              <div className="flex w-full justify-center gap-2">
+                <Button
+                  variant="flat"
+                  size="sm"
+                  isDisabled={!anterior || loading}
+                  onClick={() => setUrlPagina(anterior)}
+                  startContent={<Icon icon="lucide:chevron-left" width={16} height={16} />}
+                >
+                  Anterior
+                </Button>
+                <Button
+                  variant="flat"
+                  size="sm"
+                  isDisabled={!siguiente || loading}
+                  onClick={() => setUrlPagina(siguiente)}
+                  endContent={<Icon icon="lucide:chevron-right" width={16} height={16} />}
+                >
+                  Siguiente
+                </Button>
               </div>
             }
           >
@@ -161,7 +210,7 @@ const OrdersTable: React.FC = () => {
               <TableColumn>ACCIONES</TableColumn>
             </TableHeader>
             <TableBody>
-              {paginated.map((pedido) => (
+              {pedidos.map((pedido) => (
                 <TableRow key={pedido.id}>
                   <TableCell>
                     <div className="flex flex-col">
@@ -179,7 +228,13 @@ const OrdersTable: React.FC = () => {
                   </TableCell>
                   <TableCell>
                     <div className="flex items-center gap-2">
-                      <Button isIconOnly size="sm" variant="light">
+                      <Button
+                        isIconOnly
+                        size="sm"
+                        variant="light"
+                        isLoading={cargandoDetalle === pedido.id}
+                        onClick={() => verDetalle(pedido.id)}
+                      >
                         <Icon icon="lucide:eye" width={16} height={16} />
                       </Button>
                       <Button isIconOnly size="sm" variant="light">
@@ -192,9 +247,33 @@ const OrdersTable: React.FC = () => {
             </TableBody>
           </Table>
         )}
+        {detalle && (
+          <div className="mt-4 rounded-medium border border-default-200 p-4">
+            <div className="flex justify-between mb-2">
+              <h4 className="font-semibold">Detalle #ORD-{detalle.id}</h4>
+              <Button isIconOnly size="sm" variant="light" onClick={() => setDetalle(null)}>
+                <Icon icon="lucide:x" width={16} height={16} />
+              </Button>
+            </div>
+            <p className="text-default-500 text-sm mb-2">
+              {detalle.metodo_retiro === "DESPACHO_DOMICILIO" ? `Despacho a ${detalle.direccion_envio || "domicilio"}` : "Retiro en tienda"}
+              {" · "}Bodeguero: {detalle.bodeguero_asignado || "sin asignar"}
+            </p>
+            <ul className="text-sm">
+              {detalle.items.map((item) => (
+                <li key={item.id} className="flex justify-between py-1">
+                  <span>
+                    {item.cantidad} × {item.producto.nombre} <span className="text-default-400">({item.producto.marca})</span>
+                  </span>
+                  <span>{formatoCLP(Number(item.precio_unitario) * item.cantidad)}</span>
+                </li>
+              ))}
+            </ul>
+          </div>
+        )}
       </CardBody>
     </Card>
   );
 };
 
-export default OrdersTable;
\ No newline at end of file
+export default OrdersTable;
@@ -11,7 +11,6 @@ import {
   TableCell,
   Chip,
   Button,
-  Pagination,
   Spinner,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
@@ -52,12 +51,12 @@ const formatoCLP = (valor: number) =>
 const RecentOrders: React.FC = () => {
   const [pedidos, setPedidos] = React.useState<Pedido[]>([]);
   const [loading, setLoading] = React.useState(true);
-  const [page, setPage] = React.useState(1);
   const rowsPerPage = 5;
 
   React.useEffect(() => {
     setLoading(true);
-    fetch("http://localhost:8000/api/admin/orders/", { credentials: "include" })
+    // Solo la primera página: el backend entrega los pedidos más recientes primero
+    fetch(`http://localhost:8000/api/admin/orders/?page_size=${rowsPerPage}`, { credentials: "include" })
       .then(async res => {
         if (!res.ok) throw new Error("No se pudo cargar las órdenes");
         return res.json();
@@ -67,11 +66,11 @@ const RecentOrders: React.FC = () => {
         const pedidos: Pedido[] = pedidosRaw.map((p: any) => ({
           id: p.id,
           codigo: p.codigo || `#ORD-${p.id}`,
-          cliente_nombre: p.cliente?.nombre || p.cliente_nombre || "Cliente",
+          cliente_nombre: p.cliente || "Cliente",
           fecha_creacion: p.fecha_creacion ? new Date(p.fecha_creacion).toLocaleDateString("es-CL") : "",
-          total: p.total ?? 0,
+          total: Number(p.total ?? 0),
           estado: p.estado,
-          items_count: p.items?.length ?? p.items_count ?? 0,
+          items_count: p.items_count ?? 0,
         }));
         setPedidos(pedidos);
       })
@@ -79,8 +78,6 @@ const RecentOrders: React.FC = () => {
       .finally(() => setLoading(false));
   }, []);
 
-  const paginated = pedidos.slice((page - 1) * rowsPerPage, page * rowsPerPage);
-
   return (
     <Card>
       <CardHeader className="flex justify-between">
@@ -100,23 +97,7 @@ const RecentOrders: React.FC = () => {
         ) : pedidos.length === 0 ? (
           <div className="text-center text-danger-500 py-8">No hay órdenes recientes.</div>
         ) : (
-          <Table
-            removeWrapper
-            aria-label="Recent orders table"
-            bottomContent={
-              <div className="flex w-full justify-center">
-                <Pagination
-                  isCompact
-                  showControls
-                  showShadow
-                  color="primary"
-                  page={page}
-                  total={Math.ceil(pedidos.length / rowsPerPage)}
-                  onChange={setPage}
-                />
-              </div>
-            }
-          >
+          <Table removeWrapper aria-label="Recent orders table">
             <TableHeader>
               <TableColumn>ORDEN</TableColumn>
               <TableColumn>CLIENTE</TableColumn>
@@ -126,7 +107,7 @@ const RecentOrders: React.FC = () => {
               <TableColumn>ACCIONES</TableColumn>
             </TableHeader>
             <TableBody>
-              {paginated.map((pedido) => (
+              {pedidos.map((pedido) => (
                 <TableRow key={pedido.id}>
                   <TableCell>
                     <div className="flex flex-col">
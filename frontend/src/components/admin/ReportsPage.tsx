@@ -13,6 +13,7 @@ import {
   TableCell,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
+import { esperarTarea } from "../../utils/tareas";
 
 const formatoCLP = (valor: number) =>
   valor.toLocaleString("es-CL", { style: "currency", currency: "CLP", minimumFractionDigits: 0 });
@@ -54,13 +55,24 @@ const ReportsPage: React.FC = () => {
   const handleDownload = async () => {
     setDownloading(true);
     try {
-      const res = await fetch(
+      // El Excel se genera en segundo plano: se espera la tarea y luego se descarga el archivo
+      const inicio = await fetch(
         "http://localhost:8000/api/admin/reportes/financieros_xlsx/?export=xlsx",
         { credentials: "include" }
       );
+      if (!inicio.ok) {
+        const text = await inicio.text();
+        throw new Error(`Error ${inicio.status}: ${text}`);
+      }
+      const exportacion = await inicio.json();
+      await esperarTarea(exportacion.tarea.id);
+      const estado = await fetch(
+        `http://localhost:8000/api/admin/reportes/exportaciones/${exportacion.id}/`,
+        { credentials: "include" }
+      ).then((r) => r.json());
+      const res = await fetch(estado.url_descarga, { credentials: "include" });
       if (!res.ok) {
-        const text = await res.text();
-        throw new Error(`Error ${res.status}: ${text}`);
+        throw new Error(`Error ${res.status} al descargar el archivo`);
       }
       const blob = await res.blob();
       const link = document.createElement("a");
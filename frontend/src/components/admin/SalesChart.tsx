@@ -31,37 +31,28 @@ const SalesChart: React.FC = () => {
 
   React.useEffect(() => {
     setLoading(true);
-    fetch("http://localhost:8000/api/admin/orders/", { credentials: "include" })
+    // La serie viene agregada por el backend: una semana por día o 12 meses por mes
+    const desde = new Date();
+    if (selected === "weekly") {
+      desde.setDate(desde.getDate() - 6);
+    } else {
+      desde.setMonth(desde.getMonth() - 11, 1);
+    }
+    const params = new URLSearchParams({
+      desde: desde.toISOString().slice(0, 10),
+      granularidad: selected === "weekly" ? "dia" : "mes",
+    });
+    fetch(`http://localhost:8000/api/admin/ventas/series/?${params.toString()}`, { credentials: "include" })
       .then(async res => {
-        if (!res.ok) throw new Error("No se pudo cargar las órdenes");
+        if (!res.ok) throw new Error("No se pudo cargar la serie de ventas");
         return res.json();
       })
-      .then((raw) => {
-        const pedidosRaw = Array.isArray(raw) ? raw : raw.results || [];
-        const agrupado: Record<string, { revenue: number; orders: number }> = {};
-
-        pedidosRaw.forEach((p: any) => {
-          const fecha = p.fecha_creacion ? new Date(p.fecha_creacion) : null;
-          if (!fecha) return;
-          let key = "";
-          if (selected === "weekly") {
-            key = fecha.toISOString().slice(0, 10);
-          } else {
-            key = fecha.getFullYear() + "-" + String(fecha.getMonth() + 1).padStart(2, "0");
-          }
-          if (!agrupado[key]) agrupado[key] = { revenue: 0, orders: 0 };
-          const total = Number(p.total);
-          if (!isNaN(total) && isFinite(total)) {
-            agrupado[key].revenue += total;
-            agrupado[key].orders += 1;
-          }
-        });
-
-        const sortedKeys = Object.keys(agrupado).sort();
-        const chartData: ChartData[] = sortedKeys.map(key => ({
-          name: key,
-          revenue: agrupado[key].revenue,
-          orders: agrupado[key].orders,
+      .then((serie) => {
+        const total = serie.series?.[0] || { ingresos: [], ordenes: [] };
+        const chartData: ChartData[] = (serie.periodos || []).map((periodo: string, i: number) => ({
+          name: selected === "weekly" ? periodo : periodo.slice(0, 7),
+          revenue: Number(total.ingresos[i] || 0),
+          orders: Number(total.ordenes[i] || 0),
         }));
 
         setData(chartData);
@@ -12,7 +12,6 @@ import {
   DropdownTrigger,
   DropdownMenu,
   DropdownItem,
-  Pagination,
   Breadcrumbs,
   BreadcrumbItem,
 } from "@heroui/react";
@@ -153,8 +152,37 @@ const TarjetaProducto: React.FC<{ producto: Producto }> = ({ producto }) => {
   );
 };
 
+const API_PRODUCTOS = "http://localhost:8000/api/productos/";
+
+// Rangos de precio del filtro -> parámetros precio_min / precio_max del backend
+const RANGOS_PRECIO: Record<string, { precio_min?: number; precio_max?: number }> = {
+  menos25: { precio_max: 24999 },
+  "25a50": { precio_min: 25000, precio_max: 50000 },
+  "50a100": { precio_min: 50001, precio_max: 100000 },
+  mas100: { precio_min: 100001 },
+};
+
+// Opciones de orden del frontend -> parámetro orden del backend
+const ORDENES_API: Record<string, string> = {
+  nuevos: "nuevos",
+  precioAsc: "precio_asc",
+  precioDesc: "precio_desc",
+};
+
+function construirUrlCatalogo(filtros: EstadoFiltros, productosPorPagina: number) {
+  const params = new URLSearchParams({ page_size: String(productosPorPagina) });
+  if (filtros.categoria !== "todos") params.set("categoria", filtros.categoria);
+  const rango = RANGOS_PRECIO[filtros.rangoPrecio];
+  if (rango?.precio_min !== undefined) params.set("precio_min", String(rango.precio_min));
+  if (rango?.precio_max !== undefined) params.set("precio_max", String(rango.precio_max));
+  if (ORDENES_API[filtros.ordenarPor]) params.set("orden", ORDENES_API[filtros.ordenarPor]);
+  if (filtros.busqueda.trim()) params.set("search", filtros.busqueda.trim());
+  return `${API_PRODUCTOS}?${params.toString()}`;
+}
+
 const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoriaInicial }) => {
   const [productos, setProductos] = React.useState<Producto[]>([]);
+  const [categorias, setCategorias] = React.useState<string[]>([]);
   const [cargando, setCargando] = React.useState(true);
 
   const [filtros, setFiltros] = React.useState<EstadoFiltros>({
@@ -163,44 +191,62 @@ const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoria
     ordenarPor: "populares",
     busqueda: "",
   });
-  const [paginaActual, setPaginaActual] = React.useState(1);
+  // Paginación por cursor: la URL de la página actual y los enlaces que entrega el backend
+  const [urlPagina, setUrlPagina] = React.useState<string | null>(null);
+  const [siguiente, setSiguiente] = React.useState<string | null>(null);
+  const [anterior, setAnterior] = React.useState<string | null>(null);
   const productosPorPagina = 12;
 
   React.useEffect(() => {
     if (categoriaInicial && categoriaInicial !== filtros.categoria) {
       setFiltros(f => ({ ...f, categoria: categoriaInicial }));
-      setPaginaActual(1);
+      setUrlPagina(null);
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [categoriaInicial]);
 
   React.useEffect(() => {
-    setCargando(true);
-    fetch("http://localhost:8000/api/productos/")
+    fetch("http://localhost:8000/api/categorias/")
       .then(res => res.json())
-      .then(data => {
-        setProductos(
-          data.map((item: any) => ({
-            id: item.id,
-            nombre: item.nombre,
-            marca: item.marca,
-            valor: Number(item.valor),
-            imagen_principal: item.imagen_principal,
-            categoria: item.categoria,
-            disponible: !!item.disponible,
-            rating: typeof item.rating === "number" ? item.rating : Math.random() * 2 + 3,
-            descuento: item.descuento,
-            precio_con_descuento: item.precio_con_descuento,
-          }))
-        );
-        setCargando(false);
-      });
+      .then(data => setCategorias(data.map((c: any) => c.nombre)))
+      .catch(() => setCategorias([]));
   }, []);
 
-  const categoriasUnicas = React.useMemo(() => {
-    const cats = Array.from(new Set(productos.map(p => p.categoria).filter(Boolean)));
-    return [{ key: "todos", label: "Todas las categorías" }, ...cats.map(c => ({ key: c, label: c }))];
-  }, [productos]);
+  React.useEffect(() => {
+    setCargando(true);
+    const url = urlPagina || construirUrlCatalogo(filtros, productosPorPagina);
+    // Pequeño retardo para no consultar en cada tecla de la búsqueda
+    const timer = setTimeout(() => {
+      fetch(url)
+        .then(res => res.json())
+        .then(data => {
+          setProductos(
+            (data.results || []).map((item: any) => ({
+              id: item.id,
+              nombre: item.nombre,
+              marca: item.marca,
+              valor: Number(item.valor),
+              imagen_principal: item.imagen_principal,
+              categoria: item.categoria,
+              disponible: !!item.disponible,
+              rating: typeof item.rating === "number" ? item.rating : Math.random() * 2 + 3,
+              descuento: item.descuento,
+              precio_con_descuento: item.precio_con_descuento,
+            }))
+          );
+          setSiguiente(data.next || null);
+          setAnterior(data.previous || null);
+          setCargando(false);
+        })
+        .catch(() => setCargando(false));
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [filtros, urlPagina]);
+
+  const categoriasUnicas = React.useMemo(
+    () => [{ key: "todos", label: "Todas las categorías" }, ...categorias.map(c => ({ key: c, label: c }))],
+    [categorias]
+  );
 
   const opcionesPrecio = [
     { key: "todos", label: "Todos los precios" },
@@ -219,69 +265,33 @@ const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoria
 
   const cambiarFiltro = (tipo: keyof EstadoFiltros, valor: string) => {
     setFiltros(prev => ({ ...prev, [tipo]: valor }));
-    setPaginaActual(1);
+    setUrlPagina(null);
   };
 
   const cambiarBusqueda = (e: React.ChangeEvent<HTMLInputElement>) => {
     setFiltros(prev => ({ ...prev, busqueda: e.target.value }));
-    setPaginaActual(1);
+    setUrlPagina(null);
   };
 
-  const productosFiltrados = React.useMemo(() => {
-    let resultado = [...productos];
-
-    if (filtros.categoria !== "todos") {
-      resultado = resultado.filter(p => p.categoria === filtros.categoria);
-    }
-
-    switch (filtros.rangoPrecio) {
-      case "menos25":
-        resultado = resultado.filter(p => p.valor < 25000);
-        break;
-      case "25a50":
-        resultado = resultado.filter(p => p.valor >= 25000 && p.valor <= 50000);
-        break;
-      case "50a100":
-        resultado = resultado.filter(p => p.valor > 50000 && p.valor <= 100000);
-        break;
-      case "mas100":
-        resultado = resultado.filter(p => p.valor > 100000);
-        break;
-      default:
-        break;
-    }
-
-    if (filtros.busqueda) {
-      const q = filtros.busqueda.toLowerCase();
-      resultado = resultado.filter(
-        p =>
-          p.nombre.toLowerCase().includes(q) ||
-          p.categoria.toLowerCase().includes(q) ||
-          p.marca.toLowerCase().includes(q)
-      );
-    }
-
-    switch (filtros.ordenarPor) {
-      case "precioAsc":
-        resultado.sort((a, b) => a.valor - b.valor);
-        break;
-      case "precioDesc":
-        resultado.sort((a, b) => b.valor - a.valor);
-        break;
-      case "nuevos":
-        resultado.sort((a, b) => b.id - a.id);
-        break;
-      default:
-        break;
-    }
-
-    return resultado;
-  }, [filtros, productos]);
-
-  const totalPaginas = Math.ceil(productosFiltrados.length / productosPorPagina);
-  const productosActuales = productosFiltrados.slice(
-    (paginaActual - 1) * productosPorPagina,
-    paginaActual * productosPorPagina
+  const controlesPaginacion = (
+    <div className="flex gap-2">
+      <Button
+        variant="flat"
+        isDisabled={!anterior || cargando}
+        onClick={() => setUrlPagina(anterior)}
+        startContent={<Icon icon="lucide:chevron-left" width={16} height={16} />}
+      >
+        Anterior
+      </Button>
+      <Button
+        variant="flat"
+        isDisabled={!siguiente || cargando}
+        onClick={() => setUrlPagina(siguiente)}
+        endContent={<Icon icon="lucide:chevron-right" width={16} height={16} />}
+      >
+        Siguiente
+      </Button>
+    </div>
   );
 
   const categoriaActual = categoriasUnicas.find(cat => cat.key === filtros.categoria)?.label || "Todas las categorías";
@@ -385,25 +395,15 @@ const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoria
       {/* Resultados */}
       <div className="flex justify-between items-center mb-6">
         <p className="text-default-500">
-          Mostrando {productosFiltrados.length > 0 ? (paginaActual - 1) * productosPorPagina + 1 : 0}-
-          {Math.min(paginaActual * productosPorPagina, productosFiltrados.length)} de {productosFiltrados.length} productos
+          {cargando ? "Cargando productos..." : `Mostrando ${productos.length} productos`}
         </p>
-        {productosFiltrados.length > productosPorPagina && (
-          <div className="hidden md:block">
-            <Pagination
-              total={totalPaginas}
-              page={paginaActual}
-              onChange={setPaginaActual}
-              showControls
-            />
-          </div>
-        )}
+        {(anterior || siguiente) && <div className="hidden md:block">{controlesPaginacion}</div>}
       </div>
 
       {/* Grid de productos */}
-      {productosActuales.length > 0 ? (
+      {productos.length > 0 ? (
         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6 mb-8">
-          {productosActuales.map(producto => (
+          {productos.map(producto => (
             <TarjetaProducto key={producto.id} producto={producto} />
           ))}
         </div>
@@ -418,14 +418,15 @@ const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoria
             <Button
               color="primary"
               variant="flat"
-              onClick={() =>
+              onClick={() => {
                 setFiltros({
                   categoria: "todos",
                   rangoPrecio: "todos",
                   ordenarPor: "populares",
                   busqueda: "",
-                })
-              }
+                });
+                setUrlPagina(null);
+              }}
             >
               Limpiar filtros
             </Button>
@@ -434,15 +435,8 @@ const CatalogPage: React.FC<{ categoriaInicial?: string | null }> = ({ categoria
       )}
 
       {/* Paginación inferior */}
-      {productosFiltrados.length > productosPorPagina && (
-        <div className="flex justify-center mt-8">
-          <Pagination
-            total={totalPaginas}
-            page={paginaActual}
-            onChange={setPaginaActual}
-            showControls
-          />
-        </div>
+      {(anterior || siguiente) && (
+        <div className="flex justify-center mt-8">{controlesPaginacion}</div>
       )}
     </div>
   );
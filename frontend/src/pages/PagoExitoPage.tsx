@@ -3,6 +3,8 @@ import { useSearchParams } from "react-router-dom";
 import ConfirmationModal from "../components/ConfirmationModal";
 
 const API_BASE_URL = "http://localhost:8000/api";
+const MAX_CONSULTAS = 20;
+const INTERVALO_CONSULTA_MS = 1500;
 
 const PagoExitoPage: React.FC = () => {
   const [searchParams] = useSearchParams();
@@ -15,11 +17,27 @@ const PagoExitoPage: React.FC = () => {
       setSuccess(false);
       return;
     }
-    // Llama a tu backend para verificar el estado del pago
-    fetch(`${API_BASE_URL}/pago/stripe/confirm/?session_id=${sessionId}`, { credentials: "include" })
-      .then(res => res.json())
-      .then(data => setSuccess(data.success === true))
-      .catch(() => setSuccess(false));
+    // El pago lo confirma el webhook de Stripe; mientras no se procese, el backend responde "pendiente"
+    let cancelado = false;
+    let timer: ReturnType<typeof setTimeout>;
+    const consultar = (intento: number) => {
+      fetch(`${API_BASE_URL}/pago/stripe/confirm/?session_id=${sessionId}`, { credentials: "include" })
+        .then(res => res.json())
+        .then(data => {
+          if (cancelado) return;
+          if (data.pendiente && intento < MAX_CONSULTAS) {
+            timer = setTimeout(() => consultar(intento + 1), INTERVALO_CONSULTA_MS);
+            return;
+          }
+          setSuccess(data.success === true);
+        })
+        .catch(() => !cancelado && setSuccess(false));
+    };
+    consultar(1);
+    return () => {
+      cancelado = true;
+      clearTimeout(timer);
+    };
   }, [searchParams]);
 
   if (success === null) return null; // o un spinner
@@ -0,0 +1,16 @@
+// Recorre todas las páginas de un endpoint paginado por cursor ({ next, results })
+// y devuelve los resultados concatenados. Pensado para vistas de administración
+// que necesitan el listado completo.
+export async function fetchTodasLasPaginas<T>(url: string, init?: RequestInit): Promise<T[]> {
+  const resultados: T[] = [];
+  let siguiente: string | null = url;
+  while (siguiente) {
+    const res: Response = await fetch(siguiente, init);
+    if (!res.ok) throw new Error(`Error ${res.status} al cargar ${siguiente}`);
+    const data = await res.json();
+    if (Array.isArray(data)) return data;
+    resultados.push(...(data.results || []));
+    siguiente = data.next;
+  }
+  return resultados;
+}
@@ -0,0 +1,27 @@
+// Consulta una tarea en segundo plano (/api/admin/tareas/<id>/) hasta que termina
+// y devuelve sus datos; lanza un error si la tarea falla.
+export interface Tarea {
+  id: number;
+  tipo: string;
+  estado: "PENDIENTE" | "EN_CURSO" | "COMPLETADA" | "ERROR";
+  progreso: number;
+  mensaje: string;
+  resultado: any;
+  error: string;
+}
+
+export async function esperarTarea(
+  id: number,
+  onProgreso?: (tarea: Tarea) => void,
+  intervaloMs = 1500,
+): Promise<Tarea> {
+  while (true) {
+    const res = await fetch(`http://localhost:8000/api/admin/tareas/${id}/`, { credentials: "include" });
+    if (!res.ok) throw new Error(`Error ${res.status} al consultar la tarea`);
+    const { tarea } = await res.json();
+    onProgreso?.(tarea);
+    if (tarea.estado === "COMPLETADA") return tarea;
+    if (tarea.estado === "ERROR") throw new Error(tarea.error || "La tarea terminó con error");
+    await new Promise((resolve) => setTimeout(resolve, intervaloMs));
+  }
+}